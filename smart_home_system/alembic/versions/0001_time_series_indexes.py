@@ -0,0 +1,38 @@
+"""add composite time-series and foreign key indexes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (索引名, 表名, 列)
+INDEXES = [
+    ("ix_device_usage_records_device_id_start_time", "device_usage_records", ["device_id", "start_time"]),
+    ("ix_device_usage_records_user_id_start_time", "device_usage_records", ["user_id", "start_time"]),
+    ("ix_security_events_house_id_event_time", "security_events", ["house_id", "event_time"]),
+    ("ix_rooms_house_id", "rooms", ["house_id"]),
+    ("ix_devices_room_id", "devices", ["room_id"]),
+    ("ix_houses_user_id", "houses", ["user_id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
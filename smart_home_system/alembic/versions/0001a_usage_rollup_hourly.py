@@ -0,0 +1,44 @@
+"""create the hourly usage rollup table
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001a'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 之前由 create_all 建好的表直接沿用，归本迁移管理；
+    # 新建的表为空，之后运行 python -m app.db.rebuild_rollups 生成数据
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table("usage_rollup_hourly"):
+        return
+    op.create_table(
+        "usage_rollup_hourly",
+        sa.Column("device_id", sa.Integer(), nullable=False),
+        sa.Column("hour_bucket", sa.DateTime(), nullable=False),
+        sa.Column("usage_count", sa.Integer(), nullable=False),
+        sa.Column("total_duration", sa.Integer(), nullable=False),
+        sa.Column("total_energy", sa.Float(), nullable=False),
+        sa.Column("automated_count", sa.Integer(), nullable=False),
+        sa.Column("automated_duration", sa.Integer(), nullable=False),
+        sa.Column("automated_energy", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("device_id", "hour_bucket"),
+        sa.ForeignKeyConstraint(["device_id"], ["devices.id"], name="fk_usage_rollup_hourly_device_id_devices"),
+    )
+
+
+def downgrade() -> None:
+    # 汇总表的数据都可以由使用记录重新生成
+    op.drop_table("usage_rollup_hourly")
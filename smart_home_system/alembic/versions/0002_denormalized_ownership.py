@@ -0,0 +1,89 @@
+"""denormalize house_id/owner_user_id onto usage and maintenance rows
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (表名, 时间列, 索引名)
+TABLES = [
+    ("device_usage_records", "start_time", "ix_device_usage_records_owner_user_id_start_time"),
+    ("device_maintenance_records", "maintenance_date", "ix_device_maintenance_records_owner_user_id_maintenance_date"),
+]
+
+# 通过 设备 -> 房间 -> 房屋 回填冗余字段
+BACKFILL_HOUSE_ID = """
+    UPDATE {table} SET house_id = (
+        SELECT rooms.house_id FROM devices
+        JOIN rooms ON devices.room_id = rooms.id
+        WHERE devices.id = {table}.device_id
+    )
+"""
+BACKFILL_OWNER = """
+    UPDATE {table} SET owner_user_id = (
+        SELECT houses.user_id FROM houses
+        WHERE houses.id = {table}.house_id
+    )
+"""
+
+
+def upgrade() -> None:
+    for table, time_column, index_name in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column("house_id", sa.Integer(), nullable=True))
+            batch_op.add_column(sa.Column("owner_user_id", sa.Integer(), nullable=True))
+            batch_op.create_foreign_key(f"fk_{table}_house_id_houses", "houses", ["house_id"], ["id"])
+            batch_op.create_foreign_key(f"fk_{table}_owner_user_id_users", "users", ["owner_user_id"], ["id"])
+        op.execute(BACKFILL_HOUSE_ID.format(table=table))
+        op.execute(BACKFILL_OWNER.format(table=table))
+        op.create_index(index_name, table, ["owner_user_id", time_column])
+
+    op.create_index(
+        "ix_device_usage_records_house_id_start_time",
+        "device_usage_records",
+        ["house_id", "start_time"]
+    )
+
+    # 小时汇总表由 0001a 创建，这里补充冗余字段并回填
+    with op.batch_alter_table("usage_rollup_hourly") as batch_op:
+        batch_op.add_column(sa.Column("house_id", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("owner_user_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key("fk_usage_rollup_hourly_house_id_houses", "houses", ["house_id"], ["id"])
+        batch_op.create_foreign_key("fk_usage_rollup_hourly_owner_user_id_users", "users", ["owner_user_id"], ["id"])
+    op.execute(BACKFILL_HOUSE_ID.format(table="usage_rollup_hourly"))
+    op.execute(BACKFILL_OWNER.format(table="usage_rollup_hourly"))
+    op.create_index(
+        "ix_usage_rollup_hourly_owner_user_id_hour_bucket",
+        "usage_rollup_hourly",
+        ["owner_user_id", "hour_bucket"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_usage_rollup_hourly_owner_user_id_hour_bucket", table_name="usage_rollup_hourly")
+    with op.batch_alter_table("usage_rollup_hourly") as batch_op:
+        batch_op.drop_constraint("fk_usage_rollup_hourly_owner_user_id_users", type_="foreignkey")
+        batch_op.drop_constraint("fk_usage_rollup_hourly_house_id_houses", type_="foreignkey")
+        batch_op.drop_column("owner_user_id")
+        batch_op.drop_column("house_id")
+
+    op.drop_index("ix_device_usage_records_house_id_start_time", table_name="device_usage_records")
+    for table, _, index_name in reversed(TABLES):
+        op.drop_index(index_name, table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f"fk_{table}_owner_user_id_users", type_="foreignkey")
+            batch_op.drop_constraint(f"fk_{table}_house_id_houses", type_="foreignkey")
+            batch_op.drop_column("owner_user_id")
+            batch_op.drop_column("house_id")
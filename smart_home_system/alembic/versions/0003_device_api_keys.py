@@ -0,0 +1,32 @@
+"""add hashed per-device API keys
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("devices") as batch_op:
+        batch_op.add_column(sa.Column("api_key_salt", sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column("api_key_hash", sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column("api_key_created_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("devices") as batch_op:
+        batch_op.drop_column("api_key_created_at")
+        batch_op.drop_column("api_key_hash")
+        batch_op.drop_column("api_key_salt")
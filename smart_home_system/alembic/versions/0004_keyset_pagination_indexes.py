@@ -0,0 +1,37 @@
+"""extend list indexes with id for keyset pagination
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (表名, 原索引名, 原索引列)：新索引在原索引列后追加 id，名称加 _id 后缀
+INDEXES = [
+    ("device_usage_records", "ix_device_usage_records_owner_user_id_start_time", ["owner_user_id", "start_time"]),
+    ("device_maintenance_records", "ix_device_maintenance_records_owner_user_id_maintenance_date", ["owner_user_id", "maintenance_date"]),
+    ("security_events", "ix_security_events_house_id_event_time", ["house_id", "event_time"]),
+]
+
+
+def upgrade() -> None:
+    for table, index_name, columns in INDEXES:
+        op.create_index(f"{index_name}_id", table, columns + ["id"])
+        op.drop_index(index_name, table_name=table)
+
+
+def downgrade() -> None:
+    for table, index_name, columns in reversed(INDEXES):
+        op.create_index(index_name, table, columns)
+        op.drop_index(f"{index_name}_id", table_name=table)
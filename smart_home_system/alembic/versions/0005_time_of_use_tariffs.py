@@ -0,0 +1,68 @@
+"""add time-of-use tariffs and per-record / hourly costs
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tariffs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("house_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=True),
+        sa.Column("base_price", sa.Float(), nullable=False),
+        sa.Column("utc_offset_minutes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.ForeignKeyConstraint(["house_id"], ["houses.id"], name="fk_tariffs_house_id_houses", ondelete="CASCADE"),
+        sa.UniqueConstraint("house_id", name="uq_tariffs_house_id"),
+    )
+    op.create_index("ix_tariffs_id", "tariffs", ["id"])
+
+    op.create_table(
+        "tariff_windows",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tariff_id", sa.Integer(), nullable=False),
+        sa.Column("start_minute", sa.Integer(), nullable=False),
+        sa.Column("end_minute", sa.Integer(), nullable=False),
+        sa.Column("weekdays", sa.Integer(), nullable=False, server_default="127"),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.ForeignKeyConstraint(["tariff_id"], ["tariffs.id"], name="fk_tariff_windows_tariff_id_tariffs", ondelete="CASCADE"),
+    )
+    op.create_index("ix_tariff_windows_id", "tariff_windows", ["id"])
+    op.create_index("ix_tariff_windows_tariff_id", "tariff_windows", ["tariff_id"])
+
+    # 已有记录没有电价方案，费用为空；汇总表的费用从 0 开始
+    with op.batch_alter_table("device_usage_records") as batch_op:
+        batch_op.add_column(sa.Column("cost", sa.Float(), nullable=True))
+    with op.batch_alter_table("usage_rollup_hourly") as batch_op:
+        batch_op.add_column(sa.Column("total_cost", sa.Float(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("usage_rollup_hourly") as batch_op:
+        batch_op.drop_column("total_cost")
+    with op.batch_alter_table("device_usage_records") as batch_op:
+        batch_op.drop_column("cost")
+
+    op.drop_index("ix_tariff_windows_tariff_id", table_name="tariff_windows")
+    op.drop_index("ix_tariff_windows_id", table_name="tariff_windows")
+    op.drop_table("tariff_windows")
+    op.drop_index("ix_tariffs_id", table_name="tariffs")
+    op.drop_table("tariffs")
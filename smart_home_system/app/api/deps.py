@@ -9,7 +9,7 @@ from app import crud, models, schemas
 from app.core import security
 from app.core.config import settings
 from app.db.session import SessionLocal
-from app.core.deps import get_current_user, get_current_active_user
+from app.core.deps import get_current_user, get_current_active_user, get_cursor, get_ingestion_principal, get_ownership
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
@@ -1,30 +1,61 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
-from datetime import datetime, timedelta
+from sqlalchemy import func, desc, and_, select
+from datetime import date, datetime, timedelta
+from collections import Counter, deque
 import json
+import logging
+import numpy as np
 
-from app.core.deps import get_current_active_user, get_db
-from app.models.models import User, Device, DeviceUsageRecord, House, Room, DeviceMaintenanceRecord
+from app.core.cache import analytics_cache, device_health_cache
+from app.core.config import settings
+from app.core.deps import get_current_active_user, get_db, get_ownership
+from app.core.ownership import OwnershipResolver
+from app.core.rate_limit import HEAVY_TAG
+from app.models.models import User, Device, DeviceUsageRecord, UsageRollupHourly, House, Room, DeviceMaintenanceRecord
+from app.crud.crud_usage_rollup import hour_bucket
 from app.schemas.analytics import (
     DeviceUsageStats,
     UserHabitsAnalysis,
     EnergyConsumptionAnalysis,
+    EnergyCostAnalysis,
+    CostBreakdownItem,
     DeviceHealthAnalysis,
     SecurityAnalysis,
     DeviceTimeAnalysis,
     DeviceCorrelationAnalysis,
-    HouseAreaImpactAnalysis
+    HouseAreaImpactAnalysis,
+    PeakPowerAnalysis
 )
+from app.services.analytics_engine import (
+    MINUTES_PER_DAY,
+    SECONDS_PER_DAY,
+    SECONDS_PER_HOUR,
+    SECONDS_PER_MINUTE,
+    epoch_seconds,
+    from_epoch_seconds,
+    load_usage_arrays,
+    minute_load_curve,
+    peak_concurrent_load,
+    session_intervals
+)
+from app.services.correlation import sliding_window_pairs
+from app.services.downsampling import lttb_indices
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 设备关联分析中每个设备对返回的样本记录数
+CORRELATION_SAMPLES_PER_PAIR = 10
+
 @router.get("/devices/usage", response_model=List[DeviceUsageStats])
+@analytics_cache.cached("devices/usage")
 def analyze_device_usage(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-    days: int = 30
+    days: int = Query(30, ge=1, le=settings.ANALYTICS_MAX_DAYS)
 ):
     """
     分析设备使用情况
@@ -41,27 +72,21 @@ def analyze_device_usage(
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
     
-    # 获取所有设备的使用记录
+    # 从小时汇总表统计各设备的使用情况
     usage_records = db.query(
         Device.id,
         Device.name,
         Device.device_type,
-        func.count(DeviceUsageRecord.id).label('usage_count'),
-        func.sum(DeviceUsageRecord.duration).label('total_duration'),
-        func.sum(DeviceUsageRecord.energy_consumption).label('total_energy')
-    ).join(
-        DeviceUsageRecord,
-        Device.id == DeviceUsageRecord.device_id
+        func.sum(UsageRollupHourly.usage_count).label('usage_count'),
+        func.sum(UsageRollupHourly.total_duration).label('total_duration'),
+        func.sum(UsageRollupHourly.total_energy).label('total_energy')
     ).join(
-        Room,
-        Device.room_id == Room.id
-    ).join(
-        House,
-        Room.house_id == House.id
+        UsageRollupHourly,
+        Device.id == UsageRollupHourly.device_id
     ).filter(
-        House.user_id == current_user.id,
-        DeviceUsageRecord.start_time >= start_date,
-        DeviceUsageRecord.start_time <= end_date
+        UsageRollupHourly.owner_user_id == current_user.id,
+        UsageRollupHourly.hour_bucket >= hour_bucket(start_date),
+        UsageRollupHourly.hour_bucket <= end_date
     ).group_by(
         Device.id,
         Device.name,
@@ -81,10 +106,11 @@ def analyze_device_usage(
     ]
 
 @router.get("/user/habits", response_model=UserHabitsAnalysis)
+@analytics_cache.cached("user/habits")
 def analyze_user_habits(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-    days: int = 30
+    days: int = Query(30, ge=1, le=settings.ANALYTICS_MAX_DAYS)
 ):
     """
     分析用户使用习惯
@@ -93,38 +119,49 @@ def analyze_user_habits(
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
     
-    # 获取用户的所有设备使用记录
-    usage_records = db.query(DeviceUsageRecord).filter(
-        DeviceUsageRecord.user_id == current_user.id,
+    # 按小时和设备一次性分组统计，小时在数据库中提取
+    hour = func.extract('hour', DeviceUsageRecord.start_time)
+    usage_stats = db.query(
+        hour.label('hour'),
+        Device.name,
+        func.count(DeviceUsageRecord.id).label('usage_count'),
+        func.sum(DeviceUsageRecord.duration).label('total_duration')
+    ).outerjoin(
+        Device,
+        DeviceUsageRecord.device_id == Device.id
+    ).filter(
+        DeviceUsageRecord.owner_user_id == current_user.id,
         DeviceUsageRecord.start_time >= start_date,
         DeviceUsageRecord.start_time <= end_date
+    ).group_by(
+        hour,
+        Device.name
     ).all()
     
-    # 分析使用时间分布
+    # 分析使用时间分布和最常使用的设备
     time_distribution = {}
-    for record in usage_records:
-        hour = record.start_time.hour
-        time_distribution[hour] = time_distribution.get(hour, 0) + 1
-    
-    # 分析最常使用的设备
     device_usage = {}
-    for record in usage_records:
-        device = db.query(Device).filter(Device.id == record.device_id).first()
-        if device:
-            device_usage[device.name] = device_usage.get(device.name, 0) + 1
+    total_usage_time = 0
+    for stat in usage_stats:
+        stat_hour = int(stat.hour)
+        time_distribution[stat_hour] = time_distribution.get(stat_hour, 0) + stat.usage_count
+        if stat.name is not None:
+            device_usage[stat.name] = device_usage.get(stat.name, 0) + stat.usage_count
+        total_usage_time += stat.total_duration or 0
     
     return UserHabitsAnalysis(
         time_distribution=time_distribution,
         most_used_devices=device_usage,
-        total_usage_time=sum(record.duration or 0 for record in usage_records),
-        average_daily_usage=sum(record.duration or 0 for record in usage_records) / days
+        total_usage_time=total_usage_time,
+        average_daily_usage=total_usage_time / days
     )
 
 @router.get("/energy/consumption", response_model=EnergyConsumptionAnalysis)
+@analytics_cache.cached("energy/consumption")
 def analyze_energy_consumption(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-    days: int = 30
+    days: int = Query(30, ge=1, le=settings.ANALYTICS_MAX_DAYS)
 ):
     """
     分析能源消耗情况
@@ -133,24 +170,19 @@ def analyze_energy_consumption(
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
     
-    # 获取所有设备的能源消耗记录
+    # 从小时汇总表统计各设备的能源消耗
     energy_records = db.query(
         Device.id,
         Device.name,
-        func.sum(DeviceUsageRecord.energy_consumption).label('total_energy')
-    ).join(
-        DeviceUsageRecord,
-        Device.id == DeviceUsageRecord.device_id
+        func.sum(UsageRollupHourly.total_energy).label('total_energy'),
+        func.sum(UsageRollupHourly.total_cost).label('total_cost')
     ).join(
-        Room,
-        Device.room_id == Room.id
-    ).join(
-        House,
-        Room.house_id == House.id
+        UsageRollupHourly,
+        Device.id == UsageRollupHourly.device_id
     ).filter(
-        House.user_id == current_user.id,
-        DeviceUsageRecord.start_time >= start_date,
-        DeviceUsageRecord.start_time <= end_date
+        UsageRollupHourly.owner_user_id == current_user.id,
+        UsageRollupHourly.hour_bucket >= hour_bucket(start_date),
+        UsageRollupHourly.hour_bucket <= end_date
     ).group_by(
         Device.id,
         Device.name
@@ -166,93 +198,196 @@ def analyze_energy_consumption(
         device_consumption={
             record.name: record.total_energy or 0
             for record in energy_records
+        },
+        total_cost=sum(record.total_cost or 0 for record in energy_records),
+        device_cost={
+            record.name: record.total_cost or 0
+            for record in energy_records
         }
     )
 
-@router.get("/devices/health", response_model=List[DeviceHealthAnalysis])
-def analyze_device_health(
+def _cost_items(totals: Dict[int, List[Any]]) -> List[CostBreakdownItem]:
+    """{id: [名称, 能耗, 费用]} -> 按费用降序的明细"""
+    items = [
+        CostBreakdownItem(id=item_id, name=name, energy=energy, cost=cost)
+        for item_id, (name, energy, cost) in totals.items()
+    ]
+    items.sort(key=lambda item: (-item.cost, item.id))
+    return items
+
+@router.get("/energy/cost", response_model=EnergyCostAnalysis)
+@analytics_cache.cached("energy/cost")
+def analyze_energy_cost(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    days: int = Query(30, ge=1, le=settings.ANALYTICS_MAX_DAYS)
 ):
     """
-    分析设备健康状态
+    按分时电价分析能源费用，给出设备、房间、房屋三级明细
+
+    费用在写入使用记录时按房屋的电价方案计算并累加到小时汇总中（电价方案变更时
+    整体重算），这里只对小时汇总按设备求和，再在内存中汇总到房间和房屋。
     """
-    # 获取用户的所有设备
-    devices = db.query(Device).join(
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=days)
+    
+    # 先在小时汇总表上按设备求和，再关联设备、房间、房屋取名称（只关联聚合后的行）
+    totals = db.query(
+        UsageRollupHourly.device_id,
+        func.sum(UsageRollupHourly.total_energy).label('total_energy'),
+        func.sum(UsageRollupHourly.total_cost).label('total_cost')
+    ).filter(
+        UsageRollupHourly.owner_user_id == current_user.id,
+        UsageRollupHourly.hour_bucket >= hour_bucket(start_date),
+        UsageRollupHourly.hour_bucket <= end_date
+    ).group_by(
+        UsageRollupHourly.device_id
+    ).subquery()
+    
+    rows = db.query(
+        Device.id,
+        Device.name,
+        Room.id.label('room_id'),
+        Room.name.label('room_name'),
+        House.id.label('house_id'),
+        House.name.label('house_name'),
+        totals.c.total_energy,
+        totals.c.total_cost
+    ).join(
+        totals,
+        Device.id == totals.c.device_id
+    ).join(
         Room,
         Device.room_id == Room.id
     ).join(
         House,
         Room.house_id == House.id
-    ).filter(
-        House.user_id == current_user.id
     ).all()
     
-    health_analysis = []
-    for device in devices:
-        # 获取设备最近的使用记录
-        recent_usage = db.query(DeviceUsageRecord).filter(
-            DeviceUsageRecord.device_id == device.id
-        ).order_by(
-            desc(DeviceUsageRecord.start_time)
-        ).first()
-        
-        # 获取设备最近的维护记录
-        recent_maintenance = db.query(DeviceMaintenanceRecord).filter(
-            DeviceMaintenanceRecord.device_id == device.id
-        ).order_by(
-            desc(DeviceMaintenanceRecord.maintenance_date)
-        ).first()
+    devices: Dict[int, List[Any]] = {}
+    rooms: Dict[int, List[Any]] = {}
+    houses: Dict[int, List[Any]] = {}
+    for row in rows:
+        energy, cost = row.total_energy or 0, row.total_cost or 0
+        devices[row.id] = [row.name, energy, cost]
+        for bucket, key, name in ((rooms, row.room_id, row.room_name), (houses, row.house_id, row.house_name)):
+            total = bucket.setdefault(key, [name, 0.0, 0.0])
+            total[1] += energy
+            total[2] += cost
+    
+    return EnergyCostAnalysis(
+        total_energy=sum(total[1] for total in devices.values()),
+        total_cost=sum(total[2] for total in devices.values()),
+        devices=_cost_items(devices),
+        rooms=_cost_items(rooms),
+        houses=_cost_items(houses)
+    )
+
+@router.get("/devices/health", response_model=List[DeviceHealthAnalysis])
+@analytics_cache.cached("devices/health")
+def analyze_device_health(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    ownership: OwnershipResolver = Depends(get_ownership)
+):
+    """
+    分析设备健康状态
+    """
+    # 获取用户的所有设备
+    device_ids = sorted(ownership.device_ids)
+    
+    health_by_device = {}
+    missing_ids = []
+    for device_id in device_ids:
+        cached = device_health_cache.get(device_id)
+        if cached is None:
+            missing_ids.append(device_id)
+        else:
+            health_by_device[device_id] = cached
+    
+    if missing_ids:
+        # 一次查询取出所有未缓存设备的最近使用时间和最近维护时间
+        last_usage = select(
+            func.max(DeviceUsageRecord.start_time)
+        ).where(
+            DeviceUsageRecord.device_id == Device.id
+        ).correlate(Device).scalar_subquery()
+        last_maintenance = select(
+            func.max(DeviceMaintenanceRecord.maintenance_date)
+        ).where(
+            DeviceMaintenanceRecord.device_id == Device.id
+        ).correlate(Device).scalar_subquery()
         
-        # 计算健康分数
-        health_score = calculate_health_score(device, recent_usage, recent_maintenance)
+        rows = db.query(
+            Device.id,
+            Device.name,
+            Device.status,
+            last_usage.label('last_usage'),
+            last_maintenance.label('last_maintenance')
+        ).filter(
+            Device.id.in_(missing_ids)
+        ).all()
         
-        health_analysis.append(
-            DeviceHealthAnalysis(
-                device_id=device.id,
-                device_name=device.name,
-                status=device.status,
-                last_usage=recent_usage.start_time if recent_usage else None,
-                last_maintenance=recent_maintenance.maintenance_date if recent_maintenance else None,
-                health_score=health_score
+        # 整批计算健康分数并写入缓存
+        now = datetime.utcnow()
+        for row in rows:
+            health = DeviceHealthAnalysis(
+                device_id=row.id,
+                device_name=row.name,
+                status=row.status,
+                last_usage=row.last_usage,
+                last_maintenance=row.last_maintenance,
+                health_score=calculate_health_score(row.status, row.last_usage, row.last_maintenance, now)
             )
-        )
+            device_health_cache.set(row.id, health)
+            health_by_device[row.id] = health
     
-    return health_analysis
+    return [
+        health_by_device[device_id]
+        for device_id in device_ids
+        if device_id in health_by_device
+    ]
 
-def calculate_health_score(device, recent_usage, recent_maintenance):
+def calculate_health_score(
+    status: str,
+    last_usage: Optional[datetime],
+    last_maintenance: Optional[datetime],
+    now: Optional[datetime] = None
+) -> float:
     """
     计算设备健康分数
     """
+    now = now or datetime.utcnow()
     score = 100.0
     
     # 根据设备状态调整分数
-    if device.status == "offline":
+    if status == "offline":
         score -= 30
-    elif device.status == "error":
+    elif status == "error":
         score -= 50
-    elif device.status == "maintenance":
+    elif status == "maintenance":
         score -= 20
     
     # 根据最近使用情况调整分数
-    if recent_usage:
-        days_since_last_usage = (datetime.utcnow() - recent_usage.start_time).days
+    if last_usage:
+        days_since_last_usage = (now - last_usage).days
         if days_since_last_usage > 30:
             score -= 10
     
     # 根据最近维护情况调整分数
-    if recent_maintenance:
-        days_since_last_maintenance = (datetime.utcnow() - recent_maintenance.maintenance_date).days
+    if last_maintenance:
+        days_since_last_maintenance = (now - last_maintenance).days
         if days_since_last_maintenance > 180:  # 超过6个月未维护
             score -= 20
     
     return max(0, min(100, score))  # 确保分数在0-100之间
 
 @router.get("/devices/usage-frequency", response_model=List[DeviceUsageStats])
+@analytics_cache.cached("devices/usage-frequency")
 def analyze_device_usage_frequency(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-    days: int = 30
+    days: int = Query(30, ge=1, le=settings.ANALYTICS_MAX_DAYS)
 ):
     """
     分析设备使用频率
@@ -261,27 +396,21 @@ def analyze_device_usage_frequency(
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
     
-    # 获取用户的所有设备使用记录
+    # 从小时汇总表统计各设备的使用频率
     usage_stats = db.query(
         Device.id,
         Device.name,
         Device.device_type,
-        func.count(DeviceUsageRecord.id).label('usage_count'),
-        func.avg(DeviceUsageRecord.duration).label('avg_duration'),
-        func.sum(DeviceUsageRecord.energy_consumption).label('total_energy')
-    ).join(
-        DeviceUsageRecord,
-        Device.id == DeviceUsageRecord.device_id
-    ).join(
-        Room,
-        Device.room_id == Room.id
+        func.sum(UsageRollupHourly.usage_count).label('usage_count'),
+        func.sum(UsageRollupHourly.total_duration).label('total_duration'),
+        func.sum(UsageRollupHourly.total_energy).label('total_energy')
     ).join(
-        House,
-        Room.house_id == House.id
+        UsageRollupHourly,
+        Device.id == UsageRollupHourly.device_id
     ).filter(
-        House.user_id == current_user.id,
-        DeviceUsageRecord.start_time >= start_date,
-        DeviceUsageRecord.start_time <= end_date
+        UsageRollupHourly.owner_user_id == current_user.id,
+        UsageRollupHourly.hour_bucket >= hour_bucket(start_date),
+        UsageRollupHourly.hour_bucket <= end_date
     ).group_by(
         Device.id,
         Device.name,
@@ -294,17 +423,18 @@ def analyze_device_usage_frequency(
             device_name=stat.name,
             device_type=stat.device_type,
             usage_count=stat.usage_count,
-            total_duration=stat.avg_duration or 0,
+            total_duration=(stat.total_duration or 0) / stat.usage_count if stat.usage_count else 0,
             total_energy=stat.total_energy or 0
         )
         for stat in usage_stats
     ]
 
 @router.get("/devices/usage-time", response_model=DeviceTimeAnalysis)
+@analytics_cache.cached("devices/usage-time")
 def analyze_device_usage_time(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-    days: int = 30
+    days: int = Query(30, ge=1, le=settings.ANALYTICS_MAX_DAYS)
 ):
     """
     分析设备使用时间段
@@ -313,50 +443,48 @@ def analyze_device_usage_time(
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
     
-    # 获取用户的所有设备使用记录
-    usage_records = db.query(DeviceUsageRecord).join(
+    # 按小时和设备类型一次性分组统计，小时在数据库中提取
+    hour = func.extract('hour', DeviceUsageRecord.start_time)
+    usage_stats = db.query(
+        hour.label('hour'),
+        Device.device_type,
+        func.count(DeviceUsageRecord.id).label('usage_count')
+    ).join(
         Device,
         DeviceUsageRecord.device_id == Device.id
-    ).join(
-        Room,
-        Device.room_id == Room.id
-    ).join(
-        House,
-        Room.house_id == House.id
     ).filter(
-        House.user_id == current_user.id,
+        DeviceUsageRecord.owner_user_id == current_user.id,
         DeviceUsageRecord.start_time >= start_date,
         DeviceUsageRecord.start_time <= end_date
+    ).group_by(
+        hour,
+        Device.device_type
     ).all()
     
-    # 按小时统计使用次数
+    # 按小时和设备类型汇总使用次数
     hourly_usage = {hour: 0 for hour in range(24)}
-    for record in usage_records:
-        hour = record.start_time.hour
-        hourly_usage[hour] += 1
-    
-    # 按设备类型统计使用次数
     device_type_usage = {}
-    for record in usage_records:
-        device = db.query(Device).filter(Device.id == record.device_id).first()
-        if device:
-            device_type = device.device_type
-            if device_type not in device_type_usage:
-                device_type_usage[device_type] = {hour: 0 for hour in range(24)}
-            hour = record.start_time.hour
-            device_type_usage[device_type][hour] += 1
+    for stat in usage_stats:
+        stat_hour = int(stat.hour)
+        hourly_usage[stat_hour] += stat.usage_count
+        if stat.device_type not in device_type_usage:
+            device_type_usage[stat.device_type] = {hour: 0 for hour in range(24)}
+        device_type_usage[stat.device_type][stat_hour] += stat.usage_count
     
     return DeviceTimeAnalysis(
         hourly_usage=hourly_usage,
         device_type_usage=device_type_usage
     )
 
-@router.get("/devices/correlation", response_model=DeviceCorrelationAnalysis)
+@router.get("/devices/correlation", response_model=DeviceCorrelationAnalysis, tags=[HEAVY_TAG])
+@analytics_cache.cached("devices/correlation")
 def analyze_device_correlation(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-    days: int = 30,
-    time_window: int = 5  # 时间窗口（分钟）
+    ownership: OwnershipResolver = Depends(get_ownership),
+    days: int = Query(30, ge=1, le=settings.ANALYTICS_MAX_DAYS),
+    time_window: int = Query(5, ge=0, le=settings.CORRELATION_MAX_TIME_WINDOW),  # 时间窗口（分钟）
+    top_k: int = Query(20, ge=1, le=settings.CORRELATION_MAX_TOP_K)  # 返回关联次数最多的设备对数量
 ):
     """
     分析设备之间的使用关联性
@@ -365,52 +493,56 @@ def analyze_device_correlation(
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
     
-    # 获取用户的所有设备使用记录
-    usage_records = db.query(DeviceUsageRecord).join(
-        Device,
-        DeviceUsageRecord.device_id == Device.id
-    ).join(
-        Room,
-        Device.room_id == Room.id
-    ).join(
-        House,
-        Room.house_id == House.id
+    # 一次性解析设备名称
+    device_names = dict(
+        db.query(Device.id, Device.name).filter(
+            Device.id.in_(ownership.device_ids)
+        ).all()
+    )
+    
+    # 只取设备ID和开始时间，按开始时间排序
+    usage_events = db.query(
+        DeviceUsageRecord.device_id,
+        DeviceUsageRecord.start_time
     ).filter(
-        House.user_id == current_user.id,
+        DeviceUsageRecord.owner_user_id == current_user.id,
         DeviceUsageRecord.start_time >= start_date,
         DeviceUsageRecord.start_time <= end_date
     ).order_by(
         DeviceUsageRecord.start_time
     ).all()
     
-    # 分析设备同时使用情况
+    # 滑动窗口统计设备同时使用情况，每个设备对只保留最近的若干条样本
+    pair_counts = Counter()
+    pair_samples = {}
+    for (device1, time1), (device2, time2), time_diff in sliding_window_pairs(
+        usage_events, timedelta(minutes=time_window)
+    ):
+        pair = (device1, device2)
+        pair_counts[pair] += 1
+        if pair not in pair_samples:
+            pair_samples[pair] = deque(maxlen=CORRELATION_SAMPLES_PER_PAIR)
+        pair_samples[pair].append((time1, time2, time_diff))
+    
+    # 只返回关联次数最多的 top_k 个设备对
     correlations = []
-    for i, record1 in enumerate(usage_records):
-        device1 = db.query(Device).filter(Device.id == record1.device_id).first()
-        if not device1:
-            continue
-            
-        for record2 in usage_records[i+1:]:
-            device2 = db.query(Device).filter(Device.id == record2.device_id).first()
-            if not device2:
-                continue
-                
-            # 检查两个设备的使用时间是否在时间窗口内
-            time_diff = abs((record2.start_time - record1.start_time).total_seconds() / 60)
-            if time_diff <= time_window:
-                correlations.append({
-                    "device1": device1.name,
-                    "device2": device2.name,
-                    "time1": record1.start_time,
-                    "time2": record2.start_time,
-                    "time_diff": time_diff
-                })
-    
-    # 统计设备关联次数
     correlation_count = {}
-    for corr in correlations:
-        key = f"{corr['device1']}-{corr['device2']}"
-        correlation_count[key] = correlation_count.get(key, 0) + 1
+    for (device1, device2), count in pair_counts.most_common(top_k):
+        name1 = device_names.get(device1, f"设备{device1}")
+        name2 = device_names.get(device2, f"设备{device2}")
+        key = f"{name1}-{name2}"
+        correlation_count[key] = correlation_count.get(key, 0) + count
+        correlations.extend(
+            {
+                "device1": name1,
+                "device2": name2,
+                "time1": time1,
+                "time2": time2,
+                "time_diff": time_diff
+            }
+            for time1, time2, time_diff in pair_samples[(device1, device2)]
+        )
+    correlations.sort(key=lambda corr: corr["time1"])
     
     return DeviceCorrelationAnalysis(
         correlations=correlations,
@@ -418,10 +550,11 @@ def analyze_device_correlation(
     )
 
 @router.get("/house/area-impact", response_model=HouseAreaImpactAnalysis)
+@analytics_cache.cached("house/area-impact")
 def analyze_house_area_impact(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-    days: int = 30
+    days: int = Query(30, ge=1, le=settings.ANALYTICS_MAX_DAYS)
 ):
     """
     分析房屋面积对设备使用行为的影响
@@ -433,37 +566,41 @@ def analyze_house_area_impact(
     # 获取用户的所有房屋
     houses = db.query(House).filter(House.user_id == current_user.id).all()
     
+    # 从小时汇总表按房屋和设备类型一次性统计
+    usage_stats = db.query(
+        UsageRollupHourly.house_id,
+        Device.device_type,
+        func.sum(UsageRollupHourly.usage_count).label('usage_count'),
+        func.sum(UsageRollupHourly.total_energy).label('total_energy')
+    ).join(
+        UsageRollupHourly,
+        Device.id == UsageRollupHourly.device_id
+    ).filter(
+        UsageRollupHourly.owner_user_id == current_user.id,
+        UsageRollupHourly.hour_bucket >= hour_bucket(start_date),
+        UsageRollupHourly.hour_bucket <= end_date
+    ).group_by(
+        UsageRollupHourly.house_id,
+        Device.device_type
+    ).all()
+    
+    stats_by_house = {}
+    for stat in usage_stats:
+        stats_by_house.setdefault(stat.house_id, []).append(stat)
+    
     house_stats = []
     for house in houses:
-        # 获取房屋的所有设备使用记录
-        usage_stats = db.query(
-            Device.device_type,
-            func.count(DeviceUsageRecord.id).label('usage_count'),
-            func.sum(DeviceUsageRecord.energy_consumption).label('total_energy')
-        ).join(
-            DeviceUsageRecord,
-            Device.id == DeviceUsageRecord.device_id
-        ).join(
-            Room,
-            Device.room_id == Room.id
-        ).filter(
-            Room.house_id == house.id,
-            DeviceUsageRecord.start_time >= start_date,
-            DeviceUsageRecord.start_time <= end_date
-        ).group_by(
-            Device.device_type
-        ).all()
-        
         # 计算每平方米的使用频率和能耗
         device_stats = []
-        for stat in usage_stats:
+        for stat in stats_by_house.get(house.id, []):
+            total_energy = stat.total_energy or 0
             usage_per_sqm = stat.usage_count / house.area if house.area > 0 else 0
-            energy_per_sqm = stat.total_energy / house.area if house.area > 0 else 0
+            energy_per_sqm = total_energy / house.area if house.area > 0 else 0
             
             device_stats.append({
                 "type": stat.device_type,
                 "usage_count": stat.usage_count,
-                "total_energy": stat.total_energy or 0,
+                "total_energy": total_energy,
                 "usage_per_sqm": usage_per_sqm,
                 "energy_per_sqm": energy_per_sqm
             })
@@ -475,4 +612,123 @@ def analyze_house_area_impact(
             "device_stats": device_stats
         })
     
-    return HouseAreaImpactAnalysis(house_stats=house_stats) 
\ No newline at end of file
+    return HouseAreaImpactAnalysis(house_stats=house_stats)
+
+def _house_day_loads(db: Session, user_id: int, house_id: int, days: List[date]) -> Dict[date, Dict[str, Any]]:
+    """
+    房屋每天的分钟级负荷曲线与同时功率峰值，按 (房屋, 日) 缓存
+
+    缓存键带有用户分析缓存的版本号，写入使用记录时随其他分析结果一起失效。未命中的
+    日期用一次查询读取，向前多读 PEAK_POWER_LOOKBACK_HOURS 小时以包含跨日的使用。
+    """
+    loads = {}
+    keys = {}
+    for day in days:
+        try:
+            keys[day] = analytics_cache.make_key(
+                user_id, "house/peak-power/day", {"house_id": house_id, "day": day}
+            )
+            cached = analytics_cache.get(keys[day])
+            if cached is not None:
+                loads[day] = cached
+        except Exception as e:
+            logger.error("读取负荷曲线缓存失败: %s", e)
+    
+    missing = [day for day in days if day not in loads]
+    if not missing:
+        return loads
+    
+    range_start = datetime.combine(missing[0], datetime.min.time())
+    range_end = datetime.combine(missing[-1], datetime.min.time()) + timedelta(days=1)
+    usage = load_usage_arrays(
+        db,
+        ("start", "duration", "energy"),
+        DeviceUsageRecord.house_id == house_id,
+        DeviceUsageRecord.start_time >= range_start - timedelta(hours=settings.PEAK_POWER_LOOKBACK_HOURS),
+        DeviceUsageRecord.start_time < range_end
+    )
+    starts, ends, power = session_intervals(usage)
+    lookback = settings.PEAK_POWER_LOOKBACK_HOURS * SECONDS_PER_HOUR
+    
+    for day in missing:
+        origin = epoch_seconds(datetime.combine(day, datetime.min.time()))
+        # 会话按开始时间排序，只取可能与当天重叠的一段，再裁剪到当天范围内
+        first, last = np.searchsorted(starts, [origin - lookback, origin + SECONDS_PER_DAY])
+        day_starts = np.maximum(starts[first:last], origin)
+        day_ends = np.minimum(ends[first:last], origin + SECONDS_PER_DAY)
+        overlap = day_starts < day_ends
+        day_starts, day_ends, day_power = day_starts[overlap], day_ends[overlap], power[first:last][overlap]
+        
+        peak_power, peak_at = peak_concurrent_load(day_starts, day_ends, day_power)
+        curve = minute_load_curve(day_starts, day_ends, day_power, origin, MINUTES_PER_DAY)
+        loads[day] = {
+            "peak_power": round(peak_power, 6),
+            "peak_at": peak_at,
+            "load": np.round(curve, 6).tolist()
+        }
+        if day in keys:
+            try:
+                analytics_cache.set(keys[day], loads[day], ttl=settings.PEAK_POWER_CACHE_TTL)
+            except Exception as e:
+                logger.error("写入负荷曲线缓存失败: %s", e)
+    return loads
+
+@router.get("/house/{house_id}/peak-power", response_model=PeakPowerAnalysis, tags=[HEAVY_TAG])
+def analyze_house_peak_power(
+    house_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    ownership: OwnershipResolver = Depends(get_ownership),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    max_points: int = Query(settings.PEAK_POWER_CURVE_POINTS, ge=3)
+):
+    """
+    分析房屋的同时功率峰值与负荷曲线
+
+    每次使用的平均功率按 能耗 / 时长 计算，同一时刻所有进行中的使用功率之和即为该时刻的
+    负荷。峰值为日期范围内负荷的最大值及其出现时刻（精确到秒）；负荷曲线为每分钟的平均
+    功率，用 LTTB 降采样到不超过 max_points 个点。日期按 UTC 计算，默认为今天。
+    """
+    if not ownership.owns_house(house_id):
+        if not db.query(House.id).filter(House.id == house_id).first():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="房屋不存在"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="没有权限访问此房屋"
+        )
+    
+    end_date = end_date or datetime.utcnow().date()
+    start_date = start_date or end_date
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="开始日期不能晚于结束日期"
+        )
+    if (end_date - start_date).days >= settings.ANALYTICS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"日期范围不能超过 {settings.ANALYTICS_MAX_DAYS} 天"
+        )
+    
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    loads = _house_day_loads(db, current_user.id, house_id, days)
+    
+    # 取各天峰值中的最大值，相同时取最早的一天
+    peak_day = max(days, key=lambda day: loads[day]["peak_power"])
+    peak_at = loads[peak_day]["peak_at"]
+    
+    curve = np.concatenate([np.asarray(loads[day]["load"], dtype=np.float64) for day in days])
+    indices = lttb_indices(np.arange(len(curve)), curve, max_points)
+    origin = epoch_seconds(datetime.combine(start_date, datetime.min.time()))
+    
+    return PeakPowerAnalysis(
+        house_id=house_id,
+        peak_power=loads[peak_day]["peak_power"],
+        peak_time=from_epoch_seconds(peak_at) if peak_at is not None else None,
+        timestamps=[from_epoch_seconds(origin + int(index) * SECONDS_PER_MINUTE) for index in indices],
+        load=curve[indices].tolist()
+    )
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form, Body
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Awaitable
 import logging
 
 from app import crud, models, schemas
@@ -19,8 +20,19 @@ from app.utils import (
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+async def _run_password_hasher(task: Awaitable[Any]) -> Any:
+    """等待密码哈希任务，队列已满时返回 503"""
+    try:
+        return await task
+    except security.PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="请求过多，请稍后重试",
+            headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)}
+        )
+
 @router.post("/register", response_model=schemas.User)
-def register(*, db: Session = Depends(deps.get_db), user_in: schemas.UserCreate) -> Any:
+async def register(*, db: Session = Depends(deps.get_db), user_in: schemas.UserCreate) -> Any:
     """
     注册新用户
     
@@ -33,17 +45,22 @@ def register(*, db: Session = Depends(deps.get_db), user_in: schemas.UserCreate)
     返回:
     - 创建的用户信息
     """
-    user = crud.crud_user.get_by_email(db, email=user_in.email)
+    user = await run_in_threadpool(crud.crud_user.get_by_email, db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="该邮箱已被注册"
         )
-    user = crud.crud_user.create(db, obj_in=user_in)
+    hashed_password = await _run_password_hasher(
+        security.password_hasher.hash(user_in.password)
+    )
+    user = await run_in_threadpool(
+        crud.crud_user.create, db, obj_in=user_in, hashed_password=hashed_password
+    )
     return user
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     db: Session = Depends(deps.get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
@@ -57,9 +74,11 @@ def login(
     - access_token: 访问令牌
     - token_type: 令牌类型
     """
-    user = crud.crud_user.authenticate(
-        db, email=form_data.username, password=form_data.password
-    )
+    user = await run_in_threadpool(crud.crud_user.get_by_email, db, email=form_data.username)
+    if user and not await _run_password_hasher(
+        security.password_hasher.verify(form_data.password, user.hashed_password)
+    ):
+        user = None
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,10 +1,13 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from datetime import datetime
 import json
 
-from app.core.deps import get_current_active_user, get_db
+from app.core.cache import analytics_cache, device_health_cache
+from app.core.deps import get_current_active_user, get_cursor, get_db, get_ownership
+from app.core.ownership import OwnershipResolver
+from app.core.pagination import NEXT_CURSOR_HEADER, Cursor, keyset_paginate, next_cursor
 from app.models.models import User, Device, DeviceMaintenanceRecord, Room, House
 from app.schemas.device_maintenance import (
     DeviceMaintenanceRecordCreate,
@@ -19,22 +22,15 @@ def create_device_maintenance_record(
     *,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    ownership: OwnershipResolver = Depends(get_ownership),
     record_in: DeviceMaintenanceRecordCreate
 ):
     """
     创建设备维护记录
     """
     # 验证设备是否存在且属于当前用户
-    device = db.query(Device).join(
-        Room
-    ).join(
-        House
-    ).filter(
-        Device.id == record_in.device_id,
-        House.user_id == current_user.id
-    ).first()
-    
-    if not device:
+    house_id = ownership.house_of_device(record_in.device_id)
+    if house_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="设备不存在或不属于当前用户"
@@ -43,6 +39,8 @@ def create_device_maintenance_record(
     # 创建维护记录
     db_record = DeviceMaintenanceRecord(
         device_id=record_in.device_id,
+        house_id=house_id,
+        owner_user_id=current_user.id,
         maintenance_type=record_in.maintenance_type,
         maintenance_date=record_in.maintenance_date,
         description=record_in.description,
@@ -53,28 +51,28 @@ def create_device_maintenance_record(
     db.add(db_record)
     db.commit()
     db.refresh(db_record)
+    device_health_cache.pop(db_record.device_id)
+    analytics_cache.invalidate_user(current_user.id)
     return db_record
 
 @router.get("/", response_model=List[DeviceMaintenanceRecordSchema])
 def get_device_maintenance_records(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
     device_id: Optional[int] = None,
     maintenance_type: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[Cursor] = Depends(get_cursor)
 ):
     """
     获取设备维护记录列表
+
+    按维护日期倒序，下一页游标在响应头 X-Next-Cursor 中，传入 cursor 时忽略 skip。
     """
-    query = db.query(DeviceMaintenanceRecord).join(
-        Device
-    ).join(
-        Room
-    ).join(
-        House
-    ).filter(
-        House.user_id == current_user.id
+    query = db.query(DeviceMaintenanceRecord).filter(
+        DeviceMaintenanceRecord.owner_user_id == current_user.id
     )
     
     if device_id:
@@ -82,10 +80,18 @@ def get_device_maintenance_records(
     if maintenance_type:
         query = query.filter(DeviceMaintenanceRecord.maintenance_type == maintenance_type)
     
-    records = query.order_by(
-        DeviceMaintenanceRecord.maintenance_date.desc()
-    ).offset(skip).limit(limit).all()
+    records = keyset_paginate(
+        query,
+        DeviceMaintenanceRecord.maintenance_date,
+        DeviceMaintenanceRecord.id,
+        cursor=cursor,
+        skip=skip,
+        limit=limit
+    ).all()
     
+    cursor_value = next_cursor(records, limit, "maintenance_date")
+    if cursor_value:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_value
     return records
 
 @router.get("/{record_id}", response_model=DeviceMaintenanceRecordSchema)
@@ -97,15 +103,9 @@ def get_device_maintenance_record(
     """
     获取单个设备维护记录
     """
-    record = db.query(DeviceMaintenanceRecord).join(
-        Device
-    ).join(
-        Room
-    ).join(
-        House
-    ).filter(
+    record = db.query(DeviceMaintenanceRecord).filter(
         DeviceMaintenanceRecord.id == record_id,
-        House.user_id == current_user.id
+        DeviceMaintenanceRecord.owner_user_id == current_user.id
     ).first()
     
     if not record:
@@ -127,15 +127,9 @@ def update_device_maintenance_record(
     """
     更新设备维护记录
     """
-    record = db.query(DeviceMaintenanceRecord).join(
-        Device
-    ).join(
-        Room
-    ).join(
-        House
-    ).filter(
+    record = db.query(DeviceMaintenanceRecord).filter(
         DeviceMaintenanceRecord.id == record_id,
-        House.user_id == current_user.id
+        DeviceMaintenanceRecord.owner_user_id == current_user.id
     ).first()
     
     if not record:
@@ -152,6 +146,8 @@ def update_device_maintenance_record(
     db.add(record)
     db.commit()
     db.refresh(record)
+    device_health_cache.pop(record.device_id)
+    analytics_cache.invalidate_user(current_user.id)
     return record
 
 @router.delete("/{record_id}", response_model=DeviceMaintenanceRecordSchema)
@@ -163,15 +159,9 @@ def delete_device_maintenance_record(
     """
     删除设备维护记录
     """
-    record = db.query(DeviceMaintenanceRecord).join(
-        Device
-    ).join(
-        Room
-    ).join(
-        House
-    ).filter(
+    record = db.query(DeviceMaintenanceRecord).filter(
         DeviceMaintenanceRecord.id == record_id,
-        House.user_id == current_user.id
+        DeviceMaintenanceRecord.owner_user_id == current_user.id
     ).first()
     
     if not record:
@@ -186,5 +176,7 @@ def delete_device_maintenance_record(
     # 删除记录
     db.delete(record)
     db.commit()
+    device_health_cache.pop(record_copy.device_id)
+    analytics_cache.invalidate_user(current_user.id)
     
     return record_copy 
\ No newline at end of file
@@ -1,64 +1,318 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+import json
 
-from app.core.deps import get_current_active_user, get_db
+from app.core.cache import analytics_cache, device_health_cache
+from app.core.deps import get_current_active_user, get_cursor, get_db, get_ingestion_principal
+from app.core.device_keys import DevicePrincipal
+from app.core.ownership import OwnershipResolver
+from app.core.pagination import Cursor, cursor_headers, keyset_paginate, next_cursor
+from app.core.serialization import RowSerializer
+from app.crud.crud_usage_rollup import crud_usage_rollup
 from app.models.models import User, Device, DeviceUsageRecord, Room, House
 from app.schemas.device_usage import (
     DeviceUsageRecordCreate,
     DeviceUsageRecordUpdate,
-    DeviceUsageRecord as DeviceUsageRecordSchema
+    DeviceUsageRecord as DeviceUsageRecordSchema,
+    DeviceUsageBulkLineResult,
+    DeviceUsageBulkResult
+)
+from app.services.tariff import assign_costs
+from app.services.usage_export import (
+    EXPORT_FORMATS,
+    batched,
+    gzip_stream,
+    iter_csv,
+    iter_ndjson,
+    iter_parquet,
+    parquet_available
 )
 
 router = APIRouter()
 
+# 批量导入时每个事务写入的最大记录数
+BULK_CHUNK_SIZE = 500
+
+# 导出时每批从数据库读取并输出的记录数
+EXPORT_BATCH_SIZE = 5000
+
+# 数据写入方：用户（按令牌认证）或设备（按设备密钥签名认证）
+IngestionPrincipal = Union[OwnershipResolver, DevicePrincipal]
+
+usage_serializer = RowSerializer(DeviceUsageRecordSchema, DeviceUsageRecord)
+
+def _usage_duration(start_time: datetime, end_time: datetime) -> int:
+    """使用时长（整分钟，不足一分钟的部分舍去）"""
+    return int((end_time - start_time).total_seconds() / 60)
+
+def _build_usage_values(record_in: DeviceUsageRecordCreate, user_id: int, house_id: int) -> Dict[str, Any]:
+    """
+    根据请求数据构造使用记录的字段值
+
+    house_id 与 owner_user_id 为冗余的归属字段，调用方需已验证设备属于 user_id 所有的房屋。
+    """
+    metadata = record_in.usage_metadata or {}
+    return dict(
+        device_id=record_in.device_id,
+        user_id=user_id,
+        house_id=house_id,
+        owner_user_id=user_id,
+        start_time=record_in.start_time,
+        end_time=record_in.end_time,
+        duration=_usage_duration(record_in.start_time, record_in.end_time),
+        energy_consumption=record_in.energy_consumption,
+        usage_scenario=metadata.get("usage_scenario", "日常使用"),
+        usage_purpose=metadata.get("usage_purpose", "其他"),
+        temperature=metadata.get("temperature", 25.0),
+        humidity=metadata.get("humidity", 50.0),
+        is_automated=metadata.get("is_automated", False)
+    )
+
 @router.post("/", response_model=DeviceUsageRecordSchema)
 def create_device_usage_record(
     *,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    principal: IngestionPrincipal = Depends(get_ingestion_principal),
     record_in: DeviceUsageRecordCreate
 ):
     """
     创建设备使用记录
+
+    除用户令牌外也接受设备签名认证（X-Device-Id / X-Timestamp / X-Signature），
+    设备只能写入自己的使用记录。
     """
-    # 验证设备是否存在且属于当前用户
-    device = db.query(Device).join(
-        Room
-    ).join(
-        House
-    ).filter(
-        Device.id == record_in.device_id,
-        House.user_id == current_user.id
-    ).first()
-    
-    if not device:
+    # 验证设备是否存在且属于当前写入方
+    house_id = principal.house_of_device(record_in.device_id)
+    if house_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="设备不存在或不属于当前用户"
         )
     
     # 创建使用记录
-    db_record = DeviceUsageRecord(
-        device_id=record_in.device_id,
-        user_id=current_user.id,
-        start_time=record_in.start_time,
-        end_time=record_in.end_time,
-        duration=int((record_in.end_time - record_in.start_time).total_seconds() / 60),  # 计算使用时长（分钟）
-        energy_consumption=record_in.energy_consumption,
-        usage_scenario=record_in.usage_metadata.get("usage_scenario", "日常使用") if record_in.usage_metadata else "日常使用",
-        usage_purpose=record_in.usage_metadata.get("usage_purpose", "其他") if record_in.usage_metadata else "其他",
-        temperature=record_in.usage_metadata.get("temperature", 25.0) if record_in.usage_metadata else 25.0,
-        humidity=record_in.usage_metadata.get("humidity", 50.0) if record_in.usage_metadata else 50.0,
-        is_automated=record_in.usage_metadata.get("is_automated", False) if record_in.usage_metadata else False
-    )
+    db_record = DeviceUsageRecord(**_build_usage_values(record_in, principal.user_id, house_id))
     
+    assign_costs(db, [db_record])
     db.add(db_record)
+    crud_usage_rollup.apply(db, [db_record])
     db.commit()
     db.refresh(db_record)
+    device_health_cache.pop(db_record.device_id)
+    analytics_cache.invalidate_user(principal.user_id)
     return db_record
 
+async def _iter_bulk_payload(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    解析批量导入的请求体
+
+    NDJSON 请求体按行流式读取，产出 (行号, 原始字节)；
+    JSON 数组请求体整体解析，产出 (元素序号, 元素对象)。空行会被跳过。
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        line_no = 0
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for raw in lines:
+                line_no += 1
+                if raw.strip():
+                    yield line_no, raw
+        if buffer.strip():
+            yield line_no + 1, buffer
+        return
+    
+    try:
+        items = json.loads(await request.body())
+    except json.JSONDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="请求体不是合法的 JSON"
+        )
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="请求体必须是 JSON 数组或 NDJSON"
+        )
+    for index, item in enumerate(items, start=1):
+        yield index, item
+
+def _format_validation_error(exc: ValidationError) -> str:
+    """将校验错误压缩为单行说明"""
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in error['loc']) or 'body'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+def _insert_usage_rows(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """以单条批量 INSERT 写入记录并累加小时汇总，返回记录ID；只执行语句不提交"""
+    assign_costs(db, rows)
+    record_ids = db.scalars(
+        insert(DeviceUsageRecord).returning(DeviceUsageRecord.id, sort_by_parameter_order=True),
+        rows
+    ).all()
+    crud_usage_rollup.apply(db, rows)
+    return record_ids
+
+def _insert_usage_rows_one_by_one(
+    db: Session,
+    lines: List[int],
+    rows: List[Dict[str, Any]]
+) -> Tuple[List[Tuple[int, int]], List[DeviceUsageBulkLineResult]]:
+    """
+    逐行写入一批记录，每行在一个 SAVEPOINT 中执行
+
+    违反数据库约束的行回滚到各自的保存点并被拒绝，其余行照常提交。
+
+    Returns:
+        ([(行号, 记录ID)], 被拒绝行的结果)
+    """
+    written = []
+    rejected = []
+    for line_no, row in zip(lines, rows):
+        try:
+            with db.begin_nested():
+                record_ids = _insert_usage_rows(db, [row])
+        except SQLAlchemyError:
+            rejected.append(DeviceUsageBulkLineResult(
+                line=line_no, accepted=False, error="写入数据库失败"
+            ))
+        else:
+            written.append((line_no, record_ids[0]))
+    db.commit()
+    return written, rejected
+
+def _write_bulk_chunk(
+    db: Session,
+    user_id: int,
+    chunk: List[Tuple[int, DeviceUsageRecordCreate]],
+    principal: IngestionPrincipal
+) -> List[DeviceUsageBulkLineResult]:
+    """
+    校验设备归属并以单条批量 INSERT 写入一批记录，整批在一个事务中提交
+
+    整批写入违反数据库约束（IntegrityError）时改为逐行重试，只拒绝出错的行。
+    """
+    results = []
+    lines = []
+    rows = []
+    for line_no, record_in in chunk:
+        house_id = principal.house_of_device(record_in.device_id)
+        if house_id is None:
+            results.append(DeviceUsageBulkLineResult(
+                line=line_no, accepted=False, error="设备不存在或不属于当前用户"
+            ))
+            continue
+        lines.append(line_no)
+        rows.append(_build_usage_values(record_in, user_id, house_id))
+    
+    if not rows:
+        return results
+    
+    try:
+        written = list(zip(lines, _insert_usage_rows(db, rows)))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        try:
+            written, rejected = _insert_usage_rows_one_by_one(db, lines, rows)
+        except SQLAlchemyError:
+            db.rollback()
+            written, rejected = [], [
+                DeviceUsageBulkLineResult(line=line_no, accepted=False, error="写入数据库失败")
+                for line_no in lines
+            ]
+        results.extend(rejected)
+    except SQLAlchemyError:
+        db.rollback()
+        results.extend(
+            DeviceUsageBulkLineResult(line=line_no, accepted=False, error="写入数据库失败")
+            for line_no in lines
+        )
+        return results
+    
+    if written:
+        for device_id in {row["device_id"] for row in rows}:
+            device_health_cache.pop(device_id)
+        analytics_cache.invalidate_user(user_id)
+    results.extend(
+        DeviceUsageBulkLineResult(line=line_no, accepted=True, record_id=record_id)
+        for line_no, record_id in written
+    )
+    return results
+
+@router.post("/bulk", response_model=DeviceUsageBulkResult)
+async def create_device_usage_records_bulk(
+    request: Request,
+    db: Session = Depends(get_db),
+    principal: IngestionPrincipal = Depends(get_ingestion_principal)
+):
+    """
+    批量导入设备使用记录
+
+    请求体为 NDJSON（Content-Type: application/x-ndjson）或 JSON 数组，每行格式与单条创建相同。
+    记录按 BULK_CHUNK_SIZE 分批写入并分别提交，返回逐行的接受/拒绝结果，单行错误不影响其它行。
+    设备签名认证时需要先读完整个请求体校验签名，之后再逐行解析。
+    """
+    user_id = principal.user_id
+    results: List[DeviceUsageBulkLineResult] = []
+    pending: List[Tuple[int, DeviceUsageRecordCreate]] = []
+    
+    async for line_no, payload in _iter_bulk_payload(request):
+        try:
+            if isinstance(payload, bytes):
+                record_in = DeviceUsageRecordCreate.model_validate_json(payload)
+            else:
+                record_in = DeviceUsageRecordCreate.model_validate(payload)
+        except ValidationError as e:
+            results.append(DeviceUsageBulkLineResult(
+                line=line_no, accepted=False, error=_format_validation_error(e)
+            ))
+            continue
+        
+        pending.append((line_no, record_in))
+        if len(pending) >= BULK_CHUNK_SIZE:
+            results.extend(await run_in_threadpool(_write_bulk_chunk, db, user_id, pending, principal))
+            pending = []
+    
+    if pending:
+        results.extend(await run_in_threadpool(_write_bulk_chunk, db, user_id, pending, principal))
+    
+    results.sort(key=lambda result: result.line)
+    accepted = sum(1 for result in results if result.accepted)
+    return DeviceUsageBulkResult(
+        accepted=accepted,
+        rejected=len(results) - accepted,
+        results=results
+    )
+
+def _filter_usage_records(
+    query,
+    user_id: int,
+    device_id: Optional[int],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+):
+    """使用记录列表与导出共用的过滤条件"""
+    query = query.filter(
+        DeviceUsageRecord.owner_user_id == user_id
+    )
+    if device_id:
+        query = query.filter(DeviceUsageRecord.device_id == device_id)
+    if start_date:
+        query = query.filter(DeviceUsageRecord.start_time >= start_date)
+    if end_date:
+        query = query.filter(DeviceUsageRecord.end_time <= end_date)
+    return query
+
 @router.get("/", response_model=List[DeviceUsageRecordSchema])
 def get_device_usage_records(
     db: Session = Depends(get_db),
@@ -67,33 +321,80 @@ def get_device_usage_records(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[Cursor] = Depends(get_cursor)
 ):
     """
     获取设备使用记录列表
+
+    按开始时间倒序，下一页游标在响应头 X-Next-Cursor 中，传入 cursor 时忽略 skip。
     """
-    query = db.query(DeviceUsageRecord).join(
-        Device
-    ).join(
-        Room
-    ).join(
-        House
-    ).filter(
-        House.user_id == current_user.id
+    query = _filter_usage_records(
+        db.query(*usage_serializer.columns), current_user.id, device_id, start_date, end_date
     )
     
-    if device_id:
-        query = query.filter(DeviceUsageRecord.device_id == device_id)
-    if start_date:
-        query = query.filter(DeviceUsageRecord.start_time >= start_date)
-    if end_date:
-        query = query.filter(DeviceUsageRecord.end_time <= end_date)
+    rows = keyset_paginate(
+        query,
+        DeviceUsageRecord.start_time,
+        DeviceUsageRecord.id,
+        cursor=cursor,
+        skip=skip,
+        limit=limit
+    ).all()
+    
+    return usage_serializer.response(
+        rows, headers=cursor_headers(next_cursor(rows, limit, "start_time"))
+    )
+
+@router.get("/export")
+def export_device_usage_records(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    device_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+):
+    """
+    导出设备使用记录（CSV / NDJSON / Parquet）
+
+    过滤条件与列表接口相同，按开始时间升序输出全部记录。数据库结果以 yield_per 分批
+    流式读取（PostgreSQL 下为服务端游标），边读边写出，内存占用与记录总数无关。
+    请求头 Accept-Encoding 包含 gzip 时对 CSV / NDJSON 做流式 gzip 压缩；
+    Parquet 自带列压缩，不再压缩。
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet 导出需要安装 pyarrow"
+        )
+    
+    columns = usage_serializer.columns
+    rows = _filter_usage_records(
+        db.query(*columns), current_user.id, device_id, start_date, end_date
+    ).order_by(
+        DeviceUsageRecord.start_time,
+        DeviceUsageRecord.id
+    ).yield_per(EXPORT_BATCH_SIZE)
+    batches = batched(rows, EXPORT_BATCH_SIZE)
     
-    records = query.order_by(
-        DeviceUsageRecord.start_time.desc()
-    ).offset(skip).limit(limit).all()
+    if format == "csv":
+        chunks = iter_csv(batches, columns)
+    elif format == "ndjson":
+        chunks = iter_ndjson(batches, columns)
+    else:
+        chunks = iter_parquet(batches, columns)
     
-    return records
+    media_type, extension = EXPORT_FORMATS[format]
+    headers = {
+        "Content-Disposition": f'attachment; filename="device_usage_{current_user.id}.{extension}"',
+        "Vary": "Accept-Encoding"
+    }
+    if format != "parquet" and "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
 
 @router.get("/{record_id}", response_model=DeviceUsageRecordSchema)
 def get_device_usage_record(
@@ -104,15 +405,9 @@ def get_device_usage_record(
     """
     获取单个设备使用记录
     """
-    record = db.query(DeviceUsageRecord).join(
-        Device
-    ).join(
-        Room
-    ).join(
-        House
-    ).filter(
+    record = db.query(DeviceUsageRecord).filter(
         DeviceUsageRecord.id == record_id,
-        House.user_id == current_user.id
+        DeviceUsageRecord.owner_user_id == current_user.id
     ).first()
     
     if not record:
@@ -134,15 +429,9 @@ def update_device_usage_record(
     """
     更新设备使用记录
     """
-    record = db.query(DeviceUsageRecord).join(
-        Device
-    ).join(
-        Room
-    ).join(
-        House
-    ).filter(
+    record = db.query(DeviceUsageRecord).filter(
         DeviceUsageRecord.id == record_id,
-        House.user_id == current_user.id
+        DeviceUsageRecord.owner_user_id == current_user.id
     ).first()
     
     if not record:
@@ -151,13 +440,20 @@ def update_device_usage_record(
             detail="使用记录不存在或不属于当前用户"
         )
     
-    # 更新记录
+    # 更新记录，同时把旧值从小时汇总中扣除、再累加新值
+    crud_usage_rollup.apply(db, [record], sign=-1)
     for field, value in record_in.dict(exclude_unset=True).items():
         setattr(record, field, value)
+    if record.start_time and record.end_time:
+        record.duration = _usage_duration(record.start_time, record.end_time)
+    assign_costs(db, [record])
+    crud_usage_rollup.apply(db, [record])
     
     db.add(record)
     db.commit()
     db.refresh(record)
+    device_health_cache.pop(record.device_id)
+    analytics_cache.invalidate_user(current_user.id)
     return record
 
 @router.delete("/{record_id}", response_model=DeviceUsageRecordSchema)
@@ -169,15 +465,9 @@ def delete_device_usage_record(
     """
     删除设备使用记录
     """
-    record = db.query(DeviceUsageRecord).join(
-        Device
-    ).join(
-        Room
-    ).join(
-        House
-    ).filter(
+    record = db.query(DeviceUsageRecord).filter(
         DeviceUsageRecord.id == record_id,
-        House.user_id == current_user.id
+        DeviceUsageRecord.owner_user_id == current_user.id
     ).first()
     
     if not record:
@@ -186,6 +476,9 @@ def delete_device_usage_record(
             detail="使用记录不存在或不属于当前用户"
         )
     
+    crud_usage_rollup.apply(db, [record], sign=-1)
     db.delete(record)
     db.commit()
+    device_health_cache.pop(record.device_id)
+    analytics_cache.invalidate_user(current_user.id)
     return record 
\ No newline at end of file
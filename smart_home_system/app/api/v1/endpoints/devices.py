@@ -1,30 +1,50 @@
-from typing import Any, List
+from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 import logging
 
 from app import crud, models, schemas
 from app.api import deps
-from app.schemas.device import Device, DeviceCreate, DeviceUpdate
+from app.core.cache import analytics_cache, device_health_cache, device_key_cache
+from app.core.device_keys import issue_device_key, revoke_device_key
+from app.core.ownership import OwnershipResolver, invalidate_ownership
+from app.core.pagination import Cursor, cursor_headers, next_cursor
+from app.core.serialization import RowSerializer
+from app.schemas.device import Device, DeviceApiKey, DeviceCreate, DeviceUpdate
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+device_serializer = RowSerializer(Device, models.Device)
+
 @router.get("/", response_model=List[Device])
 def read_devices(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[Cursor] = Depends(deps.get_cursor),
 ) -> Any:
     """
     获取设备列表
+
+    按ID升序，下一页游标在响应头 X-Next-Cursor 中，传入 cursor 时忽略 skip。
     """
     try:
-        devices = crud.crud_device.get_multi(db, skip=skip, limit=limit)
-        return devices
+        rows = crud.crud_device.get_multi_by_ids(
+            db,
+            ids=ownership.device_ids,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            columns=device_serializer.columns
+        )
+        return device_serializer.response(
+            rows, headers=cursor_headers(next_cursor(rows, limit, "id"))
+        )
     except Exception as e:
-        logger.error(f"获取设备列表失败: {str(e)}")
+        logger.error("获取设备列表失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="获取设备列表失败"
@@ -36,22 +56,19 @@ def create_device(
     db: Session = Depends(deps.get_db),
     device_in: DeviceCreate,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ) -> Any:
     """
     创建设备
     """
     try:
-        # 验证房间是否存在
-        room = db.query(models.Room).filter(models.Room.id == device_in.room_id).first()
-        if not room:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="房间不存在"
-            )
-        
-        # 验证用户是否有权限访问该房间
-        house = db.query(models.House).filter(models.House.id == room.house_id).first()
-        if not house or house.user_id != current_user.id:
+        # 验证房间是否存在且属于当前用户
+        if not ownership.owns_room(device_in.room_id):
+            if not crud.crud_room.get(db, id=device_in.room_id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="房间不存在"
+                )
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="没有权限在此房间创建设备"
@@ -59,11 +76,13 @@ def create_device(
         
         # 创建设备
         device = crud.crud_device.create(db, obj_in=device_in)
+        invalidate_ownership(current_user.id)
+        analytics_cache.invalidate_user(current_user.id)
         return device
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"创建设备失败: {str(e)}")
+        logger.error("创建设备失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"创建设备失败: {str(e)}"
@@ -75,6 +94,7 @@ def read_device(
     db: Session = Depends(deps.get_db),
     device_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ) -> Any:
     """
     获取设备详情
@@ -86,11 +106,16 @@ def read_device(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="设备不存在"
             )
+        if not ownership.owns_device(device_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="没有权限访问此设备"
+            )
         return device
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"获取设备详情失败: {str(e)}")
+        logger.error("获取设备详情失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="获取设备详情失败"
@@ -103,6 +128,7 @@ def update_device(
     device_id: int,
     device_in: DeviceUpdate,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ) -> Any:
     """
     更新设备
@@ -114,12 +140,19 @@ def update_device(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="设备不存在"
             )
+        if not ownership.owns_device(device_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="没有权限修改此设备"
+            )
         device = crud.crud_device.update(db, db_obj=device, obj_in=device_in)
+        device_health_cache.pop(device_id)
+        analytics_cache.invalidate_user(current_user.id)
         return device
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"更新设备失败: {str(e)}")
+        logger.error("更新设备失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="更新设备失败"
@@ -131,6 +164,7 @@ def delete_device(
     db: Session = Depends(deps.get_db),
     device_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ) -> Any:
     """
     删除设备
@@ -142,13 +176,93 @@ def delete_device(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="设备不存在"
             )
+        if not ownership.owns_device(device_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="没有权限删除此设备"
+            )
         device = crud.crud_device.remove(db, id=device_id)
+        invalidate_ownership(current_user.id)
+        device_health_cache.pop(device_id)
+        device_key_cache.pop(device_id)
+        analytics_cache.invalidate_user(current_user.id)
         return device
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"删除设备失败: {str(e)}")
+        logger.error("删除设备失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="删除设备失败"
-        ) 
\ No newline at end of file
+        ) 
+
+def _get_owned_device(db: Session, ownership: OwnershipResolver, device_id: int, action: str) -> models.Device:
+    """获取当前用户的设备，不存在返回 404，无权限返回 403"""
+    device = crud.crud_device.get(db, id=device_id)
+    if not device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="设备不存在"
+        )
+    if not ownership.owns_device(device_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"没有权限{action}此设备"
+        )
+    return device
+
+@router.post("/{device_id}/api-key", response_model=DeviceApiKey)
+def create_device_api_key(
+    *,
+    db: Session = Depends(deps.get_db),
+    device_id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
+) -> Any:
+    """
+    签发设备密钥
+
+    已有密钥时轮换为新密钥，旧密钥立即失效（其他进程最多延迟 DEVICE_KEY_CACHE_TTL 秒）。
+    设备使用密钥对写入请求签名：
+    X-Signature = hex(HMAC-SHA256(api_key, "{X-Timestamp}\n{METHOD}\n{path}\n" + 请求体))
+    其中 X-Timestamp 为整数 Unix 秒。
+    """
+    try:
+        device = _get_owned_device(db, ownership, device_id, "管理")
+        api_key = issue_device_key(db, device)
+        return DeviceApiKey(
+            device_id=device_id,
+            api_key=api_key,
+            created_at=device.api_key_created_at
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("签发设备密钥失败: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="签发设备密钥失败"
+        )
+
+@router.delete("/{device_id}/api-key", status_code=status.HTTP_204_NO_CONTENT)
+def delete_device_api_key(
+    *,
+    db: Session = Depends(deps.get_db),
+    device_id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
+) -> None:
+    """
+    吊销设备密钥
+    """
+    try:
+        device = _get_owned_device(db, ownership, device_id, "管理")
+        revoke_device_key(db, device)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("吊销设备密钥失败: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="吊销设备密钥失败"
+        )
@@ -13,7 +13,7 @@ from app.schemas.schemas import (
 router = APIRouter()
 
 @router.post("/", response_model=UserFeedbackSchema)
-async def create_feedback(
+def create_feedback(
     feedback: UserFeedbackCreate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -31,7 +31,7 @@ async def create_feedback(
     return db_feedback
 
 @router.get("/", response_model=List[UserFeedbackSchema])
-async def get_feedbacks(
+def get_feedbacks(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -39,7 +39,7 @@ async def get_feedbacks(
     return db.query(UserFeedback).filter(UserFeedback.user_id == current_user.id).all()
 
 @router.get("/admin/all", response_model=List[UserFeedbackResponse])
-async def get_all_feedbacks(
+def get_all_feedbacks(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
     status: FeedbackStatus = None,
@@ -70,7 +70,7 @@ async def get_all_feedbacks(
     ]
 
 @router.get("/{feedback_id}", response_model=UserFeedbackSchema)
-async def get_feedback(
+def get_feedback(
     feedback_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -88,7 +88,7 @@ async def get_feedback(
     return feedback
 
 @router.put("/{feedback_id}", response_model=UserFeedbackSchema)
-async def update_feedback(
+def update_feedback(
     feedback_id: int,
     feedback_update: UserFeedbackUpdate,
     current_user: User = Depends(get_current_active_user),
@@ -121,7 +121,7 @@ async def update_feedback(
     return feedback
 
 @router.delete("/{feedback_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_feedback(
+def delete_feedback(
     feedback_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -142,7 +142,7 @@ async def delete_feedback(
     return None
 
 @router.put("/admin/{feedback_id}/respond", response_model=UserFeedbackResponse)
-async def admin_respond_to_feedback(
+def admin_respond_to_feedback(
     feedback_id: int,
     response: UserFeedbackUpdate,
     current_user: User = Depends(get_current_active_user),
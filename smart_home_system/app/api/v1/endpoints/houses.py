@@ -5,11 +5,14 @@ import logging
 
 from app import crud, models
 from app.api import deps
+from app.core.cache import analytics_cache, device_health_cache, device_key_cache
+from app.core.ownership import OwnershipResolver, invalidate_ownership
 from app.schemas.house import (
     House,
     HouseCreate,
     HouseUpdate,
 )
+from app.schemas.tariff import Tariff, TariffUpdate
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -28,7 +31,7 @@ def read_houses(
         houses = crud.crud_house.get_by_owner(db, owner_id=current_user.id)
         return houses
     except Exception as e:
-        logger.error(f"获取房屋列表失败: {str(e)}")
+        logger.error("获取房屋列表失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="获取房屋列表失败"
@@ -49,9 +52,10 @@ def create_house(
         house_data = house_in.dict()
         house_data["user_id"] = current_user.id
         house = crud.crud_house.create(db=db, obj_in=house_data)
+        invalidate_ownership(current_user.id)
         return house
     except Exception as e:
-        logger.error(f"创建房屋失败: {str(e)}")
+        logger.error("创建房屋失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"创建房屋失败: {str(e)}"
@@ -63,6 +67,7 @@ def read_house(
     db: Session = Depends(deps.get_db),
     house_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ):
     """
     通过ID获取房屋信息
@@ -75,7 +80,7 @@ def read_house(
                 detail="房屋不存在"
             )
         # 验证权限
-        if house.user_id != current_user.id:
+        if not ownership.owns_house(house_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="没有权限访问此房屋"
@@ -84,7 +89,7 @@ def read_house(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"获取房屋信息失败: {str(e)}")
+        logger.error("获取房屋信息失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="获取房屋信息失败"
@@ -97,6 +102,7 @@ def update_house(
     house_id: int,
     house_in: HouseUpdate,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ):
     """
     更新房屋信息
@@ -109,17 +115,18 @@ def update_house(
                 detail="房屋不存在"
             )
         # 验证权限
-        if house.user_id != current_user.id:
+        if not ownership.owns_house(house_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="没有权限修改此房屋"
             )
         house = crud.crud_house.update(db=db, db_obj=house, obj_in=house_in)
+        analytics_cache.invalidate_user(current_user.id)
         return house
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"更新房屋失败: {str(e)}")
+        logger.error("更新房屋失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="更新房屋失败"
@@ -131,6 +138,7 @@ def delete_house(
     db: Session = Depends(deps.get_db),
     house_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ):
     """
     删除房屋
@@ -143,18 +151,127 @@ def delete_house(
                 detail="房屋不存在"
             )
         # 验证权限
-        if house.user_id != current_user.id:
+        if not ownership.owns_house(house_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="没有权限删除此房屋"
             )
+        # 房间和设备随房屋级联删除，先记下设备ID以清理按设备缓存的数据
+        device_ids = [
+            device_id for (device_id,) in db.query(models.Device.id).join(
+                models.Room
+            ).filter(
+                models.Room.house_id == house_id
+            )
+        ]
         house = crud.crud_house.remove(db=db, id=house_id)
+        invalidate_ownership(current_user.id)
+        for device_id in device_ids:
+            device_health_cache.pop(device_id)
+            device_key_cache.pop(device_id)
+        analytics_cache.invalidate_user(current_user.id)
         return house
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"删除房屋失败: {str(e)}")
+        logger.error("删除房屋失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="删除房屋失败"
-        ) 
\ No newline at end of file
+        ) 
+def _get_owned_house(db: Session, house_id: int, ownership: OwnershipResolver) -> models.House:
+    """获取房屋并验证权限"""
+    house = crud.crud_house.get(db=db, id=house_id)
+    if not house:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="房屋不存在"
+        )
+    if not ownership.owns_house(house_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="没有权限访问此房屋"
+        )
+    return house
+
+@router.get("/{house_id}/tariff", response_model=Tariff)
+def read_house_tariff(
+    *,
+    db: Session = Depends(deps.get_db),
+    house_id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
+):
+    """
+    获取房屋的分时电价方案
+    """
+    _get_owned_house(db, house_id, ownership)
+    tariff = crud.crud_tariff.get_by_house(db, house_id=house_id)
+    if not tariff:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="电价方案不存在"
+        )
+    return tariff
+
+@router.put("/{house_id}/tariff", response_model=Tariff)
+def set_house_tariff(
+    *,
+    db: Session = Depends(deps.get_db),
+    house_id: int,
+    tariff_in: TariffUpdate,
+    current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
+):
+    """
+    设置房屋的分时电价方案
+
+    时段整体替换，房屋已有使用记录的费用和小时汇总的总费用按新方案重新计算。
+    """
+    _get_owned_house(db, house_id, ownership)
+    try:
+        tariff = crud.crud_tariff.set_for_house(db, house_id=house_id, obj_in=tariff_in)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error("设置电价方案失败: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="设置电价方案失败"
+        )
+    analytics_cache.invalidate_user(current_user.id)
+    return tariff
+
+@router.delete("/{house_id}/tariff", response_model=Tariff)
+def delete_house_tariff(
+    *,
+    db: Session = Depends(deps.get_db),
+    house_id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
+):
+    """
+    删除房屋的分时电价方案，已有使用记录的费用清空
+    """
+    _get_owned_house(db, house_id, ownership)
+    try:
+        tariff = crud.crud_tariff.remove_for_house(db, house_id=house_id)
+    except Exception as e:
+        db.rollback()
+        logger.error("删除电价方案失败: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="删除电价方案失败"
+        )
+    if not tariff:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="电价方案不存在"
+        )
+    analytics_cache.invalidate_user(current_user.id)
+    return tariff
@@ -5,6 +5,7 @@ import logging
 
 from app import crud, models
 from app.api import deps
+from app.core.ownership import OwnershipResolver, invalidate_ownership
 from app.schemas.room import Room, RoomCreate, RoomUpdate
 
 router = APIRouter()
@@ -16,20 +17,17 @@ def read_rooms(
     skip: int = 0,
     limit: int = 100,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ):
     """
     获取当前用户的所有房间列表
     """
     try:
-        # 获取用户的所有房屋
-        houses = crud.crud_house.get_by_owner(db, owner_id=current_user.id)
-        house_ids = [house.id for house in houses]
-        
-        # 获取这些房屋的所有房间
-        rooms = db.query(models.Room).filter(models.Room.house_id.in_(house_ids)).all()
+        # 获取用户所有房屋中的房间
+        rooms = db.query(models.Room).filter(models.Room.id.in_(ownership.room_ids)).all()
         return rooms
     except Exception as e:
-        logger.error(f"获取房间列表失败: {str(e)}")
+        logger.error("获取房间列表失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="获取房间列表失败"
@@ -41,19 +39,19 @@ def create_room(
     db: Session = Depends(deps.get_db),
     room_in: RoomCreate,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ):
     """
     创建新房间
     """
     try:
         # 验证房屋是否存在且属于当前用户
-        house = crud.crud_house.get(db=db, id=room_in.house_id)
-        if not house:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="房屋不存在"
-            )
-        if house.user_id != current_user.id:
+        if not ownership.owns_house(room_in.house_id):
+            if not crud.crud_house.get(db=db, id=room_in.house_id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="房屋不存在"
+                )
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="没有权限在此房屋创建房间"
@@ -61,11 +59,12 @@ def create_room(
         
         # 创建房间
         room = crud.crud_room.create(db=db, obj_in=room_in)
+        invalidate_ownership(current_user.id)
         return room
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"创建房间失败: {str(e)}")
+        logger.error("创建房间失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"创建房间失败: {str(e)}"
@@ -77,6 +76,7 @@ def read_room(
     db: Session = Depends(deps.get_db),
     room_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ):
     """
     通过ID获取房间信息
@@ -90,8 +90,7 @@ def read_room(
             )
         
         # 验证权限
-        house = crud.crud_house.get(db=db, id=room.house_id)
-        if not house or house.user_id != current_user.id:
+        if not ownership.owns_room(room_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="没有权限访问此房间"
@@ -100,7 +99,7 @@ def read_room(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"获取房间信息失败: {str(e)}")
+        logger.error("获取房间信息失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="获取房间信息失败"
@@ -113,6 +112,7 @@ def update_room(
     room_id: int,
     room_in: RoomUpdate,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ):
     """
     更新房间信息
@@ -126,8 +126,7 @@ def update_room(
             )
         
         # 验证权限
-        house = crud.crud_house.get(db=db, id=room.house_id)
-        if not house or house.user_id != current_user.id:
+        if not ownership.owns_room(room_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="没有权限修改此房间"
@@ -138,7 +137,7 @@ def update_room(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"更新房间失败: {str(e)}")
+        logger.error("更新房间失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="更新房间失败"
@@ -150,6 +149,7 @@ def delete_room(
     db: Session = Depends(deps.get_db),
     room_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
 ):
     """
     删除房间
@@ -163,19 +163,19 @@ def delete_room(
             )
         
         # 验证权限
-        house = crud.crud_house.get(db=db, id=room.house_id)
-        if not house or house.user_id != current_user.id:
+        if not ownership.owns_room(room_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="没有权限删除此房间"
             )
         
         room = crud.crud_room.remove(db=db, id=room_id)
+        invalidate_ownership(current_user.id)
         return room
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"删除房间失败: {str(e)}")
+        logger.error("删除房间失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="删除房间失败"
@@ -2,21 +2,39 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app.api import deps
+from app.core.ownership import OwnershipResolver
+from app.core.pagination import Cursor, cursor_headers, next_cursor
+from app.core.serialization import RowSerializer
+from app.models.models import User, SecurityEvent as SecurityEventModel
 from app.schemas.security import SecurityEventCreate, SecurityEventUpdate, SecurityEvent
 from app.crud.crud_security import crud_security
 from datetime import datetime
 
 router = APIRouter()
 
+security_event_serializer = RowSerializer(SecurityEvent, SecurityEventModel)
+
 @router.post("/", response_model=SecurityEvent)
 def create_security_event(
     *,
     db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
     event_in: SecurityEventCreate
 ) -> SecurityEvent:
     """
     创建新的安全事件记录
     """
+    if not ownership.owns_house(event_in.house_id):
+        raise HTTPException(
+            status_code=403,
+            detail="没有权限访问此房屋"
+        )
+    if event_in.device_id is not None and ownership.house_of_device(event_in.device_id) != event_in.house_id:
+        raise HTTPException(
+            status_code=403,
+            detail="设备不属于此房屋"
+        )
     try:
         return crud_security.create(db=db, obj_in=event_in)
     except Exception as e:
@@ -28,8 +46,11 @@ def create_security_event(
 @router.get("/", response_model=List[SecurityEvent])
 def get_security_events(
     db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[Cursor] = Depends(deps.get_cursor),
     house_id: Optional[int] = None,
     device_id: Optional[int] = None,
     event_type: Optional[str] = None,
@@ -39,20 +60,33 @@ def get_security_events(
     end_time: Optional[datetime] = None
 ) -> List[SecurityEvent]:
     """
-    获取安全事件列表，支持多种过滤条件
+    获取安全事件列表（仅当前用户的房屋），支持多种过滤条件
+
+    按事件时间倒序，下一页游标在响应头 X-Next-Cursor 中，传入 cursor 时忽略 skip。
     """
+    if house_id is not None and not ownership.owns_house(house_id):
+        raise HTTPException(
+            status_code=403,
+            detail="没有权限访问此房屋"
+        )
     try:
-        return crud_security.get_multi(
+        rows = crud_security.get_multi(
             db=db,
             skip=skip,
             limit=limit,
             house_id=house_id,
+            house_ids=ownership.house_ids,
             device_id=device_id,
             event_type=event_type,
             severity=severity,
             status=status,
             start_time=start_time,
-            end_time=end_time
+            end_time=end_time,
+            cursor=cursor,
+            columns=security_event_serializer.columns
+        )
+        return security_event_serializer.response(
+            rows, headers=cursor_headers(next_cursor(rows, limit, "event_time"))
         )
     except Exception as e:
         raise HTTPException(
@@ -63,7 +97,9 @@ def get_security_events(
 @router.get("/{event_id}", response_model=SecurityEvent)
 def get_security_event(
     event_id: int,
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership)
 ) -> SecurityEvent:
     """
     获取单个安全事件详情
@@ -75,6 +111,11 @@ def get_security_event(
                 status_code=404,
                 detail="安全事件不存在"
             )
+        if not ownership.owns_house(event.house_id):
+            raise HTTPException(
+                status_code=403,
+                detail="没有权限访问此安全事件"
+            )
         return event
     except HTTPException:
         raise
@@ -89,7 +130,9 @@ def update_security_event(
     *,
     db: Session = Depends(deps.get_db),
     event_id: int,
-    event_in: SecurityEventUpdate
+    event_in: SecurityEventUpdate,
+    current_user: User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership)
 ) -> SecurityEvent:
     """
     更新安全事件信息
@@ -101,6 +144,16 @@ def update_security_event(
                 status_code=404,
                 detail="安全事件不存在"
             )
+        if not ownership.owns_house(event.house_id):
+            raise HTTPException(
+                status_code=403,
+                detail="没有权限访问此安全事件"
+            )
+        if event_in.device_id is not None and ownership.house_of_device(event_in.device_id) != event.house_id:
+            raise HTTPException(
+                status_code=403,
+                detail="设备不属于此房屋"
+            )
         return crud_security.update(db=db, db_obj=event, obj_in=event_in)
     except HTTPException:
         raise
@@ -113,7 +166,9 @@ def update_security_event(
 @router.delete("/{event_id}")
 def delete_security_event(
     event_id: int,
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+    ownership: OwnershipResolver = Depends(deps.get_ownership)
 ) -> dict:
     """
     删除安全事件
@@ -125,6 +180,11 @@ def delete_security_event(
                 status_code=404,
                 detail="安全事件不存在"
             )
+        if not ownership.owns_house(event.house_id):
+            raise HTTPException(
+                status_code=403,
+                detail="没有权限访问此安全事件"
+            )
         crud_security.remove(db=db, id=event_id)
         return {"message": "安全事件已删除"}
     except HTTPException:
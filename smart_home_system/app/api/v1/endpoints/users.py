@@ -1,11 +1,12 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 import logging
 import json
 
 from app import crud, models, schemas
 from app.api import deps
+from app.core.pagination import NEXT_CURSOR_HEADER, Cursor, next_cursor
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -17,7 +18,7 @@ logger = logging.getLogger(__name__)
     description="Get detailed information about the currently logged-in user",
     response_description="Detailed information about the current user"
 )
-async def read_user_me(
+def read_user_me(
     current_user: models.User = Depends(deps.get_current_active_user),
     db: Session = Depends(deps.get_db)
 ) -> Any:
@@ -36,7 +37,7 @@ async def read_user_me(
                 current_user.preferences = {}
         return current_user
     except Exception as e:
-        logger.error(f"Failed to get user information: {str(e)}")
+        logger.error("Failed to get user information: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get user information"
@@ -49,7 +50,7 @@ async def read_user_me(
     description="Update personal information for the currently logged-in user",
     response_description="Updated user information"
 )
-async def update_user_me(
+def update_user_me(
     *,
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user),
@@ -76,7 +77,7 @@ async def update_user_me(
         user = crud.crud_user.update(db, db_obj=user, obj_in=user_in)
         return user
     except Exception as e:
-        logger.error(f"Failed to update user information: {str(e)}")
+        logger.error("Failed to update user information: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update user information"
@@ -89,7 +90,7 @@ async def update_user_me(
     description="Get detailed information about a user by their ID",
     response_description="Detailed information about the specified user"
 )
-async def read_user(
+def read_user(
     user_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
     db: Session = Depends(deps.get_db)
@@ -111,7 +112,7 @@ async def read_user(
             )
         return user
     except Exception as e:
-        logger.error(f"Failed to get user information: {str(e)}")
+        logger.error("Failed to get user information: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get user information"
@@ -124,26 +125,32 @@ async def read_user(
     description="Get a list of all users in the system",
     response_description="User list"
 )
-async def read_users(
+def read_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[Cursor] = Depends(deps.get_cursor),
     current_user: models.User = Depends(deps.get_current_active_user),
     db: Session = Depends(deps.get_db)
 ) -> Any:
     """
-    Get a list of all users in the system
+    Get a list of all users in the system, ordered by ID
     
-    - **skip**: Number of records to skip
+    - **skip**: Number of records to skip (ignored when cursor is given)
     - **limit**: Maximum number of records to return
+    - **cursor**: Value of the X-Next-Cursor header from the previous page
     
     Returns:
     - User list
     """
     try:
-        users = crud.crud_user.get_multi(db, skip=skip, limit=limit)
+        users = crud.crud_user.get_multi(db, skip=skip, limit=limit, cursor=cursor)
+        cursor_value = next_cursor(users, limit, "id")
+        if cursor_value:
+            response.headers[NEXT_CURSOR_HEADER] = cursor_value
         return users
     except Exception as e:
-        logger.error(f"Failed to get user list: {str(e)}")
+        logger.error("Failed to get user list: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get user list"
@@ -155,7 +162,7 @@ async def read_users(
     description="Delete a user by ID",
     response_description="Delete result"
 )
-async def delete_user(
+def delete_user(
     user_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
     db: Session = Depends(deps.get_db),
@@ -1,14 +1,38 @@
-from typing import Dict, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.api import deps
-from app.models.models import User
+from app.core.config import settings
+from app.core.ownership import OwnershipResolver
+from app.core.rate_limit import HEAVY_TAG
+from app.models.models import Device, User
 from app.services.visualization import VisualizationService
 
 router = APIRouter()
 
+def _to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """带时区的时间转换为 UTC 并去掉时区，与数据库中存储的时间一致"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _check_device_access(db: Session, ownership: OwnershipResolver, device_id: int) -> None:
+    """验证设备存在且属于当前用户"""
+    if ownership.owns_device(device_id):
+        return
+    if not db.query(Device.id).filter(Device.id == device_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="设备不存在"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="没有权限访问此设备"
+    )
+
 @router.get("/area-impact")
-async def get_area_impact_analysis(
+def get_area_impact_analysis(
     current_user: User = Depends(deps.get_current_active_user),
     db: Session = Depends(deps.get_db)
 ) -> Dict:
@@ -17,56 +41,88 @@ async def get_area_impact_analysis(
     return visualization_service.get_area_impact_data()
 
 @router.get("/device/{device_id}/usage-trend")
-async def get_device_usage_trend(
+def get_device_usage_trend(
     device_id: int,
     current_user: User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: Optional[int] = Query(None, ge=3)  # 返回的最大点数，超过时用 LTTB 降采样
 ) -> Dict:
-    """获取设备使用趋势数据"""
+    """获取设备使用趋势数据（默认最近30天）"""
+    start = _to_naive_utc(start)
+    end = _to_naive_utc(end)
+    if start and end and start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="开始时间不能晚于结束时间"
+        )
+    _check_device_access(db, ownership, device_id)
     visualization_service = VisualizationService(db)
-    return visualization_service.get_device_usage_trend_data(device_id)
+    return visualization_service.get_device_usage_trend_data(
+        device_id,
+        start=start,
+        end=end,
+        max_points=max_points
+    )
 
 @router.get("/device/{device_id}/time-distribution")
-async def get_device_time_distribution(
+def get_device_time_distribution(
     device_id: int,
     current_user: User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    ownership: OwnershipResolver = Depends(deps.get_ownership)
 ) -> Dict:
     """获取设备使用时间分布数据"""
+    _check_device_access(db, ownership, device_id)
     visualization_service = VisualizationService(db)
     return visualization_service.get_device_time_distribution_data(device_id)
 
 @router.get("/device/{device_id}/scenario-analysis")
-async def get_device_scenario_analysis(
+def get_device_scenario_analysis(
     device_id: int,
     current_user: User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    ownership: OwnershipResolver = Depends(deps.get_ownership)
 ) -> Dict:
     """获取设备使用场景分析数据"""
+    _check_device_access(db, ownership, device_id)
     visualization_service = VisualizationService(db)
     return visualization_service.get_device_usage_by_scenario_data(device_id)
 
 @router.get("/device/{device_id}/environmental-impact")
-async def get_device_environmental_impact(
+def get_device_environmental_impact(
     device_id: int,
     current_user: User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    ownership: OwnershipResolver = Depends(deps.get_ownership)
 ) -> Dict:
     """获取环境因素影响分析数据"""
+    _check_device_access(db, ownership, device_id)
     visualization_service = VisualizationService(db)
     return visualization_service.get_environmental_impact_data(device_id)
 
-@router.get("/device/correlation")
-async def get_device_correlation(
+@router.get("/device/correlation", tags=[HEAVY_TAG])
+def get_device_correlation(
     current_user: User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    ownership: OwnershipResolver = Depends(deps.get_ownership),
+    device_id: Optional[int] = None,
+    time_window: int = Query(0, ge=0, le=settings.CORRELATION_MAX_TIME_WINDOW)  # 同时使用的时间窗口（分钟），0 表示开始时间相同
 ) -> Dict:
     """获取设备关联使用分析数据"""
+    if device_id is not None:
+        _check_device_access(db, ownership, device_id)
     visualization_service = VisualizationService(db)
-    return visualization_service.get_device_correlation_data()
+    return visualization_service.get_device_correlation_data(
+        current_user.id,
+        device_id=device_id,
+        time_window=time_window
+    )
 
 @router.get("/automation-analysis")
-async def get_automation_analysis(
+def get_automation_analysis(
     current_user: User = Depends(deps.get_current_active_user),
     db: Session = Depends(deps.get_db)
 ) -> Dict:
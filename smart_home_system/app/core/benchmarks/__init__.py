@@ -0,0 +1,137 @@
+"""
+性能基准脚本
+
+每个脚本在临时 SQLite 数据库中生成数据后测量，在 smart_home_system 目录下运行：
+
+    python -m app.core.benchmarks.<脚本名> --help
+
+配置在导入 app 模块时读取，因此脚本先调用 use_database，再导入数据库、模型和接口。
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+# 生成数据时每条 INSERT 语句批量写入的行数
+SEED_BATCH_SIZE = 50000
+
+def use_database(path: Optional[str] = None) -> str:
+    """
+    让应用使用基准专用的 SQLite 数据库，并关闭限流、使用进程内缓存
+
+    未指定路径时在临时目录中新建；指定的文件已存在时直接复用（便于重复测量大数据量）。
+
+    Returns:
+        数据库文件路径
+    """
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="smart_home_bench_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(path)}"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["ANALYTICS_CACHE_BACKEND"] = "memory"
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    return path
+
+def seed_account(
+    db,
+    *,
+    houses: int = 1,
+    devices: int = 10,
+    records: int = 0,
+    days: int = 29,
+    seed: int = 1
+) -> Dict:
+    """
+    创建一个用户及其房屋、房间、设备和随机使用记录，并重建小时汇总
+
+    设备依次分配到各房屋（每个房屋一个房间），使用记录在最近 days 天内均匀分布。
+
+    Returns:
+        user_id、house_ids、room_ids、device_ids
+    """
+    from app.crud.crud_usage_rollup import crud_usage_rollup
+    from app.models.models import Device, DeviceUsageRecord, House, Room, User
+
+    user = User(email=f"bench{seed}@example.com", hashed_password="-", is_active=True, preferences={})
+    db.add(user)
+    db.flush()
+    house_rows = [
+        House(user_id=user.id, name=f"房屋{i}", address="地址", area=50.0 + i * 20)
+        for i in range(houses)
+    ]
+    db.add_all(house_rows)
+    db.flush()
+    room_rows = [
+        Room(house_id=house.id, name="客厅", area=20.0, room_type="living_room")
+        for house in house_rows
+    ]
+    db.add_all(room_rows)
+    db.flush()
+    device_types = ["light", "camera", "air_conditioner", "tv"]
+    device_rows = [
+        Device(
+            name=f"设备{i}",
+            device_type=device_types[i % len(device_types)],
+            status="online",
+            room_id=room_rows[i % houses].id
+        )
+        for i in range(devices)
+    ]
+    db.add_all(device_rows)
+    db.commit()
+
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    table = DeviceUsageRecord.__table__
+    for offset in range(0, records, SEED_BATCH_SIZE):
+        rows = []
+        for i in range(offset, min(offset + SEED_BATCH_SIZE, records)):
+            index = i % devices
+            start = now - timedelta(seconds=rng.randint(0, days * 86400))
+            duration = rng.randint(1, 120)
+            rows.append({
+                "device_id": device_rows[index].id,
+                "user_id": user.id,
+                "house_id": house_rows[index % houses].id,
+                "owner_user_id": user.id,
+                "start_time": start,
+                "end_time": start + timedelta(minutes=duration),
+                "duration": duration,
+                "energy_consumption": rng.random() * 2,
+                "usage_scenario": "日常使用",
+                "usage_purpose": "照明",
+                "temperature": 15 + rng.random() * 15,
+                "humidity": 30 + rng.random() * 40,
+                "is_automated": i % 3 == 0,
+                "created_at": now,
+                "updated_at": now,
+            })
+        db.execute(table.insert(), rows)
+    db.commit()
+    if records:
+        crud_usage_rollup.rebuild(db)
+    return {
+        "user_id": user.id,
+        "house_ids": [house.id for house in house_rows],
+        "room_ids": [room.id for room in room_rows],
+        "device_ids": [device.id for device in device_rows],
+    }
+
+def best_of(fn: Callable[[], object], repeat: int = 3) -> float:
+    """多次调用取最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """最近秩法百分位数，q 取 0-100"""
+    ordered: List[float] = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[rank]
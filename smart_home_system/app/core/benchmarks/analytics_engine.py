@@ -0,0 +1,83 @@
+"""
+分析计算基准：大量使用记录下各分析接口和可视化数据的耗时与内存峰值
+
+耗时取多次中的最短值，内存峰值由 tracemalloc 统计（单独再调用一次）。分析接口绕过
+结果缓存直接调用，图表只生成不写文件。生成百万条记录较慢，可用 --db 指定文件复用：
+
+    python -m app.core.benchmarks.analytics_engine --records 1000000 --db /tmp/bench_analytics.db
+    python -m app.core.benchmarks.analytics_engine --db /tmp/bench_analytics.db get_area_impact_data
+"""
+import argparse
+import os
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from app.core.benchmarks import use_database
+
+def _cases(db, user_id: int, device_id: int) -> Dict[str, Callable[[], object]]:
+    from types import SimpleNamespace
+
+    from app.api.v1.endpoints import analytics
+    from app.services.visualization import VisualizationService
+
+    user = SimpleNamespace(id=user_id)
+    service = VisualizationService(db)
+    # 只测计算和绘图，不写图片文件
+    service._save_figure = lambda fig, filename: filename
+    return {
+        "analyze_user_habits": lambda: analytics.analyze_user_habits.__wrapped__(db=db, current_user=user, days=30),
+        "analyze_device_usage_time": lambda: analytics.analyze_device_usage_time.__wrapped__(
+            db=db, current_user=user, days=30
+        ),
+        "generate_area_impact_analysis": service.generate_area_impact_analysis,
+        "get_area_impact_data": service.get_area_impact_data,
+        "generate_automation_analysis": service.generate_automation_analysis,
+        "get_automation_analysis_data": service.get_automation_analysis_data,
+        "generate_device_usage_by_time": lambda: service.generate_device_usage_by_time(device_id),
+        "get_device_time_distribution_data": lambda: service.get_device_time_distribution_data(device_id),
+        "get_device_usage_trend_data": lambda: service.get_device_usage_trend_data(device_id),
+    }
+
+def run(records: int, devices: int, houses: int, path: Optional[str], repeat: int, names: List[str]) -> None:
+    reuse = path is not None and os.path.exists(path)
+    use_database(path)
+
+    from app.core.benchmarks import best_of, seed_account
+    from app.db.session import Base, SessionLocal, engine
+    from app.models.models import Device, User
+
+    db = SessionLocal()
+    try:
+        if not reuse:
+            Base.metadata.create_all(bind=engine)
+            seed_account(db, houses=houses, devices=devices, records=records)
+        user_id = db.query(User.id).order_by(User.id).first()[0]
+        device_id = db.query(Device.id).order_by(Device.id).first()[0]
+
+        cases = _cases(db, user_id, device_id)
+        unknown = [name for name in names if name not in cases]
+        if unknown:
+            raise SystemExit(f"未知的测量项: {', '.join(unknown)}，可选: {', '.join(cases)}")
+        for name in names or list(cases):
+            fn = cases[name]
+            elapsed = best_of(fn, repeat)
+            tracemalloc.start()
+            try:
+                fn()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            print(f"{name:36s} {elapsed * 1000:9.0f} ms  峰值 {peak / 2 ** 20:7.1f} MiB", flush=True)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="测量大量使用记录下分析计算的耗时和内存峰值")
+    parser.add_argument("names", nargs="*", help="只运行指定的测量项，默认全部")
+    parser.add_argument("--records", type=int, default=1000000, help="生成的使用记录数")
+    parser.add_argument("--devices", type=int, default=50, help="生成的设备数")
+    parser.add_argument("--houses", type=int, default=5, help="生成的房屋数")
+    parser.add_argument("--db", help="SQLite 文件路径，已存在时直接复用其中的数据")
+    parser.add_argument("--repeat", type=int, default=2, help="每项的调用次数，取最短耗时")
+    args = parser.parse_args()
+    run(args.records, args.devices, args.houses, args.db, args.repeat, args.names)
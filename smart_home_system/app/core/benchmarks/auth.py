@@ -0,0 +1,100 @@
+"""
+认证请求路径基准：GET /users/me 的单次耗时和每次请求执行的 SQL 语句数
+
+分别在启用令牌 / 用户缓存和每次请求前清空缓存（相当于不缓存）两种情况下测量；
+完整请求的耗时包含 TestClient 自身的开销，另外单独测量 get_current_user 依赖的耗时。
+
+    python -m app.core.benchmarks.auth --requests 1000
+"""
+import argparse
+import logging
+import time
+
+from app.core.benchmarks import use_database
+
+def run(requests: int, rounds: int) -> None:
+    use_database()
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.core.benchmarks import seed_account
+    from app.core.cache import auth_user_cache, token_cache
+    from app.core.config import settings
+    from app.core.deps import get_current_user
+    from app.core.security import create_access_token
+    from app.db.session import Base, SessionLocal, engine
+    from app.main import app
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        account = seed_account(db, devices=1)
+    finally:
+        db.close()
+
+    # TestClient 每次请求都会输出 INFO 日志，计时时关闭
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    client = TestClient(app)
+    token = create_access_token(account["user_id"])
+    headers = {"Authorization": f"Bearer {token}"}
+    path = f"{settings.API_V1_STR}/users/me"
+    statements = []
+
+    def count_statement(*args) -> None:
+        statements.append(1)
+
+    def measure(cached: bool) -> tuple:
+        """返回 (单次请求耗时, 单次依赖耗时, 每次请求的 SQL 语句数)"""
+        client.get(path, headers=headers).raise_for_status()
+        statements.clear()
+        request_time = 0.0
+        for _ in range(requests):
+            if not cached:
+                auth_user_cache.clear()
+                token_cache.clear()
+            start = time.perf_counter()
+            client.get(path, headers=headers).raise_for_status()
+            request_time += time.perf_counter() - start
+        statement_count = len(statements)
+
+        dependency_time = 0.0
+        db = SessionLocal()
+        try:
+            for _ in range(requests):
+                if not cached:
+                    auth_user_cache.clear()
+                    token_cache.clear()
+                start = time.perf_counter()
+                get_current_user(db=db, token=token)
+                dependency_time += time.perf_counter() - start
+        finally:
+            db.close()
+        return request_time / requests, dependency_time / requests, statement_count / requests
+
+    # 两种情况交替测量多轮，各取最好的一轮，避免先后顺序带来的偏差
+    results = {True: [], False: []}
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        for _ in range(rounds):
+            for cached in (False, True):
+                results[cached].append(measure(cached))
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+
+    for label, cached in (("no cache", False), ("cached", True)):
+        request_time = min(result[0] for result in results[cached])
+        dependency_time = min(result[1] for result in results[cached])
+        statement_count = results[cached][-1][2]
+        print(
+            f"{label:8s} 请求 {request_time * 1000:6.2f} ms  "
+            f"get_current_user {dependency_time * 1000:6.3f} ms  "
+            f"{statement_count:4.1f} 条 SQL/请求"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="测量 GET /users/me 的耗时和 SQL 语句数")
+    parser.add_argument("--requests", type=int, default=1000, help="每轮的请求次数")
+    parser.add_argument("--rounds", type=int, default=3, help="每种情况测量的轮数")
+    args = parser.parse_args()
+    run(args.requests, args.rounds)
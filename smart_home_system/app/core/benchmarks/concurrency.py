@@ -0,0 +1,130 @@
+"""
+事件循环阻塞基准：重查询并发执行时，轻量接口的延迟
+
+在子进程中启动 uvicorn（单个 worker），先单独测量根路径的延迟，再在若干线程持续请求
+/visualization/device/correlation 的同时重新测量，对比 p50 / p99。
+同步数据库查询若在事件循环中执行，负载下的 p99 会接近重查询的耗时。
+
+    python -m app.core.benchmarks.concurrency --records 200000
+"""
+import argparse
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import List
+
+from app.core.benchmarks import percentile, seed_account, use_database
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _measure_cheap(client, requests: int) -> List[float]:
+    """依次请求根路径，返回每次的耗时（秒）"""
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get("/").raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def _report(label: str, latencies: List[float]) -> None:
+    print(
+        f"{label:8s} p50 {percentile(latencies, 50) * 1000:8.1f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:8.1f} ms  "
+        f"max {max(latencies) * 1000:8.1f} ms"
+    )
+
+def run(records: int, devices: int, workers: int, requests: int, timeout: float) -> None:
+    use_database()
+
+    import httpx
+
+    from app.core.config import settings
+    from app.core.security import create_access_token
+    from app.db.session import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        account = seed_account(db, devices=devices, records=records)
+    finally:
+        db.close()
+    headers = {"Authorization": f"Bearer {create_access_token(account['user_id'])}"}
+
+    # 服务端放在子进程中，避免与本进程的压测线程争用 GIL
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+    ])
+    heavy_path = f"{settings.API_V1_STR}/visualization/device/correlation"
+    stop = threading.Event()
+    heavy_started = threading.Event()
+    heavy_times: List[float] = []
+    heavy_errors: List[Exception] = []
+
+    def heavy_worker() -> None:
+        try:
+            with httpx.Client(base_url=base_url, headers=headers, timeout=timeout) as heavy_client:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    heavy_client.get(heavy_path, params={"time_window": 5}).raise_for_status()
+                    heavy_times.append(time.perf_counter() - start)
+                    heavy_started.set()
+        except Exception as e:
+            # 结束阶段服务端被关闭导致的失败不计入
+            if not stop.is_set():
+                heavy_errors.append(e)
+                stop.set()
+                heavy_started.set()
+
+    heavy_threads = [threading.Thread(target=heavy_worker) for _ in range(workers)]
+    try:
+        with httpx.Client(base_url=base_url, timeout=timeout) as client:
+            deadline = time.monotonic() + timeout
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn 已退出，返回码 {server.returncode}")
+                if time.monotonic() > deadline:
+                    raise RuntimeError("等待 uvicorn 启动超时")
+                try:
+                    client.get("/")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            _measure_cheap(client, 10)
+            _report("idle", _measure_cheap(client, requests))
+
+            for heavy_thread in heavy_threads:
+                heavy_thread.start()
+            if not heavy_started.wait(timeout):
+                raise RuntimeError(f"{timeout} 秒内没有完成任何一次重查询")
+            if heavy_errors:
+                raise RuntimeError("重查询请求失败") from heavy_errors[0]
+            loaded = _measure_cheap(client, requests)
+            if heavy_errors:
+                raise RuntimeError("重查询请求失败") from heavy_errors[0]
+            _report("loaded", loaded)
+        print(f"correlation: {len(heavy_times)} 次，中位耗时 {percentile(heavy_times, 50) * 1000:.0f} ms")
+    finally:
+        stop.set()
+        server.terminate()
+        server.wait()
+        for heavy_thread in heavy_threads:
+            if heavy_thread.is_alive():
+                heavy_thread.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="测量重查询并发执行时轻量接口的延迟")
+    parser.add_argument("--records", type=int, default=100000, help="生成的使用记录数")
+    parser.add_argument("--devices", type=int, default=50, help="生成的设备数")
+    parser.add_argument("--workers", type=int, default=4, help="并发请求重查询的线程数")
+    parser.add_argument("--requests", type=int, default=200, help="每轮轻量请求的次数")
+    parser.add_argument("--timeout", type=float, default=300, help="服务启动和单次请求的超时（秒）")
+    args = parser.parse_args()
+    run(args.records, args.devices, args.workers, args.requests, args.timeout)
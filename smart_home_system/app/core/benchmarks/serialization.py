@@ -0,0 +1,68 @@
+"""
+大列表序列化基准：一次返回 N 行时设备、使用记录和安全事件列表接口的耗时
+
+    python -m app.core.benchmarks.serialization --rows 10000
+"""
+import argparse
+import logging
+import random
+from datetime import datetime, timedelta
+
+from app.core.benchmarks import use_database
+
+def run(rows: int, repeat: int) -> None:
+    use_database()
+
+    from fastapi.testclient import TestClient
+
+    from app.core.benchmarks import best_of, seed_account
+    from app.core.config import settings
+    from app.core.security import create_access_token
+    from app.db.session import Base, SessionLocal, engine
+    from app.main import app
+    from app.models.models import SecurityEvent
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        account = seed_account(db, devices=rows, records=rows)
+        rng = random.Random(1)
+        now = datetime.utcnow()
+        db.execute(SecurityEvent.__table__.insert(), [
+            {
+                "house_id": account["house_ids"][0],
+                "device_id": rng.choice(account["device_ids"]),
+                "event_type": "motion",
+                "event_time": now - timedelta(minutes=i),
+                "description": "检测到移动",
+                "severity": "low",
+                "status": "open",
+                "event_metadata": {"zone": i % 4},
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    # TestClient 每次请求都会输出 INFO 日志，计时时关闭
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token(account['user_id'])}"}
+    for name in ("devices", "device-usage", "security"):
+        path = f"{settings.API_V1_STR}/{name}/"
+        params = {"limit": rows}
+        response = client.get(path, headers=headers, params=params)
+        response.raise_for_status()
+        count = len(response.json())
+        elapsed = best_of(lambda: client.get(path, headers=headers, params=params), repeat)
+        print(f"{path:28s} {count:6d} 行  {elapsed * 1000:8.1f} ms  {len(response.content) / 1e6:5.2f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="测量大列表接口的序列化耗时")
+    parser.add_argument("--rows", type=int, default=10000, help="每种数据生成的行数（也是请求的 limit）")
+    parser.add_argument("--repeat", type=int, default=5, help="每个接口的请求次数，取最短耗时")
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,264 @@
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """
+    线程安全的进程内缓存，按最近使用淘汰（LRU），每个条目带过期时间（TTL）
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取缓存值，不存在或已过期时返回 default"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存值，超出容量时淘汰最久未使用的条目"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """删除缓存条目（不存在时忽略）"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+# 设备健康分数缓存：device_id -> DeviceHealthAnalysis
+# 使用记录、维护记录或设备状态变化时失效
+device_health_cache = TTLCache(
+    maxsize=settings.DEVICE_HEALTH_CACHE_SIZE,
+    ttl=settings.DEVICE_HEALTH_CACHE_TTL
+)
+
+# 认证用户缓存：user_id -> User 各字段的值（每个请求据此构造独立的对象）
+# crud_user.update / remove 时失效；多进程部署时其他进程最多延迟 AUTH_USER_CACHE_TTL 秒
+auth_user_cache = TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL
+)
+
+# 已解码的访问令牌缓存：sha256(token) -> user_id
+token_cache = TTLCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL
+)
+
+# 用户归属树缓存：user_id -> OwnershipTree
+# 房屋、房间、设备新建或删除时失效
+ownership_cache = TTLCache(
+    maxsize=settings.OWNERSHIP_CACHE_SIZE,
+    ttl=settings.OWNERSHIP_CACHE_TTL
+)
+
+# 设备密钥缓存：device_id -> DevicePrincipal
+# 密钥重新签发、吊销或设备删除时失效
+device_key_cache = TTLCache(
+    maxsize=settings.DEVICE_KEY_CACHE_SIZE,
+    ttl=settings.DEVICE_KEY_CACHE_TTL
+)
+
+class CacheBackend:
+    """
+    分析结果缓存后端接口
+
+    值为序列化后的字节串；计数器（用户缓存版本号）不设过期时间，不能被淘汰。
+    """
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def get_counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+class MemoryCacheBackend(CacheBackend):
+    """进程内缓存后端（默认），多进程部署时每个进程各自缓存"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self._values = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._values.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._values.set(key, value, ttl)
+
+    def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters[key] = self._counters.get(key, 0) + 1
+        return value
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis 协议缓存后端，多个进程共享缓存与失效
+
+    client 只需要支持 get / set(ex=) / incr 三个命令，便于替换为兼容实现。
+    Redis 应使用 volatile-* 淘汰策略，避免淘汰没有过期时间的版本号。
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCacheBackend":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("使用 redis 缓存后端需要安装 redis 包") from e
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+    def get_counter(self, key: str) -> int:
+        value = self.client.get(key)
+        return int(value) if value is not None else 0
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+# 依赖注入的上下文参数，不参与分析缓存键
+_CONTEXT_PARAMS = ("db", "current_user", "ownership")
+
+class AnalyticsCache:
+    """
+    分析接口结果缓存，键为 (user_id, endpoint, params)
+
+    每个用户有一个版本号并拼入缓存键，写操作只需递增版本号即可让该用户的
+    所有旧条目失效，旧条目随 TTL / LRU 自然淘汰。计算开始前就确定了缓存键，
+    计算期间发生的写入不会导致旧结果以新版本号写入。
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 60.0, prefix: str = "analytics"):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _generation_key(self, user_id: int) -> str:
+        return f"{self.prefix}:gen:{user_id}"
+
+    def make_key(self, user_id: int, endpoint: str, params: Dict[str, Any]) -> str:
+        """生成缓存键，参数按名称排序后取摘要"""
+        generation = self.backend.get_counter(self._generation_key(user_id))
+        encoded = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{user_id}:{generation}:{endpoint}:{digest}"
+
+    def get(self, key: str) -> Any:
+        """读取缓存结果，未命中返回 None"""
+        value = self.backend.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存结果，ttl 为空时使用默认有效期"""
+        try:
+            # 已是基本类型的结果（如较长的数值列表）直接编码，不逐个元素经过 jsonable_encoder
+            encoded = json.dumps(value)
+        except TypeError:
+            encoded = json.dumps(jsonable_encoder(value))
+        self.backend.set(key, encoded.encode("utf-8"), self.ttl if ttl is None else ttl)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """使该用户的所有分析结果失效"""
+        try:
+            self.backend.incr(self._generation_key(user_id))
+        except Exception as e:
+            logger.error("分析缓存失效失败: %s", e)
+
+    def cached(self, endpoint: str) -> Callable:
+        """
+        缓存分析接口的返回值
+
+        被装饰的接口必须以关键字参数 current_user 接收当前用户，除依赖注入的
+        上下文参数（_CONTEXT_PARAMS）外的参数都参与缓存键。缓存后端不可用时直接计算。
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                params = {
+                    name: value for name, value in kwargs.items()
+                    if name not in _CONTEXT_PARAMS
+                }
+                key = None
+                try:
+                    key = self.make_key(kwargs["current_user"].id, endpoint, params)
+                    cached = self.get(key)
+                    if cached is not None:
+                        return cached
+                except Exception as e:
+                    logger.error("读取分析缓存失败: %s", e)
+
+                result = func(*args, **kwargs)
+                if key is not None:
+                    try:
+                        self.set(key, result)
+                    except Exception as e:
+                        logger.error("写入分析缓存失败: %s", e)
+                return result
+            return wrapper
+        return decorator
+
+def _create_analytics_backend() -> CacheBackend:
+    if settings.ANALYTICS_CACHE_BACKEND == "redis":
+        if not settings.REDIS_URL:
+            raise RuntimeError("ANALYTICS_CACHE_BACKEND=redis 时必须配置 REDIS_URL")
+        return RedisCacheBackend.from_url(settings.REDIS_URL)
+    return MemoryCacheBackend(
+        maxsize=settings.ANALYTICS_CACHE_SIZE,
+        ttl=settings.ANALYTICS_CACHE_TTL
+    )
+
+# 分析结果缓存：使用记录、维护记录或设备发生写入时按用户失效
+analytics_cache = AnalyticsCache(
+    _create_analytics_backend(),
+    ttl=settings.ANALYTICS_CACHE_TTL
+)
@@ -0,0 +1,40 @@
+import argparse
+import time
+
+from passlib.hash import bcrypt
+
+# bcrypt 允许的成本范围
+MIN_ROUNDS = 4
+MAX_ROUNDS = 16
+
+def measure(rounds: int, samples: int = 3) -> float:
+    """测量指定成本下单次哈希的耗时（毫秒），取多次中的最小值"""
+    hasher = bcrypt.using(rounds=rounds)
+    best = float("inf")
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash("calibration-password")
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def calibrate(target_ms: float) -> int:
+    """
+    选择耗时不超过目标值的最大成本
+
+    成本每加 1 耗时翻倍，从最小成本开始逐级测量，超过目标即停止。
+    """
+    chosen = MIN_ROUNDS
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        elapsed = measure(rounds)
+        print(f"rounds={rounds}: {elapsed:.1f} ms")
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+    return chosen
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="根据目标耗时校准 bcrypt 成本（BCRYPT_ROUNDS）")
+    parser.add_argument("--target-ms", type=float, default=250, help="单次哈希的目标耗时（毫秒）")
+    args = parser.parse_args()
+    rounds = calibrate(args.target_ms)
+    print(f"建议配置: BCRYPT_ROUNDS={rounds}")
@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -17,6 +17,11 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-here"  # 请在生产环境中更改
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    BCRYPT_ROUNDS: int = 12  # bcrypt 计算成本，可用 python -m app.core.calibrate_bcrypt 校准
+    PASSWORD_HASH_WORKERS: int = 4  # 密码哈希线程数
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # 密码哈希最大排队数，超过时返回 503
+    PASSWORD_HASH_RETRY_AFTER: int = 2  # 返回 503 时建议的重试间隔（秒）
+    DEVICE_SIGNATURE_MAX_SKEW: int = 300  # 设备签名请求允许的时间戳偏差（秒）
     
     # 数据库配置
     DATABASE_URL: str = "sqlite:///./smart_home.db"
@@ -28,12 +33,59 @@ class Settings(BaseSettings):
     # 环境配置
     ENV: str = "development"
     
+    # 缓存配置
+    DEVICE_HEALTH_CACHE_SIZE: int = 10000  # 设备健康分数缓存条目上限
+    DEVICE_HEALTH_CACHE_TTL: int = 300  # 设备健康分数缓存有效期（秒）
+    ANALYTICS_CACHE_BACKEND: str = "memory"  # 分析结果缓存后端：memory 或 redis
+    ANALYTICS_CACHE_SIZE: int = 10000  # 进程内分析结果缓存条目上限
+    ANALYTICS_CACHE_TTL: int = 60  # 分析结果缓存有效期（秒）
+    REDIS_URL: Optional[str] = None  # 例如 redis://localhost:6379/0
+    AUTH_USER_CACHE_SIZE: int = 10000  # 认证用户缓存条目上限
+    AUTH_USER_CACHE_TTL: int = 60  # 认证用户缓存有效期（秒）
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # 已解码令牌缓存条目上限
+    AUTH_TOKEN_CACHE_TTL: int = 300  # 已解码令牌缓存有效期上限（秒）
+    OWNERSHIP_CACHE_SIZE: int = 10000  # 用户归属树缓存条目上限
+    OWNERSHIP_CACHE_TTL: int = 300  # 用户归属树缓存有效期（秒）
+    DEVICE_KEY_CACHE_SIZE: int = 100000  # 设备密钥缓存条目上限
+    DEVICE_KEY_CACHE_TTL: int = 60  # 设备密钥缓存有效期（秒），也是吊销在其他进程生效的最长延迟
+    
+    # 并发配置
+    THREADPOOL_SIZE: int = 40  # 同步接口使用的线程池大小，应与数据库连接池容量相匹配
+    
+    # 限流配置
+    RATE_LIMIT_ENABLED: bool = True  # 是否启用限流中间件
+    RATE_LIMIT_USER_RATE: float = 20.0  # 每个调用方每秒补充的请求数
+    RATE_LIMIT_USER_BURST: int = 60  # 每个调用方允许的突发请求数
+    RATE_LIMIT_ROUTE_RATE: float = 10.0  # 每个调用方在单个路由上每秒补充的请求数
+    RATE_LIMIT_ROUTE_BURST: int = 30  # 每个调用方在单个路由上允许的突发请求数
+    RATE_LIMIT_HEAVY_RATE: float = 0.2  # 重量级路由（heavy 标签）每秒补充的请求数
+    RATE_LIMIT_HEAVY_BURST: int = 3  # 重量级路由允许的突发请求数
+    RATE_LIMIT_HEAVY_CONCURRENCY: int = 4  # 重量级路由全局同时执行的请求数上限，超过时返回 503
+    RATE_LIMIT_HEAVY_RETRY_AFTER: int = 5  # 重量级路由返回 503 时建议的重试间隔（秒）
+    RATE_LIMIT_ROUTES: Dict[str, List[float]] = {}  # 按路由模板覆盖 [每秒请求数, 突发数]，例如 {"/api/v1/auth/login": [1, 5]}
+    RATE_LIMIT_SHARDS: int = 16  # 令牌桶分片数
+    RATE_LIMIT_MAX_KEYS: int = 100000  # 令牌桶数量上限，超过时淘汰最久未用的桶
+    ANALYTICS_MAX_DAYS: int = 366  # 分析接口 days 参数上限
+    CORRELATION_MAX_TIME_WINDOW: int = 60  # 设备关联分析时间窗口上限（分钟），窗口越大需要枚举的设备对越多
+    CORRELATION_MAX_TOP_K: int = 200  # 设备关联分析返回的设备对数量上限
+    PEAK_POWER_CACHE_TTL: int = 3600  # 按 (房屋, 日) 缓存的负荷曲线有效期（秒），写入使用记录时随分析缓存失效
+    PEAK_POWER_LOOKBACK_HOURS: int = 24  # 计算负荷时向前多读的小时数，应不小于单次使用的最长时长
+    PEAK_POWER_CURVE_POINTS: int = 500  # 负荷曲线默认返回的最大点数（LTTB 降采样）
+    
+    # 日志配置
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json 或 text
+    LOG_SAMPLING: Dict[str, float] = {}  # logger 名称 -> INFO 及以下日志的保留比例，例如 {"app.core.deps": 0.01}
+    
     # 跨域配置
     BACKEND_CORS_ORIGINS: list = ["*"]
     
     # 静态文件配置
     STATIC_DIR: Path = Path("app/static")
     TEMPLATES_DIR: Path = Path("app/templates")
+    VISUALIZATION_RENDER_WORKERS: int = 2  # 图表渲染进程数
+    VISUALIZATION_RENDER_TIMEOUT: int = 60  # 单个图表渲染超时（秒）
+    VISUALIZATION_FILE_MAX_AGE: int = 3600  # 图表文件在最后一次被请求后保留的秒数，之后被清理
     
     class Config:
         case_sensitive = True
@@ -1,12 +1,27 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import Any, Dict, Generator, Optional, Union
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
+import copy
+import hashlib
 import logging
+import time
 
+from app.core.cache import auth_user_cache, device_key_cache, token_cache
 from app.core.config import settings
+from app.core.device_keys import (
+    DEVICE_ID_HEADER,
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    DevicePrincipal,
+    load_device_principal,
+    verify_signature
+)
+from app.core.ownership import OwnershipResolver
+from app.core.pagination import Cursor, InvalidCursor, decode_cursor
 from app.db.session import SessionLocal
 from app.models.models import User
 from app.schemas.token import TokenPayload
@@ -18,6 +33,12 @@ reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
+# 数据写入接口同时接受设备签名，未携带令牌时不直接返回 401
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/login",
+    auto_error=False
+)
+
 def get_db() -> Generator:
     """
     获取数据库会话
@@ -31,6 +52,38 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+def _decode_access_token(token: str) -> int:
+    """
+    解码访问令牌并返回用户ID
+
+    解码结果按令牌的 SHA-256 缓存，缓存时间不超过令牌剩余有效期。
+    """
+    token_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    user_id = token_cache.get(token_key)
+    if user_id is not None:
+        return user_id
+    
+    payload = jwt.decode(
+        token,
+        settings.SECRET_KEY,
+        algorithms=[settings.ALGORITHM],
+        options={"verify_iat": True, "verify_exp": True}
+    )
+    token_data = TokenPayload(**payload)
+    if payload.get("type") != "access":
+        raise JWTError("Token 类型错误")
+    
+    ttl = settings.AUTH_TOKEN_CACHE_TTL
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(token_key, token_data.sub, ttl)
+    return token_data.sub
+
+def _user_snapshot(user: User) -> Dict[str, Any]:
+    """用户各字段的值，作为认证用户缓存的内容"""
+    return {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}
+
 def get_current_user(
     db: Session = Depends(get_db),
     token: str = Depends(reusable_oauth2)
@@ -38,6 +91,10 @@ def get_current_user(
     """
     获取当前用户
     
+    用户按ID缓存各字段的值，每个请求据此构造独立的 User 对象（不在会话中），
+    只能读取字段，不能访问关联关系，请求中修改字段不影响缓存和其他请求；
+    缓存在 crud_user.update / remove 时失效。
+    
     Args:
         db: 数据库会话
         token: JWT令牌
@@ -55,76 +112,45 @@ def get_current_user(
     )
     
     try:
-        # 记录 token 验证过程
-        logger.info("开始验证访问令牌")
-        
-        # 解码 token
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM],
-            options={"verify_iat": True, "verify_exp": True}
-        )
-        
-        logger.info(f"Token 解码成功，载荷: {payload}")
-        
-        # 验证 token 数据
-        token_data = TokenPayload(**payload)
-        if token_data.sub is None:
-            logger.error("Token 中缺少用户ID")
-            raise credentials_exception
-            
-        if payload.get("type") != "access":
-            logger.error("Token 类型错误")
-            raise credentials_exception
-            
-        logger.info(f"Token 验证成功，用户ID: {token_data.sub}")
-        
+        user_id = _decode_access_token(token)
     except JWTError as e:
-        logger.error(f"JWT 验证失败: {str(e)}")
+        logger.error("JWT 验证失败: %s", e)
         raise credentials_exception
     except ValidationError as e:
-        logger.error(f"Token 数据验证失败: {str(e)}")
+        logger.error("Token 数据验证失败: %s", e)
         raise credentials_exception
     except Exception as e:
-        logger.error(f"Token 验证过程发生未知错误: {str(e)}")
+        logger.error("Token 验证过程发生未知错误: %s", e)
         raise credentials_exception
     
-    try:
-        # 查询用户
-        user_id = int(token_data.sub)  # 将字符串ID转换为整数
-        logger.info(f"开始查询用户信息，用户ID: {user_id}")
-        user = db.query(User).filter(User.id == user_id).first()
+    snapshot = auth_user_cache.get(user_id)
+    if snapshot is None:
+        try:
+            user = db.query(User).filter(User.id == user_id).first()
+        except Exception as e:
+            logger.error("获取用户信息失败: %s", e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="获取用户信息失败"
+            )
         
         if not user:
-            logger.error(f"用户不存在: {user_id}")
+            logger.error("用户不存在: %s", user_id)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="用户不存在"
             )
-            
-        if not user.is_active:
-            logger.error(f"用户未激活: {user.email}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="用户未激活"
-            )
-            
-        logger.info(f"成功获取用户信息: {user.email}")
-        return user
-        
-    except ValueError as e:
-        logger.error(f"用户ID格式错误: {str(e)}")
+        snapshot = _user_snapshot(user)
+        auth_user_cache.set(user_id, snapshot)
+    
+    user = User(**copy.deepcopy(snapshot))
+    if not user.is_active:
+        logger.error("用户未激活: %s", user.email)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="无效的用户ID格式"
-        )
-    except Exception as e:
-        logger.error(f"获取用户信息失败: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"获取用户信息失败: {str(e)}"
+            detail="用户未激活"
         )
+    return user
 
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
@@ -143,15 +169,88 @@ def get_current_active_user(
     """
     try:
         if not current_user.is_active:
-            logger.error(f"用户未激活: {current_user.email}")
+            logger.error("用户未激活: %s", current_user.email)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="用户未激活"
             )
         return current_user
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"验证用户状态失败: {str(e)}")
+        logger.error("验证用户状态失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="验证用户状态失败"
-        ) 
\ No newline at end of file
+        )
+
+def get_cursor(cursor: Optional[str] = None) -> Optional[Cursor]:
+    """
+    解析分页游标查询参数（取自上一页响应头 X-Next-Cursor）
+    
+    Raises:
+        HTTPException: 游标格式错误时抛出
+    """
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+def get_ownership(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> OwnershipResolver:
+    """
+    获取当前用户的归属判断器（按需加载，进程内缓存）
+    """
+    return OwnershipResolver(db, current_user.id)
+
+async def get_ingestion_principal(
+    request: Request,
+    db: Session = Depends(get_db),
+    token: Optional[str] = Depends(optional_oauth2),
+) -> Union[DevicePrincipal, OwnershipResolver]:
+    """
+    获取数据写入方
+
+    携带 X-Device-Id 头的请求按设备密钥校验请求体签名，密钥命中缓存时不访问数据库，
+    也不查询用户；否则按用户令牌认证。两种写入方都提供 user_id 与 house_of_device。
+    """
+    device_header = request.headers.get(DEVICE_ID_HEADER)
+    if device_header is None:
+        if token is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        user = await run_in_threadpool(get_current_user, db, token)
+        return OwnershipResolver(db, user.id)
+
+    signature_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="设备签名无效"
+    )
+    timestamp = request.headers.get(TIMESTAMP_HEADER)
+    signature = request.headers.get(SIGNATURE_HEADER)
+    if not timestamp or not signature or not device_header.isdigit():
+        raise signature_exception
+
+    device_id = int(device_header)
+    principal = device_key_cache.get(device_id)
+    if principal is None:
+        principal = await run_in_threadpool(load_device_principal, db, device_id)
+    if principal is None:
+        logger.warning("设备密钥不存在或已吊销: %s", device_id)
+        raise signature_exception
+
+    body = await request.body()
+    if not verify_signature(principal, timestamp, signature, request.method, request.url.path, body):
+        logger.warning("设备签名校验失败: %s", device_id)
+        raise signature_exception
+    return principal
@@ -0,0 +1,143 @@
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import device_key_cache
+from app.core.config import settings
+from app.models.models import Device, House, Room, User
+
+logger = logging.getLogger(__name__)
+
+# 设备签名请求头
+DEVICE_ID_HEADER = "X-Device-Id"
+TIMESTAMP_HEADER = "X-Timestamp"
+SIGNATURE_HEADER = "X-Signature"
+
+class DevicePrincipal:
+    """
+    以设备密钥认证的写入方
+
+    与 OwnershipResolver 提供相同的 user_id / house_of_device 接口，写入接口可以不区分
+    请求来自用户还是设备；设备只能写入自己的数据。
+    """
+
+    __slots__ = ("device_id", "house_id", "user_id", "signing_key")
+
+    def __init__(self, device_id: int, house_id: int, user_id: int, signing_key: bytes):
+        self.device_id = device_id
+        self.house_id = house_id
+        self.user_id = user_id
+        self.signing_key = signing_key
+
+    def house_of_device(self, device_id: Optional[int]) -> Optional[int]:
+        """设备所在房屋ID，不是本设备时返回 None"""
+        if device_id != self.device_id:
+            return None
+        return self.house_id
+
+def _derive_device_key(device_id: int, salt: str) -> str:
+    """由 SECRET_KEY 与随机盐派生设备密钥"""
+    message = f"device:{device_id}:{salt}".encode("utf-8")
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+def _hash_device_key(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def issue_device_key(db: Session, device: Device) -> str:
+    """
+    为设备签发（或轮换）密钥，返回密钥明文，明文只在签发时返回一次
+
+    签名校验需要服务端持有密钥，因此密钥由 SECRET_KEY 与随机盐派生而不是随机生成后保存；
+    数据库只保存盐和密钥摘要，单独泄露数据库不能伪造签名。更换 SECRET_KEY 会使所有设备密钥失效。
+    """
+    salt = secrets.token_hex(16)
+    key = _derive_device_key(device.id, salt)
+    device.api_key_salt = salt
+    device.api_key_hash = _hash_device_key(key)
+    device.api_key_created_at = datetime.utcnow()
+    db.add(device)
+    db.commit()
+    device_key_cache.pop(device.id)
+    return key
+
+def revoke_device_key(db: Session, device: Device) -> None:
+    """吊销设备密钥，其他进程最多延迟 DEVICE_KEY_CACHE_TTL 秒生效"""
+    device.api_key_salt = None
+    device.api_key_hash = None
+    device.api_key_created_at = None
+    db.add(device)
+    db.commit()
+    device_key_cache.pop(device.id)
+
+def load_device_principal(db: Session, device_id: int) -> Optional[DevicePrincipal]:
+    """
+    加载设备密钥与归属并写入缓存，设备不存在、未签发密钥或所有者未激活时返回 None
+    """
+    row = db.query(
+        Device.api_key_salt,
+        Device.api_key_hash,
+        Room.house_id,
+        House.user_id,
+        User.is_active
+    ).join(
+        Room, Device.room_id == Room.id
+    ).join(
+        House, Room.house_id == House.id
+    ).join(
+        User, House.user_id == User.id
+    ).filter(
+        Device.id == device_id
+    ).first()
+    if row is None or not row.api_key_salt or not row.is_active:
+        return None
+
+    key = _derive_device_key(device_id, row.api_key_salt)
+    if not hmac.compare_digest(_hash_device_key(key), row.api_key_hash or ""):
+        logger.warning("设备密钥摘要不匹配（SECRET_KEY 是否已更换？）: %s", device_id)
+        return None
+
+    principal = DevicePrincipal(device_id, row.house_id, row.user_id, key.encode("utf-8"))
+    device_key_cache.set(device_id, principal)
+    return principal
+
+def signing_message(timestamp: str, method: str, path: str, body: bytes) -> bytes:
+    """签名内容：时间戳、请求方法、路径与原始请求体"""
+    return f"{timestamp}\n{method.upper()}\n{path}\n".encode("utf-8") + body
+
+def verify_signature(
+    principal: DevicePrincipal,
+    timestamp: str,
+    signature: str,
+    method: str,
+    path: str,
+    body: bytes
+) -> bool:
+    """
+    校验 HMAC-SHA256 签名与时间戳
+
+    时间戳为整数 Unix 秒，与服务器时间相差超过 DEVICE_SIGNATURE_MAX_SKEW 秒的请求被拒绝；
+    签名为十六进制字符串，含非 ASCII 字符时直接视为不匹配。
+    """
+    try:
+        skew = abs(time.time() - int(timestamp))
+    except ValueError:
+        return False
+    if skew > settings.DEVICE_SIGNATURE_MAX_SKEW:
+        return False
+    try:
+        provided = signature.lower().encode("ascii")
+    except UnicodeEncodeError:
+        return False
+
+    expected = hmac.new(
+        principal.signing_key,
+        signing_message(timestamp, method, path, body),
+        hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(expected.encode("ascii"), provided)
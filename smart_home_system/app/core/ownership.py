@@ -0,0 +1,109 @@
+from typing import Dict, FrozenSet, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import ownership_cache
+from app.models.models import Device, House, Room
+
+class OwnershipTree:
+    """用户拥有的房屋→房间→设备ID集合（只读）"""
+
+    __slots__ = ("house_ids", "room_ids", "device_ids", "room_house", "device_house")
+
+    def __init__(self, room_house: Dict[int, int], device_house: Dict[int, int], house_ids: FrozenSet[int]):
+        self.house_ids = house_ids
+        self.room_ids = frozenset(room_house)
+        self.device_ids = frozenset(device_house)
+        self.room_house = room_house
+        self.device_house = device_house
+
+def load_ownership_tree(db: Session, user_id: int) -> OwnershipTree:
+    """用一次查询加载用户的房屋、房间、设备ID"""
+    rows = db.query(House.id, Room.id, Device.id).outerjoin(
+        Room,
+        Room.house_id == House.id
+    ).outerjoin(
+        Device,
+        Device.room_id == Room.id
+    ).filter(
+        House.user_id == user_id
+    ).all()
+
+    house_ids = set()
+    room_house: Dict[int, int] = {}
+    device_house: Dict[int, int] = {}
+    for house_id, room_id, device_id in rows:
+        house_ids.add(house_id)
+        if room_id is not None:
+            room_house[room_id] = house_id
+        if device_id is not None:
+            device_house[device_id] = house_id
+    return OwnershipTree(room_house, device_house, frozenset(house_ids))
+
+def invalidate_ownership(user_id: int) -> None:
+    """房屋、房间或设备新建/删除后使该用户的归属缓存失效"""
+    ownership_cache.pop(user_id)
+
+class OwnershipResolver:
+    """
+    当前请求的归属判断
+
+    首次使用时从进程内缓存取得（或加载）用户的归属树，之后的判断都是集合查找。
+    判断为否时会从数据库重新加载一次再下结论，其他进程新建的对象不会被误判为无权访问。
+    """
+
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self._tree: Optional[OwnershipTree] = None
+        self._refreshed = False
+
+    @property
+    def tree(self) -> OwnershipTree:
+        if self._tree is None:
+            self._tree = ownership_cache.get(self.user_id)
+            if self._tree is None:
+                self._reload()
+        return self._tree
+
+    def _reload(self) -> None:
+        self._tree = load_ownership_tree(self.db, self.user_id)
+        self._refreshed = True
+        ownership_cache.set(self.user_id, self._tree)
+
+    def _contains(self, attr: str, object_id: Optional[int]) -> bool:
+        if object_id is None:
+            return False
+        if object_id in getattr(self.tree, attr):
+            return True
+        if not self._refreshed:
+            self._reload()
+            return object_id in getattr(self._tree, attr)
+        return False
+
+    @property
+    def house_ids(self) -> FrozenSet[int]:
+        return self.tree.house_ids
+
+    @property
+    def room_ids(self) -> FrozenSet[int]:
+        return self.tree.room_ids
+
+    @property
+    def device_ids(self) -> FrozenSet[int]:
+        return self.tree.device_ids
+
+    def owns_house(self, house_id: Optional[int]) -> bool:
+        return self._contains("house_ids", house_id)
+
+    def owns_room(self, room_id: Optional[int]) -> bool:
+        return self._contains("room_ids", room_id)
+
+    def owns_device(self, device_id: Optional[int]) -> bool:
+        return self._contains("device_ids", device_id)
+
+    def house_of_device(self, device_id: Optional[int]) -> Optional[int]:
+        """设备所在房屋ID，设备不属于当前用户时返回 None"""
+        if not self.owns_device(device_id):
+            return None
+        return self.tree.device_house[device_id]
@@ -0,0 +1,91 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# 下一页游标通过响应头返回，响应体仍是列表，旧客户端不受影响
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# 解码后的游标：(排序键, id)
+Cursor = Tuple[Any, int]
+
+class InvalidCursor(ValueError):
+    """分页游标格式错误"""
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """把 (排序键, id) 编码为不透明的游标字符串"""
+    if isinstance(sort_value, datetime):
+        payload = ["dt", sort_value.isoformat(), row_id]
+    else:
+        payload = ["v", sort_value, row_id]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_cursor(cursor: str) -> Cursor:
+    """解码游标字符串，格式错误时抛出 InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        kind, value, row_id = json.loads(raw)
+        if kind == "dt":
+            value = datetime.fromisoformat(value)
+        elif kind != "v":
+            raise ValueError(kind)
+        if not isinstance(row_id, int):
+            raise ValueError(row_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursor(str(e)) from e
+    return value, row_id
+
+def keyset_paginate(
+    query: Query,
+    sort_column: Any,
+    id_column: Any,
+    *,
+    cursor: Optional[Cursor] = None,
+    skip: int = 0,
+    limit: int = 100,
+    descending: bool = True
+) -> Query:
+    """
+    按 (排序键, id) 排序分页
+
+    有游标时追加 WHERE (排序键, id) < (游标值)（升序时为 >），由以这两列结尾的复合索引
+    直接定位，翻到多深都只读取 limit 行，并发插入也不会导致跳过或重复；没有游标时
+    退回 OFFSET 分页。排序键就是 id 时只比较 id。
+    """
+    by_id = sort_column is id_column
+    if cursor is not None:
+        value, row_id = cursor
+        if by_id:
+            key, bound = id_column, row_id
+        else:
+            key, bound = tuple_(sort_column, id_column), tuple_(value, row_id)
+        query = query.filter(key < bound if descending else key > bound)
+
+    if by_id:
+        order = [id_column.desc() if descending else id_column.asc()]
+    elif descending:
+        order = [sort_column.desc(), id_column.desc()]
+    else:
+        order = [sort_column.asc(), id_column.asc()]
+    query = query.order_by(*order)
+    if cursor is None and skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def next_cursor(rows: Sequence[Any], limit: int, sort_key: str, id_key: str = "id") -> Optional[str]:
+    """
+    根据本页最后一行生成下一页游标，本页不足 limit 行时返回 None
+    """
+    if limit <= 0 or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, sort_key), getattr(last, id_key))
+
+def cursor_headers(cursor: Optional[str]) -> dict:
+    """下一页游标响应头"""
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
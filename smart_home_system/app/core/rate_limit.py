@@ -0,0 +1,194 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+from app.core.config import settings
+
+# 标记为重量级接口的路由标签，这类接口受全局并发上限约束
+HEAVY_TAG = "heavy"
+
+class TokenBucket:
+    """令牌桶：以 rate 个/秒补充，最多累积 capacity 个"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def take(self, now: float) -> float:
+        """
+        取一个令牌，成功返回 0，否则返回需要等待的秒数
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class ShardedBuckets:
+    """
+    按键分片的令牌桶集合
+
+    每个分片有独立的锁和 LRU 字典，不同键的请求很少竞争同一把锁；锁内只做几次
+    浮点运算。分片超过容量时淘汰最久未用的桶，被淘汰的键下次以满桶重新开始。
+    """
+
+    def __init__(self, shards: int = 16, maxsize: int = 100000):
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(max(1, shards))]
+        self._shard_size = max(1, maxsize // len(self._shards))
+
+    def take(self, key: Hashable, rate: float, capacity: float) -> float:
+        """从 key 对应的桶中取一个令牌，返回需要等待的秒数（0 表示放行）"""
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = TokenBucket(rate, capacity, now)
+                if len(buckets) > self._shard_size:
+                    buckets.popitem(last=False)
+            else:
+                buckets.move_to_end(key)
+            return bucket.take(now)
+
+class RouteInfo:
+    """限流用的路由信息"""
+
+    __slots__ = ("key", "heavy", "rate", "burst")
+
+    def __init__(self, key: str, heavy: bool, rate: float, burst: float):
+        self.key = key
+        self.heavy = heavy
+        self.rate = rate
+        self.burst = burst
+
+def _route_limits(path: str, heavy: bool) -> Tuple[float, float]:
+    override: Optional[Sequence[float]] = settings.RATE_LIMIT_ROUTES.get(path)
+    if override:
+        return float(override[0]), float(override[1])
+    if heavy:
+        return settings.RATE_LIMIT_HEAVY_RATE, settings.RATE_LIMIT_HEAVY_BURST
+    return settings.RATE_LIMIT_ROUTE_RATE, settings.RATE_LIMIT_ROUTE_BURST
+
+def _too_many_requests(detail: str, retry_after: float, status_code: int = 429) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+class RateLimitMiddleware:
+    """
+    请求限流与准入控制
+
+    - 每个调用方一个总令牌桶，每个 (调用方, 路由) 一个路由令牌桶，超出时返回 429；
+    - 带 heavy 标签的路由共享 RATE_LIMIT_HEAVY_CONCURRENCY 个并发名额，名额用完时
+      立即返回 503，而不是让请求排队占满线程池。
+
+    调用方按已验证的访问令牌识别为用户，其他请求按客户端地址识别；携带设备ID的请求
+    在地址的令牌桶之外再扣 (设备ID, 客户端地址) 的令牌桶。中间件在路由之前执行，
+    路由匹配结果按 (方法, 路径) 缓存。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.buckets = ShardedBuckets(
+            shards=settings.RATE_LIMIT_SHARDS,
+            maxsize=settings.RATE_LIMIT_MAX_KEYS
+        )
+        self._route_cache: "OrderedDict[Tuple[str, str], Optional[RouteInfo]]" = OrderedDict()
+        # 只在事件循环线程中增减，不需要加锁
+        self._heavy_in_flight = 0
+
+    def _match_route(self, scope) -> Optional[RouteInfo]:
+        cache_key = (scope["method"], scope["path"])
+        info = self._route_cache.get(cache_key, False)
+        if info is not False:
+            return info
+
+        info = None
+        for route in scope["app"].routes:
+            if not isinstance(route, APIRoute):
+                continue
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                heavy = HEAVY_TAG in (route.tags or [])
+                rate, burst = _route_limits(route.path, heavy)
+                info = RouteInfo(f"{scope['method']} {route.path}", heavy, rate, burst)
+                break
+
+        self._route_cache[cache_key] = info
+        if len(self._route_cache) > settings.RATE_LIMIT_MAX_KEYS:
+            self._route_cache.popitem(last=False)
+        return info
+
+    def _client_keys(self, scope) -> List[str]:
+        """请求需要扣减令牌的调用方键，任一键的令牌桶耗尽即拒绝"""
+        headers = Headers(scope=scope)
+        authorization = headers.get("authorization")
+        if authorization and authorization[:7].lower() == "bearer ":
+            # 延迟导入，避免 core 模块之间的循环依赖
+            from app.core.deps import _decode_access_token
+            try:
+                return [f"user:{_decode_access_token(authorization[7:])}"]
+            except Exception:
+                pass
+        client = scope.get("client")
+        address = client[0] if client else "-"
+        keys = [f"ip:{address}"]
+        # 设备签名在路由内才校验，设备ID由客户端提供：始终扣地址的令牌，轮换设备ID
+        # 不能绕过按地址的限流；另按 (设备, 地址) 计数，其他地址伪造设备ID耗不尽该设备的令牌
+        device_id = headers.get("x-device-id")
+        if device_id:
+            keys.append(f"device:{device_id[:32]}@{address}")
+        return keys
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        route = self._match_route(scope)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = 0.0
+        for client_key in self._client_keys(scope):
+            wait = self.buckets.take(client_key, settings.RATE_LIMIT_USER_RATE, settings.RATE_LIMIT_USER_BURST)
+            if not wait:
+                wait = self.buckets.take((client_key, route.key), route.rate, route.burst)
+            if wait:
+                break
+        if wait:
+            await _too_many_requests("请求过于频繁，请稍后重试", wait)(scope, receive, send)
+            return
+
+        if not route.heavy:
+            await self.app(scope, receive, send)
+            return
+
+        if self._heavy_in_flight >= settings.RATE_LIMIT_HEAVY_CONCURRENCY:
+            response = _too_many_requests(
+                "服务器繁忙，请稍后重试",
+                settings.RATE_LIMIT_HEAVY_RETRY_AFTER,
+                status_code=503
+            )
+            await response(scope, receive, send)
+            return
+        self._heavy_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._heavy_in_flight -= 1
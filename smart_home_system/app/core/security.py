@@ -1,5 +1,8 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Union
 from jose import jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -10,7 +13,11 @@ from app.models.models import User
 import logging
 
 # 密码上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +46,46 @@ def get_password_hash(password: str) -> str:
     """
     return pwd_context.hash(password)
 
+class PasswordHasherBusy(Exception):
+    """密码哈希队列已满"""
+
+class PasswordHasher:
+    """
+    在独立的有界线程池中计算 bcrypt
+
+    bcrypt 计算期间释放 GIL，用线程池即可并行；与请求线程池分开，登录高峰
+    不会占满其他接口的线程。执行中加排队的任务数超过 workers + max_queue 时
+    直接拒绝（PasswordHasherBusy），由接口返回 503。
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+
+    async def _run(self, func: Callable, *args) -> Any:
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        """异步计算密码哈希"""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """异步验证密码"""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
+
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
 ) -> str:
@@ -61,7 +108,7 @@ def create_access_token(
             )
         
         # 记录 token 创建过程
-        logger.info(f"开始创建访问令牌，用户ID: {subject}")
+        logger.debug("开始创建访问令牌，用户ID: %s", subject)
         
         to_encode = {
             "exp": expire,
@@ -70,18 +117,16 @@ def create_access_token(
             "type": "access"
         }
         
-        logger.info(f"Token 载荷: {to_encode}")
-        
         encoded_jwt = jwt.encode(
             to_encode,
             settings.SECRET_KEY,
             algorithm=settings.ALGORITHM
         )
         
-        logger.info("访问令牌创建成功")
+        logger.debug("访问令牌创建成功")
         return encoded_jwt
     except Exception as e:
-        logger.error(f"创建访问令牌失败: {str(e)}")
+        logger.error("创建访问令牌失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"创建访问令牌失败: {str(e)}"
@@ -0,0 +1,40 @@
+from typing import Any, Iterable, List, Mapping, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+class RowSerializer:
+    """
+    列表接口的快速序列化
+
+    只查询响应模型需要的列，得到行元组而不构造 ORM 对象（没有标识映射和对象状态
+    的开销）；行元组按列名组成字典后，用 Pydantic TypeAdapter 一次性校验并输出 JSON
+    字节，不再逐个对象读取属性、转换为 Python 基本类型再编码。响应模型中数据库表
+    没有的字段取模型默认值。
+
+    接口仍在装饰器中声明 response_model，只用于生成 OpenAPI 文档。
+    """
+
+    def __init__(self, schema: Type[BaseModel], model: Any):
+        self.schema = schema
+        self.adapter = TypeAdapter(List[schema])
+        self.columns = [
+            column for column in (getattr(model, name, None) for name in schema.model_fields)
+            if isinstance(column, InstrumentedAttribute)
+        ]
+        self.fields = [column.key for column in self.columns]
+
+    def dump_json(self, rows: Iterable[Any]) -> bytes:
+        """把查询结果行序列化为 JSON 数组"""
+        fields = self.fields
+        items = self.adapter.validate_python([dict(zip(fields, row)) for row in rows])
+        return self.adapter.dump_json(items)
+
+    def response(self, rows: Iterable[Any], headers: Optional[Mapping[str, str]] = None) -> Response:
+        """把查询结果行序列化为 JSON 响应"""
+        return Response(
+            content=self.dump_json(rows),
+            media_type="application/json",
+            headers=headers
+        )
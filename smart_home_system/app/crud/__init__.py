@@ -2,6 +2,8 @@ from app.crud.crud_user import crud_user
 from app.crud.crud_device import crud_device
 from app.crud.crud_house import crud_house
 from app.crud.crud_room import crud_room
+from app.crud.crud_usage_rollup import crud_usage_rollup
+from app.crud.crud_tariff import crud_tariff
 
 # 导出所有 CRUD 对象
 __all__ = [
@@ -9,6 +11,8 @@ __all__ = [
     "crud_device",
     "crud_house",
     "crud_room",
+    "crud_usage_rollup",
+    "crud_tariff",
 ]
 
 # 为了向后兼容，添加 user 属性
@@ -2,6 +2,7 @@ from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from app.core.pagination import Cursor, keyset_paginate
 from app.db.base_class import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -21,9 +22,18 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return db.query(self.model).filter(self.model.id == id).first()
 
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self, db: Session, *, skip: int = 0, limit: int = 100, cursor: Optional[Cursor] = None
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        """按 id 升序分页，有游标时从游标之后开始，否则跳过 skip 条"""
+        return keyset_paginate(
+            db.query(self.model),
+            self.model.id,
+            self.model.id,
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+            descending=False
+        ).all()
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
@@ -1,5 +1,6 @@
-from typing import List, Optional
+from typing import Any, Iterable, List, Optional, Sequence
 from sqlalchemy.orm import Session
+from app.core.pagination import Cursor, keyset_paginate
 from app.crud.base import CRUDBase
 from app.models.models import Device
 from app.schemas.device import DeviceCreate, DeviceUpdate
@@ -12,6 +13,33 @@ class CRUDDevice(CRUDBase[Device, DeviceCreate, DeviceUpdate]):
         """获取指定房屋的所有设备"""
         return db.query(self.model).filter(self.model.house_id == house_id).all()
     
+    def get_multi_by_ids(
+        self,
+        db: Session,
+        *,
+        ids: Iterable[int],
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[Cursor] = None,
+        columns: Optional[Sequence[Any]] = None
+    ) -> List[Any]:
+        """
+        获取指定ID范围内的设备（按ID排序分页，有游标时从游标之后开始）
+
+        指定 columns 时只查询这些列，返回行元组而不是 Device 对象。
+        """
+        query = db.query(*columns) if columns else db.query(self.model)
+        query = query.filter(self.model.id.in_(ids))
+        return keyset_paginate(
+            query,
+            self.model.id,
+            self.model.id,
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+            descending=False
+        ).all()
+    
     def create(self, db: Session, *, obj_in: DeviceCreate) -> Device:
         """创建设备，处理日期转换"""
         obj_in_data = obj_in.dict()
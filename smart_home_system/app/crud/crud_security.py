@@ -1,5 +1,6 @@
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any, Sequence
 from sqlalchemy.orm import Session
+from app.core.pagination import Cursor, keyset_paginate
 from app.models.models import SecurityEvent
 from app.schemas.security import SecurityEventCreate, SecurityEventUpdate
 from datetime import datetime
@@ -33,16 +34,25 @@ class CRUDSecurity:
         skip: int = 0,
         limit: int = 100,
         house_id: Optional[int] = None,
+        house_ids: Optional[Iterable[int]] = None,
         device_id: Optional[int] = None,
         event_type: Optional[str] = None,
         severity: Optional[str] = None,
         status: Optional[str] = None,
         start_time: Optional[datetime] = None,
-        end_time: Optional[datetime] = None
-    ) -> List[SecurityEvent]:
-        """获取安全事件列表"""
-        query = db.query(SecurityEvent)
+        end_time: Optional[datetime] = None,
+        cursor: Optional[Cursor] = None,
+        columns: Optional[Sequence[Any]] = None
+    ) -> List[Any]:
+        """
+        获取安全事件列表（house_ids 限定可见的房屋范围），按 (event_time, id) 倒序分页
+
+        指定 columns 时只查询这些列，返回行元组而不是 SecurityEvent 对象。
+        """
+        query = db.query(*columns) if columns else db.query(SecurityEvent)
         
+        if house_ids is not None:
+            query = query.filter(SecurityEvent.house_id.in_(house_ids))
         if house_id:
             query = query.filter(SecurityEvent.house_id == house_id)
         if device_id:
@@ -58,7 +68,14 @@ class CRUDSecurity:
         if end_time:
             query = query.filter(SecurityEvent.event_time <= end_time)
         
-        return query.order_by(SecurityEvent.event_time.desc()).offset(skip).limit(limit).all()
+        return keyset_paginate(
+            query,
+            SecurityEvent.event_time,
+            SecurityEvent.id,
+            cursor=cursor,
+            skip=skip,
+            limit=limit
+        ).all()
 
     def update(
         self,
@@ -0,0 +1,49 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.crud.base import CRUDBase
+from app.models.models import Tariff, TariffWindow
+from app.schemas.tariff import TariffUpdate
+from app.services.tariff import TariffSchedule, reprice_house
+
+class CRUDTariff(CRUDBase[Tariff, TariffUpdate, TariffUpdate]):
+    """电价方案 CRUD 操作，方案变更时在同一事务中重新计算房屋的使用费用"""
+
+    def get_by_house(self, db: Session, *, house_id: int) -> Optional[Tariff]:
+        """获取房屋的电价方案"""
+        return db.query(self.model).filter(self.model.house_id == house_id).first()
+
+    def set_for_house(self, db: Session, *, house_id: int, obj_in: TariffUpdate) -> Tariff:
+        """
+        设置房屋的电价方案（时段整体替换）并重新计价
+
+        Raises:
+            ValueError: 时段之间有重叠
+        """
+        schedule = TariffSchedule.from_windows(obj_in.base_price, obj_in.windows, obj_in.utc_offset_minutes)
+        tariff = self.get_by_house(db, house_id=house_id)
+        if tariff is None:
+            tariff = Tariff(house_id=house_id)
+        else:
+            tariff.updated_at = datetime.utcnow()
+        tariff.name = obj_in.name
+        tariff.base_price = obj_in.base_price
+        tariff.utc_offset_minutes = obj_in.utc_offset_minutes
+        tariff.windows = [TariffWindow(**window.dict()) for window in obj_in.windows]
+        db.add(tariff)
+        reprice_house(db, house_id, schedule)
+        db.commit()
+        db.refresh(tariff)
+        return tariff
+
+    def remove_for_house(self, db: Session, *, house_id: int) -> Optional[Tariff]:
+        """删除房屋的电价方案并清空使用费用，没有方案时返回 None"""
+        tariff = self.get_by_house(db, house_id=house_id)
+        if tariff is None:
+            return None
+        db.delete(tariff)
+        reprice_house(db, house_id, None)
+        db.commit()
+        return tariff
+
+crud_tariff = CRUDTariff(Tariff)
@@ -0,0 +1,126 @@
+from typing import Any, Dict, Iterable, Tuple
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models.models import DeviceUsageRecord, UsageRollupHourly
+
+# 汇总表中可累加的计数列
+ROLLUP_COUNTERS = (
+    "usage_count",
+    "total_duration",
+    "total_energy",
+    "automated_count",
+    "automated_duration",
+    "automated_energy",
+    "total_cost",
+)
+
+def hour_bucket(value: datetime) -> datetime:
+    """返回时间所在的整点"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+def _field(record: Any, name: str) -> Any:
+    if isinstance(record, dict):
+        return record.get(name)
+    return getattr(record, name)
+
+class CRUDUsageRollup:
+    """设备使用小时汇总的增量维护"""
+
+    def apply(self, db: Session, records: Iterable[Any], sign: int = 1) -> None:
+        """
+        将使用记录累加（sign=1）或扣除（sign=-1）到小时汇总中
+
+        records 可以是 DeviceUsageRecord 对象或字段字典，费用取记录的 cost 字段
+        （由 services.tariff.assign_costs 预先计算）。只执行语句不提交，
+        由调用方与使用记录的写入放在同一事务中提交。
+        """
+        deltas: Dict[Tuple[int, datetime], Dict[str, Any]] = {}
+        for record in records:
+            key = (_field(record, "device_id"), hour_bucket(_field(record, "start_time")))
+            delta = deltas.get(key)
+            if delta is None:
+                delta = deltas[key] = dict.fromkeys(ROLLUP_COUNTERS, 0)
+                delta["house_id"] = _field(record, "house_id")
+                delta["owner_user_id"] = _field(record, "owner_user_id")
+            duration = (_field(record, "duration") or 0) * sign
+            energy = (_field(record, "energy_consumption") or 0) * sign
+            delta["usage_count"] += sign
+            delta["total_duration"] += duration
+            delta["total_energy"] += energy
+            delta["total_cost"] += (_field(record, "cost") or 0) * sign
+            if _field(record, "is_automated"):
+                delta["automated_count"] += sign
+                delta["automated_duration"] += duration
+                delta["automated_energy"] += energy
+
+        if not deltas:
+            return
+
+        rows = [
+            {"device_id": device_id, "hour_bucket": bucket, **delta}
+            for (device_id, bucket), delta in deltas.items()
+        ]
+        self._upsert(db, rows)
+
+        if sign < 0:
+            # 清理已经没有记录的小时
+            db.query(UsageRollupHourly).filter(
+                UsageRollupHourly.device_id.in_({device_id for device_id, _ in deltas}),
+                UsageRollupHourly.usage_count <= 0
+            ).delete(synchronize_session=False)
+
+    def _upsert(self, db: Session, rows: list) -> None:
+        """按 (device_id, hour_bucket) 原子地累加计数"""
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            for row in rows:
+                rollup = db.get(UsageRollupHourly, (row["device_id"], row["hour_bucket"]))
+                if rollup is None:
+                    db.add(UsageRollupHourly(**row))
+                else:
+                    for column in ROLLUP_COUNTERS:
+                        setattr(rollup, column, getattr(rollup, column) + row[column])
+            db.flush()
+            return
+
+        table = UsageRollupHourly.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.device_id, table.c.hour_bucket],
+            set_={column: table.c[column] + stmt.excluded[column] for column in ROLLUP_COUNTERS}
+        )
+        db.execute(stmt, rows)
+
+    def rebuild(self, db: Session, batch_size: int = 10000) -> None:
+        """根据原始使用记录全量重建小时汇总"""
+        db.query(UsageRollupHourly).delete(synchronize_session=False)
+        rows = db.query(
+            DeviceUsageRecord.device_id,
+            DeviceUsageRecord.house_id,
+            DeviceUsageRecord.owner_user_id,
+            DeviceUsageRecord.start_time,
+            DeviceUsageRecord.duration,
+            DeviceUsageRecord.energy_consumption,
+            DeviceUsageRecord.is_automated,
+            DeviceUsageRecord.cost
+        ).filter(
+            DeviceUsageRecord.device_id.isnot(None)
+        ).order_by(
+            DeviceUsageRecord.device_id,
+            DeviceUsageRecord.start_time
+        ).yield_per(batch_size)
+
+        batch = []
+        for row in rows:
+            batch.append(row._asdict())
+            if len(batch) >= batch_size:
+                self.apply(db, batch)
+                batch = []
+        self.apply(db, batch)
+        db.commit()
+
+crud_usage_rollup = CRUDUsageRollup()
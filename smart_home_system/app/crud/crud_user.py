@@ -1,6 +1,7 @@
 from typing import Any, Dict, Optional, Union
 from sqlalchemy.orm import Session
 
+from app.core.cache import auth_user_cache, ownership_cache
 from app.core.security import get_password_hash, verify_password
 from app.crud.base import CRUDBase
 from app.models.models import User
@@ -11,11 +12,13 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         """根据邮箱获取用户"""
         return db.query(User).filter(User.email == email).first()
 
-    def create(self, db: Session, *, obj_in: UserCreate) -> User:
-        """创建新用户"""
+    def create(
+        self, db: Session, *, obj_in: UserCreate, hashed_password: Optional[str] = None
+    ) -> User:
+        """创建新用户（hashed_password 为已计算好的密码哈希，未提供时同步计算）"""
         db_obj = User(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password or get_password_hash(obj_in.password),
             full_name=obj_in.full_name,
             phone_number=obj_in.phone_number,
             preferences=obj_in.preferences,
@@ -38,7 +41,16 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             hashed_password = get_password_hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        user = super().update(db, db_obj=db_obj, obj_in=update_data)
+        auth_user_cache.pop(user.id)
+        return user
+
+    def remove(self, db: Session, *, id: int) -> User:
+        """删除用户"""
+        user = super().remove(db, id=id)
+        auth_user_cache.pop(id)
+        ownership_cache.pop(id)
+        return user
 
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         """验证用户"""
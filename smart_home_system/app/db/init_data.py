@@ -62,6 +62,8 @@ def init_test_data(db: Session) -> None:
         end_time = start_time + timedelta(minutes=30)
         usage_record = DeviceUsageRecord(
             device_id=test_device.id,
+            house_id=test_house.id,
+            owner_user_id=test_user.id,
             start_time=start_time,
             end_time=end_time,
             energy_consumption=5.0,
@@ -73,6 +75,8 @@ def init_test_data(db: Session) -> None:
     # 创建设备维护记录
     maintenance_record = DeviceMaintenanceRecord(
         device_id=test_device.id,
+        house_id=test_house.id,
+        owner_user_id=test_user.id,
         maintenance_date=datetime.utcnow() - timedelta(days=7),
         maintenance_type="定期检查",
         description="常规维护检查",
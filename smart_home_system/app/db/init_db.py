@@ -6,7 +6,8 @@ from app.db.session import Base, engine
 from app.crud.crud_user import crud_user
 from app.schemas.user import UserCreate
 from app.core.config import settings
-from app.models.models import User, House, Room, Device, DeviceUsageRecord, UserFeedback, DeviceMaintenanceRecord, SecurityEvent
+from app.models.models import User, House, Room, Device, DeviceUsageRecord, UsageRollupHourly, Tariff, TariffWindow, UserFeedback, DeviceMaintenanceRecord, SecurityEvent
+from app.crud.crud_usage_rollup import crud_usage_rollup
 from app.db.init_test_data import create_test_data
 from app.db.session import SessionLocal
 
@@ -30,6 +31,9 @@ def init_db(db: Session) -> bool:
             Room.__table__,
             Device.__table__,
             DeviceUsageRecord.__table__,
+            UsageRollupHourly.__table__,
+            Tariff.__table__,
+            TariffWindow.__table__,
             DeviceMaintenanceRecord.__table__,
             SecurityEvent.__table__,
             UserFeedback.__table__
@@ -37,14 +41,19 @@ def init_db(db: Session) -> bool:
         
         for table in tables:
             table.create(bind=engine)
-            logger.info(f"创建表 {table.name} 成功")
+            logger.info("创建表 %s 成功", table.name)
         
         logger.info("所有数据库表创建成功")
         
         # 创建测试数据
-        return create_test_data(db)
+        result = create_test_data(db)
+        
+        # 根据测试数据生成使用小时汇总
+        crud_usage_rollup.rebuild(db)
+        logger.info("使用小时汇总生成成功")
+        return result
     except Exception as e:
-        logger.error(f"创建数据库表时出错: {e}")
+        logger.error("创建数据库表时出错: %s", e)
         return False
 
 if __name__ == "__main__":
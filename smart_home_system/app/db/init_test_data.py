@@ -178,6 +178,8 @@ def create_test_data(db: Session):
                 record = DeviceUsageRecord(
                     device_id=device.id,
                     user_id=user.id,
+                    house_id=house.id,
+                    owner_user_id=user.id,
                     start_time=start_time,
                     end_time=end_time,
                     duration=duration,
@@ -0,0 +1,20 @@
+import logging
+from app.db.session import SessionLocal
+from app.crud.crud_usage_rollup import crud_usage_rollup
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def rebuild_rollups() -> None:
+    """根据原始使用记录重建使用小时汇总（升级数据库后执行一次）"""
+    db = SessionLocal()
+    try:
+        logger.info("正在重建使用小时汇总...")
+        crud_usage_rollup.rebuild(db)
+        logger.info("使用小时汇总重建完成")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_rollups()
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.db.session import engine, SessionLocal
 from app.db.base import Base
 from app.db.init_data import init_test_data
+from app.crud.crud_usage_rollup import crud_usage_rollup
 from app.core.config import settings
 
 # 配置日志
@@ -35,13 +36,14 @@ def reset_db() -> bool:
         db = SessionLocal()
         try:
             init_test_data(db)
+            crud_usage_rollup.rebuild(db)
             logger.info("测试数据初始化成功")
             return True
         finally:
             db.close()
             
     except Exception as e:
-        logger.error(f"数据库重置出错: {str(e)}")
+        logger.error("数据库重置出错: %s", e)
         return False
 
 if __name__ == "__main__":
@@ -1,11 +1,19 @@
+import anyio
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core.logging_config import RequestIdMiddleware, setup_logging
+from app.core.rate_limit import RateLimitMiddleware
+
+setup_logging()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 # Set all CORS enabled origins
@@ -16,9 +24,42 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Request-ID"],
     )
 
+class CachedStaticFiles(StaticFiles):
+    """
+    静态文件响应附带缓存头
+
+    图表文件名包含内容哈希，内容不会改变，可以长期缓存；其他文件由浏览器
+    每次用 ETag 协商，未修改时返回 304。
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if scope["path"].startswith("/visualizations/"):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+# 后添加的中间件先执行：限流在请求ID之后，被拒绝的请求也有请求ID
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
+app.mount("/static", CachedStaticFiles(directory=settings.STATIC_DIR), name="static")
+
+@app.on_event("startup")
+async def configure_threadpool():
+    """
+    限制同步接口所在线程池的大小
+
+    同步数据库查询都在线程池中执行，不会阻塞事件循环；线程池有上限，
+    大量慢查询只会排队，不会无限制地占用数据库连接。
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = settings.THREADPOOL_SIZE
 
 @app.get("/")
 async def root():
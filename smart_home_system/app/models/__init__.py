@@ -1,2 +1,2 @@
 # 导入所有模型
-from app.models.models import User, House, Room, Device, DeviceUsageRecord, DeviceMaintenanceRecord, SecurityEvent, UserFeedback, Notification  # noqa 
\ No newline at end of file
+from app.models.models import User, House, Room, Device, DeviceUsageRecord, UsageRollupHourly, Tariff, TariffWindow, DeviceMaintenanceRecord, SecurityEvent, UserFeedback, Notification  # noqa 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Table, JSON, Enum, Date, Text, Numeric
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Table, JSON, Enum, Date, Text, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -68,7 +68,7 @@ class User(Base):
     
     # 关系
     houses = relationship("House", back_populates="owner", cascade="all, delete-orphan")
-    device_usage_records = relationship("DeviceUsageRecord", back_populates="user", cascade="all, delete-orphan")
+    device_usage_records = relationship("DeviceUsageRecord", back_populates="user", cascade="all, delete-orphan", foreign_keys="DeviceUsageRecord.user_id")
     feedback = relationship("UserFeedback", back_populates="user", cascade="all, delete-orphan")
     notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan")
 
@@ -79,7 +79,7 @@ class House(Base):
     __tablename__ = "houses"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # 添加外键
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)  # 添加外键
     name = Column(String(100), nullable=False)
     address = Column(String(200), nullable=False)
     area = Column(Float, nullable=False)
@@ -94,6 +94,7 @@ class House(Base):
     rooms = relationship("Room", back_populates="house", cascade="all, delete-orphan")
     owner = relationship("User", back_populates="houses")
     security_events = relationship("SecurityEvent", back_populates="house", cascade="all, delete-orphan")
+    tariff = relationship("Tariff", back_populates="house", uselist=False, cascade="all, delete-orphan")
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -104,7 +105,7 @@ class Room(Base):
     __tablename__ = "rooms"
 
     id = Column(Integer, primary_key=True, index=True)
-    house_id = Column(Integer, ForeignKey("houses.id"), nullable=False)
+    house_id = Column(Integer, ForeignKey("houses.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     area = Column(Float, nullable=False)  # 房间面积（平方米）
     room_type = Column(String, nullable=False)  # 房间类型
@@ -130,7 +131,7 @@ class Device(Base):
     name = Column(String, nullable=False)
     device_type = Column(String, nullable=False)
     status = Column(String, nullable=False)
-    room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False)
+    room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False, index=True)
     manufacturer = Column(String)
     model = Column(String)
     serial_number = Column(String)
@@ -139,11 +140,15 @@ class Device(Base):
     next_maintenance = Column(DateTime, nullable=True)
     description = Column(String)
     device_metadata = Column(JSON, nullable=True)
+    api_key_salt = Column(String(32), nullable=True)  # 设备密钥派生盐，为空表示未签发
+    api_key_hash = Column(String(64), nullable=True)  # 设备密钥的 SHA-256 摘要
+    api_key_created_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     room = relationship("Room", back_populates="devices")
     usage_records = relationship("DeviceUsageRecord", back_populates="device", cascade="all, delete-orphan")
+    usage_rollups = relationship("UsageRollupHourly", back_populates="device", cascade="all, delete-orphan")
     maintenance_records = relationship("DeviceMaintenanceRecord", back_populates="device", cascade="all, delete-orphan")
     security_events = relationship("SecurityEvent", back_populates="device", cascade="all, delete-orphan")
 
@@ -155,10 +160,18 @@ class Device(Base):
 class DeviceUsageRecord(Base):
     """设备使用记录"""
     __tablename__ = "device_usage_records"
+    __table_args__ = (
+        Index("ix_device_usage_records_device_id_start_time", "device_id", "start_time"),
+        Index("ix_device_usage_records_user_id_start_time", "user_id", "start_time"),
+        Index("ix_device_usage_records_owner_user_id_start_time_id", "owner_user_id", "start_time", "id"),
+        Index("ix_device_usage_records_house_id_start_time", "house_id", "start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     device_id = Column(Integer, ForeignKey("devices.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
+    house_id = Column(Integer, ForeignKey("houses.id"))  # 冗余：设备所在房屋，写入时设置
+    owner_user_id = Column(Integer, ForeignKey("users.id"))  # 冗余：房屋所有者，写入时设置
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime)
     duration = Column(Integer)  # 使用时长（分钟）
@@ -168,17 +181,77 @@ class DeviceUsageRecord(Base):
     temperature = Column(Float)  # 使用时的环境温度
     humidity = Column(Float)  # 使用时的环境湿度
     is_automated = Column(Boolean, default=False)  # 是否自动控制
+    cost = Column(Float, nullable=True)  # 按房屋分时电价计算的费用，房屋没有电价方案时为空
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     device = relationship("Device", back_populates="usage_records")
-    user = relationship("User", back_populates="device_usage_records")
+    user = relationship("User", back_populates="device_usage_records", foreign_keys=[user_id])
+
+class UsageRollupHourly(Base):
+    """设备使用小时汇总，由使用记录的写入路径在同一事务中增量维护"""
+    __tablename__ = "usage_rollup_hourly"
+    __table_args__ = (
+        Index("ix_usage_rollup_hourly_owner_user_id_hour_bucket", "owner_user_id", "hour_bucket"),
+    )
+
+    device_id = Column(Integer, ForeignKey("devices.id"), primary_key=True)
+    hour_bucket = Column(DateTime, primary_key=True)  # 开始时间所在的整点
+    house_id = Column(Integer, ForeignKey("houses.id"))  # 冗余：设备所在房屋
+    owner_user_id = Column(Integer, ForeignKey("users.id"))  # 冗余：房屋所有者
+    usage_count = Column(Integer, nullable=False, default=0)  # 使用次数
+    total_duration = Column(Integer, nullable=False, default=0)  # 总使用时长（分钟）
+    total_energy = Column(Float, nullable=False, default=0)  # 总能耗（kWh）
+    automated_count = Column(Integer, nullable=False, default=0)  # 其中自动控制的次数
+    automated_duration = Column(Integer, nullable=False, default=0)  # 其中自动控制的时长
+    automated_energy = Column(Float, nullable=False, default=0)  # 其中自动控制的能耗
+    total_cost = Column(Float, nullable=False, default=0)  # 总费用（按分时电价）
+
+    device = relationship("Device", back_populates="usage_rollups")
+
+class Tariff(Base):
+    """房屋的分时电价方案，每个房屋至多一个"""
+    __tablename__ = "tariffs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    house_id = Column(Integer, ForeignKey("houses.id", ondelete="CASCADE"), nullable=False, unique=True)
+    name = Column(String(100))
+    base_price = Column(Float, nullable=False)  # 不在任何时段内的电价（每 kWh）
+    utc_offset_minutes = Column(Integer, nullable=False, default=0)  # 时段按当地时间定义：当地时间 = UTC + 偏移
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    house = relationship("House", back_populates="tariff")
+    windows = relationship(
+        "TariffWindow",
+        back_populates="tariff",
+        cascade="all, delete-orphan",
+        order_by="TariffWindow.id"
+    )
+
+class TariffWindow(Base):
+    """电价时段：weekdays 中每天当地时间 [start_minute, end_minute) 按 price 计价"""
+    __tablename__ = "tariff_windows"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tariff_id = Column(Integer, ForeignKey("tariffs.id", ondelete="CASCADE"), nullable=False, index=True)
+    start_minute = Column(Integer, nullable=False)  # 开始时刻，当天 0 点起的分钟数
+    end_minute = Column(Integer, nullable=False)  # 结束时刻，不大于开始时刻时延续到次日
+    weekdays = Column(Integer, nullable=False, default=127)  # 适用的星期（位掩码，第 0 位为星期一）
+    price = Column(Float, nullable=False)  # 时段电价（每 kWh）
+
+    tariff = relationship("Tariff", back_populates="windows")
 
 class DeviceMaintenanceRecord(Base):
     __tablename__ = "device_maintenance_records"
+    __table_args__ = (
+        Index("ix_device_maintenance_records_owner_user_id_maintenance_date_id", "owner_user_id", "maintenance_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"))
+    house_id = Column(Integer, ForeignKey("houses.id"))  # 冗余：设备所在房屋，写入时设置
+    owner_user_id = Column(Integer, ForeignKey("users.id"))  # 冗余：房屋所有者，写入时设置
     maintenance_date = Column(DateTime, nullable=False)
     maintenance_type = Column(String(50), nullable=False)
     description = Column(Text)
@@ -196,6 +269,9 @@ class DeviceMaintenanceRecord(Base):
 
 class SecurityEvent(Base):
     __tablename__ = "security_events"
+    __table_args__ = (
+        Index("ix_security_events_house_id_event_time_id", "house_id", "event_time", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     house_id = Column(Integer, ForeignKey("houses.id"), nullable=False)
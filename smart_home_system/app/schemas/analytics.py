@@ -20,6 +20,21 @@ class EnergyConsumptionAnalysis(BaseModel):
     total_consumption: float
     daily_average: float
     device_consumption: Dict[str, float]  # 设备名称 -> 能耗
+    total_cost: float = 0  # 按分时电价计算的总费用
+    device_cost: Dict[str, float] = {}  # 设备名称 -> 费用
+
+class CostBreakdownItem(BaseModel):
+    id: int
+    name: str
+    energy: float  # 能耗（kWh）
+    cost: float  # 费用
+
+class EnergyCostAnalysis(BaseModel):
+    total_energy: float
+    total_cost: float
+    devices: List[CostBreakdownItem]  # 按费用降序
+    rooms: List[CostBreakdownItem]
+    houses: List[CostBreakdownItem]
 
 class DeviceHealthAnalysis(BaseModel):
     device_id: int
@@ -59,6 +74,13 @@ class DeviceCorrelationAnalysis(BaseModel):
     correlations: List[DeviceCorrelation]
     correlation_count: Dict[str, int]  # "设备1-设备2" -> 关联次数
 
+class PeakPowerAnalysis(BaseModel):
+    house_id: int
+    peak_power: float  # 同时功率峰值（kW）
+    peak_time: Optional[datetime]  # 峰值开始时刻，没有使用记录时为空
+    timestamps: List[datetime]  # 负荷曲线各点对应的分钟
+    load: List[float]  # 负荷曲线：各分钟的平均功率（kW），已降采样
+
 class DeviceStats(BaseModel):
     type: str
     usage_count: int
@@ -30,4 +30,10 @@ class Device(DeviceBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class DeviceApiKey(BaseModel):
+    """设备密钥（明文只在签发时返回一次）"""
+    device_id: int
+    api_key: str
+    created_at: datetime
@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from pydantic import BaseModel, field_validator
 import json
@@ -52,9 +52,23 @@ class DeviceUsageRecord(DeviceUsageRecordBase):
     temperature: float
     humidity: float
     is_automated: bool
+    cost: Optional[float] = None  # 按房屋分时电价计算的费用，没有电价方案时为空
     created_at: datetime
     updated_at: datetime
 
     model_config = {
         "from_attributes": True
-    } 
\ No newline at end of file
+    } 
+
+class DeviceUsageBulkLineResult(BaseModel):
+    """批量导入的单行结果"""
+    line: int  # 行号（JSON 数组时为元素序号），从 1 开始
+    accepted: bool
+    record_id: Optional[int] = None
+    error: Optional[str] = None
+
+class DeviceUsageBulkResult(BaseModel):
+    """批量导入结果"""
+    accepted: int
+    rejected: int
+    results: List[DeviceUsageBulkLineResult]
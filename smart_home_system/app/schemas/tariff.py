@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+class TariffWindowBase(BaseModel):
+    """电价时段基础模型"""
+    start_minute: int = Field(..., ge=0, lt=1440)  # 开始时刻，当天 0 点起的分钟数（当地时间）
+    end_minute: int = Field(..., ge=0, le=1440)  # 结束时刻，不大于开始时刻时延续到次日
+    weekdays: int = Field(127, ge=1, le=127)  # 适用的星期（位掩码，第 0 位为星期一），默认每天
+    price: float = Field(..., ge=0)  # 时段电价（每 kWh）
+
+class TariffWindow(TariffWindowBase):
+    """电价时段模型"""
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class TariffBase(BaseModel):
+    """电价方案基础模型"""
+    name: Optional[str] = None
+    base_price: float = Field(..., ge=0)  # 不在任何时段内的电价（每 kWh）
+    utc_offset_minutes: int = Field(0, ge=-720, le=840)  # 当地时间相对 UTC 的分钟数（固定偏移）
+
+class TariffUpdate(TariffBase):
+    """电价方案设置模型，时段整体替换"""
+    windows: List[TariffWindowBase] = []
+
+class Tariff(TariffBase):
+    """电价方案模型"""
+    id: int
+    house_id: int
+    windows: List[TariffWindow] = []
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
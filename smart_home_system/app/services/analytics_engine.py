@@ -0,0 +1,288 @@
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import BigInteger, Integer, cast, extract, func, select
+from sqlalchemy.orm import Session
+
+from app.models.models import DeviceUsageRecord
+
+SECONDS_PER_MINUTE = 60
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+MINUTES_PER_DAY = 1440
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+_UNIX_EPOCH = datetime(1970, 1, 1)
+# 1970-01-01 是星期四，之后第一个星期一 0 点的 Unix 秒
+_FIRST_MONDAY = 4 * SECONDS_PER_DAY
+# 分批从数据库读取的行数
+FETCH_BATCH_SIZE = 10000
+
+def _epoch(column):
+    """时间列在数据库中转换为 Unix 秒（按 UTC），读取时不构造 datetime 对象"""
+    return cast(extract('epoch', column), BigInteger)
+
+# 可读取的列：名称 -> (SQL 表达式, 数组类型)
+# 可为空的列在数据库中填默认值，所有列都按数值读取（没有逐值的结果类型转换）：
+# 时长、能耗为空记为 0，设备ID、房屋ID为空记为 -1，不属于任何分组
+USAGE_COLUMNS: Dict[str, Tuple[Any, Any]] = {
+    "id": (DeviceUsageRecord.id, np.int64),
+    "start": (_epoch(DeviceUsageRecord.start_time), np.int64),
+    # 没有结束时间的记录按 开始时间 + 时长 计
+    "end": (
+        func.coalesce(
+            _epoch(DeviceUsageRecord.end_time),
+            _epoch(DeviceUsageRecord.start_time) + func.coalesce(DeviceUsageRecord.duration, 0) * SECONDS_PER_MINUTE
+        ),
+        np.int64
+    ),
+    "duration": (func.coalesce(DeviceUsageRecord.duration, 0), np.int32),
+    "energy": (func.coalesce(DeviceUsageRecord.energy_consumption, 0.0), np.float32),
+    "device_id": (func.coalesce(DeviceUsageRecord.device_id, -1), np.int64),
+    "house_id": (func.coalesce(DeviceUsageRecord.house_id, -1), np.int64),
+    "is_automated": (cast(func.coalesce(DeviceUsageRecord.is_automated, False), Integer), np.bool_),
+}
+
+class UsageArrays:
+    """
+    列式的使用记录，每列一个 NumPy 数组
+
+    start、end 为 Unix 秒（int64），energy 为 float32，duration 为分钟（int32）。
+    ID 列用 encode 转换为从 0 开始的小整数编码后再分组统计。
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def encode(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        把 ID 列编码为小整数
+
+        Returns:
+            (编码数组, 编码 -> ID 的数组)，ID 为 -1 的行编码为 -1
+        """
+        values = self.columns[name]
+        ids, codes = np.unique(values, return_inverse=True)
+        codes = codes.astype(_code_dtype(len(ids)))
+        if len(ids) and ids[0] == -1:
+            ids = ids[1:]
+            codes -= 1
+        return codes, ids
+
+def _code_dtype(size: int):
+    return np.int16 if size < np.iinfo(np.int16).max else np.int32
+
+def load_usage_arrays(
+    db: Session,
+    columns: Sequence[str],
+    *criteria: Any
+) -> UsageArrays:
+    """
+    按条件读取使用记录的指定列
+
+    只查询需要的列，各列在 SQL 中已转换为数值；在 Core 层分批读取行元组（不构造
+    ORM 对象和 datetime），每批用 np.fromiter 直接填入数组。
+    criteria 为 DeviceUsageRecord 上的过滤条件。
+    """
+    expressions = [USAGE_COLUMNS[name][0] for name in columns]
+    statement = select(*expressions).where(*criteria).execution_options(yield_per=FETCH_BATCH_SIZE)
+    result = db.connection().execute(statement)
+
+    width = len(columns)
+    batches = [
+        np.fromiter(
+            chain.from_iterable(rows),
+            dtype=np.float64,
+            count=len(rows) * width
+        ).reshape(-1, width)
+        for rows in result.partitions()
+    ]
+    matrix = np.concatenate(batches) if batches else np.empty((0, width))
+    return UsageArrays({
+        name: matrix[:, index].astype(USAGE_COLUMNS[name][1])
+        for index, name in enumerate(columns)
+    })
+
+def epoch_seconds(value: datetime) -> int:
+    """UTC 时间（不带时区）-> Unix 秒"""
+    return int((value - _UNIX_EPOCH).total_seconds())
+
+def from_epoch_seconds(value: int) -> datetime:
+    """Unix 秒 -> UTC 时间（不带时区）"""
+    return _UNIX_EPOCH + timedelta(seconds=int(value))
+
+def hour_of_day(epoch: np.ndarray) -> np.ndarray:
+    """Unix 秒 -> 小时（0-23）"""
+    return (epoch // SECONDS_PER_HOUR % 24).astype(np.int8)
+
+def histogram(bins: np.ndarray, size: int, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    按下标计数（或对 weights 求和），返回长度为 size 的数组
+
+    下标超出 [0, size) 的行被忽略；不带 weights 时返回整数计数。
+    """
+    valid = (bins >= 0) & (bins < size)
+    if not valid.all():
+        bins = bins[valid]
+        weights = weights[valid] if weights is not None else None
+    return np.bincount(bins, weights=weights, minlength=size)
+
+def group_sums(codes: np.ndarray, n_groups: int, *values: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    按分组编码统计行数与各列之和
+
+    Returns:
+        (行数, 第一列之和, 第二列之和, ...)，求和按 float64 累加
+    """
+    return (histogram(codes, n_groups),) + tuple(
+        histogram(codes, n_groups, weights=value) for value in values
+    )
+
+def group_summary(
+    codes: np.ndarray,
+    values: np.ndarray,
+    n_groups: int,
+    quantiles: Sequence[float] = ()
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    各分组的行数、总和与分位数
+
+    一次 lexsort 把各组的值排到连续的区间内：总和用 np.add.reduceat 按区间求出，
+    分位数按区间起点直接取数（线性插值，与 np.percentile 默认方法一致），不逐组
+    调用 np.percentile。编码为 -1 的行被忽略，空分组的分位数为 NaN。
+
+    Returns:
+        (行数, 总和, len(quantiles) × n_groups 的分位数矩阵)
+    """
+    valid = codes >= 0
+    codes, values = codes[valid], values[valid].astype(np.float64)
+    ordered = values[np.lexsort((values, codes))]
+    counts = np.bincount(codes, minlength=n_groups)
+    present = counts > 0
+    first = (np.cumsum(counts) - counts)[present]
+    last = first + counts[present] - 1
+
+    sums = np.zeros(n_groups)
+    if len(ordered):
+        sums[present] = np.add.reduceat(ordered, first)
+
+    percentiles = np.full((len(quantiles), n_groups), np.nan)
+    for row, q in enumerate(quantiles):
+        position = first + (last - first) * q
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, last)
+        fraction = position - lower
+        percentiles[row, present] = ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+    return counts, sums, percentiles
+
+def session_intervals(usage: UsageArrays) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    使用记录 -> 会话区间与平均功率
+
+    平均功率（kW）= 能耗（kWh）/ 时长（小时），会话为 [开始, 开始 + 时长) 的左闭右开区间。
+    时长为 0 的记录无法计算功率，被忽略。需要 start、duration、energy 三列。
+
+    Returns:
+        (开始 Unix 秒, 结束 Unix 秒, 平均功率)，按开始时间升序
+    """
+    order = np.argsort(usage["start"], kind="stable")
+    starts = usage["start"][order]
+    minutes = usage["duration"][order].astype(np.int64)
+    energy = usage["energy"][order].astype(np.float64)
+    valid = minutes > 0
+    starts, minutes, energy = starts[valid], minutes[valid], energy[valid]
+    return starts, starts + minutes * SECONDS_PER_MINUTE, energy * 60 / minutes
+
+def peak_concurrent_load(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    power: np.ndarray
+) -> Tuple[float, Optional[int]]:
+    """
+    扫描线求同时功率的峰值
+
+    每个会话产生开始（+功率）和结束（-功率）两个事件，按时间排序后累加即为每个时刻
+    的总功率，复杂度 O(n log n)。同一时刻的事件全部累加后才取值，因此首尾相接的会话
+    不算同时使用。
+
+    Returns:
+        (峰值功率, 峰值开始的 Unix 秒)，没有功率大于 0 的会话时为 (0.0, None)
+    """
+    if not len(starts):
+        return 0.0, None
+    times = np.concatenate([starts, ends])
+    order = np.argsort(times, kind="stable")
+    times = times[order]
+    levels = np.cumsum(np.concatenate([power, -power])[order])
+    settled = np.append(times[1:] != times[:-1], True)
+    times, levels = times[settled], levels[settled]
+    peak = int(np.argmax(levels))
+    if levels[peak] <= 0:
+        return 0.0, None
+    return float(levels[peak]), int(times[peak])
+
+def minute_load_curve(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    power: np.ndarray,
+    origin: int,
+    minutes: int
+) -> np.ndarray:
+    """
+    分钟级负荷曲线：从 origin 开始每分钟的平均功率
+
+    会话裁剪到曲线范围内，在逐秒的差分数组上用 bincount 累加开始和结束处的功率变化，
+    累积求和得到逐秒功率，再按分钟取平均。复杂度 O(n + 秒数)。
+    """
+    size = minutes * SECONDS_PER_MINUTE
+    first = np.clip(starts - origin, 0, size)
+    last = np.clip(ends - origin, 0, size)
+    keep = first < last
+    changes = (
+        np.bincount(first[keep], weights=power[keep], minlength=size + 1)
+        - np.bincount(last[keep], weights=power[keep], minlength=size + 1)
+    )
+    per_second = np.cumsum(changes[:size])
+    curve = per_second.reshape(minutes, SECONDS_PER_MINUTE).mean(axis=1)
+    # 累加再抵消的舍入误差可能留下极小的负值
+    curve[curve < 1e-9] = 0.0
+    return curve
+
+def tariff_cost(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    energy: np.ndarray,
+    weekly_prices: np.ndarray,
+    utc_offset: int = 0
+) -> np.ndarray:
+    """
+    按分时电价计算每次使用的费用
+
+    weekly_prices 为当地时间从星期一 0 点起一周内每分钟的电价（长度 MINUTES_PER_WEEK），
+    utc_offset 为当地时间相对 UTC 的秒数。能耗按时长比例分摊到会话跨越的各个电价时段，
+    即 费用 = 能耗 × 会话内电价的时间平均值。电价对时间的积分由一周的前缀和查表得到
+    （整周部分按周数乘以一周的积分），每个会话只查两次表，与跨越的时段数无关。
+    时长为 0 的会话按开始时刻的电价计价。
+    """
+    cumulative = np.concatenate([[0.0], np.cumsum(weekly_prices, dtype=np.float64)]) * SECONDS_PER_MINUTE
+
+    def locate(epoch: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        weeks, second = np.divmod(epoch.astype(np.int64) + utc_offset - _FIRST_MONDAY, SECONDS_PER_WEEK)
+        minute, rest = np.divmod(second, SECONDS_PER_MINUTE)
+        return weeks, minute, cumulative[minute] + rest * weekly_prices[minute]
+
+    start_weeks, start_minute, start_integral = locate(starts)
+    end_weeks, _, end_integral = locate(ends)
+    # 整周数相减后再乘，避免对接近 Unix 时间的大数取差带来的精度损失
+    integral = (end_weeks - start_weeks) * cumulative[-1] + end_integral - start_integral
+    span = (ends - starts).astype(np.float64)
+    average = np.divide(integral, span, out=weekly_prices[start_minute].astype(np.float64), where=span > 0)
+    return energy.astype(np.float64) * average
@@ -0,0 +1,61 @@
+import heapq
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, Tuple
+
+import numpy as np
+
+# (设备ID, 开始时间)
+UsageEvent = Tuple[Any, datetime]
+
+# (设备下标, 开始时间, 结束时间)
+UsageInterval = Tuple[int, datetime, datetime]
+
+def sliding_window_pairs(
+    events: Iterable[UsageEvent],
+    window: timedelta
+) -> Iterator[Tuple[UsageEvent, UsageEvent, float]]:
+    """
+    滑动窗口查找开始时间相近的使用记录对
+
+    events 必须按开始时间升序排列。对每条记录只与窗口内仍然有效的较早记录配对，
+    整体为一次遍历，复杂度 O(n + 配对数)，而不是两两比较的 O(n²)。
+
+    Yields:
+        (较早记录, 较晚记录, 时间差（分钟）)
+    """
+    active = deque()
+    for event in events:
+        start_time = event[1]
+        while active and start_time - active[0][1] > window:
+            active.popleft()
+        for earlier in active:
+            yield earlier, event, (start_time - earlier[1]).total_seconds() / 60
+        active.append(event)
+
+def interval_overlap_matrix(intervals: Iterable[UsageInterval], size: int) -> np.ndarray:
+    """
+    统计设备两两同时使用（时间区间重叠）的次数
+
+    intervals 必须按开始时间升序排列，设备下标取值 0..size-1。扫描过程中用最小堆
+    维护仍在使用中的区间，并按设备累计活跃区间数；每个新区间与所有活跃区间各
+    重叠一次，于是把活跃计数整行加到矩阵上。复杂度 O(n log n + n·size)，内存只与
+    同时活跃的区间数和设备数有关，可以直接消费数据库的流式结果。
+
+    Returns:
+        size×size 对称矩阵，[i, j] 为设备 i 与设备 j 的重叠区间对数，对角线为 0
+    """
+    matrix = np.zeros((size, size), dtype=np.int64)
+    active_counts = np.zeros(size, dtype=np.int64)
+    active = []  # (结束时间, 设备下标)
+    for index, start_time, end_time in intervals:
+        while active and active[0][0] < start_time:
+            _, expired = heapq.heappop(active)
+            active_counts[expired] -= 1
+        matrix[index] += active_counts
+        heapq.heappush(active, (end_time, index))
+        active_counts[index] += 1
+
+    matrix += matrix.T
+    np.fill_diagonal(matrix, 0)
+    return matrix
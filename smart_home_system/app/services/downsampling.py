@@ -0,0 +1,45 @@
+import numpy as np
+
+def lttb_indices(x, y, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的下标
+
+    首尾两点固定保留，中间的点均分为 max_points-2 个桶，每个桶保留与上一个
+    保留点、下一个桶均值构成三角形面积最大的点，因此峰值和谷值会被保留下来。
+    桶内的面积计算是向量化的，只在桶之间循环。
+
+    Args:
+        x: 横坐标（升序，数值）
+        y: 纵坐标
+        max_points: 最多保留的点数，小于 3 或不小于点数时不降采样
+
+    Returns:
+        升序的下标数组
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(max_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start = edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+
+    return selected
@@ -0,0 +1,191 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.models import DeviceUsageRecord, Tariff, UsageRollupHourly
+from app.services.analytics_engine import (
+    MINUTES_PER_DAY,
+    MINUTES_PER_WEEK,
+    SECONDS_PER_HOUR,
+    SECONDS_PER_MINUTE,
+    epoch_seconds,
+    from_epoch_seconds,
+    load_usage_arrays,
+    tariff_cost
+)
+
+# 重新计价时每条 UPDATE 语句批量写入的行数
+REPRICE_BATCH_SIZE = 5000
+
+_records = DeviceUsageRecord.__table__
+_rollups = UsageRollupHourly.__table__
+# 按主键逐行更新费用（Core 层 executemany，不经过 ORM 批量更新逐行整理参数）
+_UPDATE_RECORD_COST = update(_records).where(
+    _records.c.id == bindparam("record_id")
+).values(cost=bindparam("record_cost"))
+_UPDATE_ROLLUP_COST = update(_rollups).where(
+    _rollups.c.device_id == bindparam("rollup_device_id"),
+    _rollups.c.hour_bucket == bindparam("rollup_hour_bucket")
+).values(total_cost=bindparam("rollup_total_cost"))
+
+class TariffSchedule:
+    """
+    编译后的电价方案：当地时间一周内逐分钟的电价
+
+    时段按 weekdays 展开到一周的分钟数组上，跨零点的时段延续到次日（星期日延续到
+    星期一）。计价时由 analytics_engine.tariff_cost 按时长比例分摊。
+    """
+
+    def __init__(self, weekly_prices: np.ndarray, utc_offset_minutes: int = 0):
+        self.weekly_prices = weekly_prices
+        self.utc_offset = utc_offset_minutes * SECONDS_PER_MINUTE
+
+    @classmethod
+    def from_windows(cls, base_price: float, windows: Iterable[Any], utc_offset_minutes: int = 0) -> "TariffSchedule":
+        """
+        由基础电价和时段构造，时段为带 start_minute、end_minute、weekdays、price
+        属性的对象（模型或请求数据）
+
+        Raises:
+            ValueError: 时段之间有重叠
+        """
+        prices = np.full(MINUTES_PER_WEEK, float(base_price))
+        covered = np.zeros(MINUTES_PER_WEEK, dtype=bool)
+        for window in windows:
+            length = (window.end_minute - window.start_minute) % MINUTES_PER_DAY or MINUTES_PER_DAY
+            for day in range(7):
+                if not window.weekdays >> day & 1:
+                    continue
+                minutes = (day * MINUTES_PER_DAY + window.start_minute + np.arange(length)) % MINUTES_PER_WEEK
+                if covered[minutes].any():
+                    raise ValueError("电价时段重叠")
+                covered[minutes] = True
+                prices[minutes] = window.price
+        return cls(prices, utc_offset_minutes)
+
+    @classmethod
+    def from_tariff(cls, tariff: Tariff) -> "TariffSchedule":
+        return cls.from_windows(tariff.base_price, tariff.windows, tariff.utc_offset_minutes)
+
+    def cost(self, starts: np.ndarray, ends: np.ndarray, energy: np.ndarray) -> np.ndarray:
+        """按 Unix 秒的会话区间和能耗计算每次使用的费用"""
+        return tariff_cost(starts, ends, energy, self.weekly_prices, self.utc_offset)
+
+def load_schedules(db: Session, house_ids: Iterable[int]) -> Dict[int, TariffSchedule]:
+    """读取房屋的电价方案，没有方案的房屋不在结果中"""
+    house_ids = {house_id for house_id in house_ids if house_id is not None}
+    if not house_ids:
+        return {}
+    tariffs = db.query(Tariff).options(
+        selectinload(Tariff.windows)
+    ).filter(
+        Tariff.house_id.in_(house_ids)
+    ).all()
+    return {tariff.house_id: TariffSchedule.from_tariff(tariff) for tariff in tariffs}
+
+def _field(record: Any, name: str) -> Any:
+    if isinstance(record, dict):
+        return record.get(name)
+    return getattr(record, name)
+
+def _set_field(record: Any, name: str, value: Any) -> None:
+    if isinstance(record, dict):
+        record[name] = value
+    else:
+        setattr(record, name, value)
+
+def _end_seconds(record: Any) -> int:
+    """
+    会话结束的 Unix 秒：按结束时间精确到秒（duration 是舍去秒数的整分钟），
+    没有结束时间时按 开始时间 + 时长
+    """
+    end_time = _field(record, "end_time")
+    if end_time is not None:
+        return epoch_seconds(end_time)
+    return epoch_seconds(_field(record, "start_time")) + (_field(record, "duration") or 0) * SECONDS_PER_MINUTE
+
+def assign_costs(db: Session, records: Sequence[Any]) -> None:
+    """
+    按所属房屋的电价方案计算使用记录的费用，写入 cost 字段
+
+    records 可以是 DeviceUsageRecord 对象或字段字典，需在累加小时汇总之前调用。
+    所属房屋没有电价方案时费用为空。
+    """
+    schedules = load_schedules(db, (_field(record, "house_id") for record in records))
+    by_house: Dict[int, List[Any]] = {}
+    for record in records:
+        house_id = _field(record, "house_id")
+        if house_id in schedules:
+            by_house.setdefault(house_id, []).append(record)
+        else:
+            _set_field(record, "cost", None)
+
+    for house_id, group in by_house.items():
+        starts = np.array([epoch_seconds(_field(record, "start_time")) for record in group], dtype=np.int64)
+        ends = np.array([_end_seconds(record) for record in group], dtype=np.int64)
+        energy = np.array([_field(record, "energy_consumption") or 0.0 for record in group], dtype=np.float64)
+        costs = schedules[house_id].cost(starts, ends, energy)
+        for record, cost in zip(group, costs.tolist()):
+            _set_field(record, "cost", cost)
+
+def reprice_house(db: Session, house_id: int, schedule: Optional[TariffSchedule]) -> int:
+    """
+    电价方案变更后重新计算房屋所有使用记录的费用，并重写小时汇总中的总费用
+
+    一次读取房屋的全部记录列，整体向量化计价；每条记录的费用和每个 (设备, 小时) 的
+    总费用按主键批量 UPDATE。schedule 为空（删除方案）时费用清空。只执行语句不提交，
+    由调用方与电价方案的修改放在同一事务中提交。
+
+    Returns:
+        重新计价的记录数
+    """
+    usage = load_usage_arrays(
+        db,
+        ["id", "device_id", "start", "end", "energy"],
+        DeviceUsageRecord.house_id == house_id
+    )
+    starts = usage["start"]
+    ends = usage["end"]
+    if schedule is None:
+        costs = np.zeros(len(usage))
+        record_costs: List[Optional[float]] = [None] * len(usage)
+    else:
+        costs = schedule.cost(starts, ends, usage["energy"])
+        record_costs = costs.tolist()
+
+    connection = db.connection()
+    record_ids = usage["id"].tolist()
+    for offset in range(0, len(record_ids), REPRICE_BATCH_SIZE):
+        connection.execute(_UPDATE_RECORD_COST, [
+            {"record_id": record_id, "record_cost": cost}
+            for record_id, cost in zip(
+                record_ids[offset:offset + REPRICE_BATCH_SIZE],
+                record_costs[offset:offset + REPRICE_BATCH_SIZE]
+            )
+        ])
+
+    # 小时汇总：先清零，再写入各 (设备, 小时) 的费用之和
+    db.query(UsageRollupHourly).filter(
+        UsageRollupHourly.house_id == house_id
+    ).update({UsageRollupHourly.total_cost: 0}, synchronize_session=False)
+
+    valid = usage["device_id"] >= 0
+    if schedule is not None and valid.any():
+        device_ids = usage["device_id"][valid]
+        hours = starts[valid] // SECONDS_PER_HOUR
+        keys = np.stack([device_ids, hours], axis=1)
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        sums = np.bincount(inverse.ravel(), weights=costs[valid], minlength=len(groups)).tolist()
+        rows = [
+            {
+                "rollup_device_id": device_id,
+                "rollup_hour_bucket": from_epoch_seconds(hour * SECONDS_PER_HOUR),
+                "rollup_total_cost": total
+            }
+            for (device_id, hour), total in zip(groups.tolist(), sums)
+        ]
+        for offset in range(0, len(rows), REPRICE_BATCH_SIZE):
+            connection.execute(_UPDATE_ROLLUP_COST, rows[offset:offset + REPRICE_BATCH_SIZE])
+    return len(usage)
@@ -0,0 +1,130 @@
+import csv
+import importlib.util
+import io
+import zlib
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Sequence
+
+import orjson
+
+# 导出格式 -> (Content-Type, 文件扩展名)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+def parquet_available() -> bool:
+    """parquet 导出依赖可选的 pyarrow 包"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+def batched(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """把流式结果按 size 行分批，每次只在内存中保留一批"""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def iter_csv(batches: Iterable[List[Any]], columns: Sequence[Any]) -> Iterator[bytes]:
+    """逐批输出 CSV，首行为列名，时间为 ISO 8601 格式"""
+    temporal = [
+        index for index, column in enumerate(columns)
+        if column.type.python_type in (datetime, date)
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in columns])
+    for batch in batches:
+        for row in batch:
+            values = list(row)
+            for index in temporal:
+                if values[index] is not None:
+                    values[index] = values[index].isoformat()
+            writer.writerow(values)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def iter_ndjson(batches: Iterable[List[Any]], columns: Sequence[Any]) -> Iterator[bytes]:
+    """逐批输出 NDJSON，每行一条记录"""
+    fields = [column.key for column in columns]
+    for batch in batches:
+        yield b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in batch)
+
+class _ChunkSink:
+    """供 ParquetWriter 写入的内存缓冲，写入的字节在每批之后取走"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> Iterator[bytes]:
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks = []
+            yield data
+
+def iter_parquet(batches: Iterable[List[Any]], columns: Sequence[Any]) -> Iterator[bytes]:
+    """
+    逐批输出 Parquet，每批写成一个 row group
+
+    列类型由 SQLAlchemy 列类型确定，某一批整列为空时类型也保持一致。
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {
+        bool: pa.bool_(),
+        int: pa.int64(),
+        float: pa.float64(),
+        str: pa.string(),
+        datetime: pa.timestamp("us"),
+        date: pa.date32(),
+    }
+    schema = pa.schema([
+        (column.key, arrow_types.get(column.type.python_type, pa.string()))
+        for column in columns
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            arrays = [
+                pa.array([row[index] for row in batch], type=field.type)
+                for index, field in enumerate(schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield from sink.drain()
+    finally:
+        writer.close()
+    yield from sink.drain()
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """对字节流做流式 gzip 压缩"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,14 +1,83 @@
-from typing import Dict, List, Any
-from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from app.core.config import settings
 from app.models.models import Device, DeviceUsageRecord, Room, House
+from app.services.analytics_engine import (
+    group_summary,
+    group_sums,
+    histogram,
+    hour_of_day,
+    load_usage_arrays
+)
+from app.services.correlation import interval_overlap_matrix, sliding_window_pairs
+from app.services.downsampling import lttb_indices
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+import numpy as np
 import pandas as pd
+import hashlib
 import os
+import re
+import threading
+import time
 from pathlib import Path
 
+# 图表渲染进程池，首次渲染时创建
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_lock = threading.Lock()
+# 正在渲染的文件名 -> Future，相同图表的并发请求共享一次渲染
+_pending_renders: Dict[str, Future] = {}
+# 带内容哈希的图表文件名，清理时只删除这类文件
+_FIGURE_FILE = re.compile(r".+_[0-9a-f]{16}\.png")
+# 两次清理过期图表文件的最短间隔（秒）
+_SWEEP_INTERVAL = 300
+_last_sweep = 0.0
+
+def _render_figure(figure_json: str, filepath: str) -> None:
+    """在子进程中渲染图表：先写临时文件，再原子替换为目标文件"""
+    fig = pio.from_json(figure_json)
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    try:
+        fig.write_image(tmp_path, format="png")
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _sweep_figures(output_dir: Path) -> None:
+    """
+    删除超过 VISUALIZATION_FILE_MAX_AGE 秒未被请求的图表文件
+
+    数据变化后图表换成新的文件名，旧文件不会再被请求；按时间而不是按文件名前缀清理，
+    刚返回给其他请求的同名图表不会被删除。每 _SWEEP_INTERVAL 秒最多清理一次。
+    """
+    global _last_sweep
+    now = time.time()
+    with _render_lock:
+        if now - _last_sweep < _SWEEP_INTERVAL:
+            return
+        _last_sweep = now
+    expires_before = now - settings.VISUALIZATION_FILE_MAX_AGE
+    for entry in os.scandir(output_dir):
+        if not _FIGURE_FILE.fullmatch(entry.name):
+            continue
+        try:
+            if entry.stat().st_mtime < expires_before:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=settings.VISUALIZATION_RENDER_WORKERS)
+    return _render_pool
+
 class VisualizationService:
     def __init__(self, db: Session):
         self.db = db
@@ -16,44 +85,100 @@ class VisualizationService:
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
     def _save_figure(self, fig, filename: str) -> str:
-        """保存图表为图片文件"""
+        """
+        保存图表为图片文件
+
+        文件名带有图表 JSON（数据与布局）的哈希，内容相同的图表只渲染一次，
+        之后的请求只需检查文件是否存在。渲染在进程池中进行，不占用请求线程的 GIL。
+        每次请求刷新文件的修改时间，长时间未被请求的文件由 _sweep_figures 清理。
+        """
+        figure_json = fig.to_json()
+        digest = hashlib.sha256(figure_json.encode("utf-8")).hexdigest()[:16]
+        filename = f"{Path(filename).stem}_{digest}.png"
         filepath = self.output_dir / filename
-        fig.write_image(str(filepath))
+        _sweep_figures(self.output_dir)
+
+        try:
+            os.utime(filepath)
+        except FileNotFoundError:
+            with _render_lock:
+                future = _pending_renders.get(filename)
+                if future is None:
+                    future = _get_render_pool().submit(_render_figure, figure_json, str(filepath))
+                    _pending_renders[filename] = future
+                    future.add_done_callback(lambda _: _pending_renders.pop(filename, None))
+            future.result(timeout=settings.VISUALIZATION_RENDER_TIMEOUT)
+
         return f"/static/visualizations/{filename}"
 
-    def generate_device_usage_trend(self, device_id: int, days: int = 7) -> str:
-        """生成设备使用趋势图"""
+    def _resolve_range(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        days: int
+    ) -> Tuple[datetime, datetime]:
+        """未指定时间范围时，默认取截止到现在（或 end）的最近 days 天"""
+        end_date = end or datetime.utcnow()
+        start_date = start or (end_date - timedelta(days=days))
+        return start_date, end_date
+
+    def _automation_stats(self, quantiles=()) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        自动控制与手动控制的使用次数、总能耗与单次能耗分位数
+
+        Returns:
+            (使用次数, 总能耗, 分位数矩阵)，下标 0 为自动控制、1 为手动控制
+        """
+        usage = load_usage_arrays(self.db, ("is_automated", "energy"))
+        codes = np.where(usage["is_automated"], 0, 1).astype(np.int8)
+        return group_summary(codes, usage["energy"], 2, quantiles)
+
+    def generate_device_usage_trend(
+        self,
+        device_id: int,
+        days: int = 7,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_points: Optional[int] = None
+    ) -> str:
+        """
+        生成设备使用趋势图
+
+        指定 max_points 时，使用时长与能耗两条曲线各自用 LTTB 降采样到不超过 max_points 个点。
+        """
         # 获取设备使用记录
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
+        start_date, end_date = self._resolve_range(start, end, days)
         
-        records = self.db.query(DeviceUsageRecord).filter(
+        records = self.db.query(
+            DeviceUsageRecord.start_time,
+            DeviceUsageRecord.duration,
+            DeviceUsageRecord.energy_consumption
+        ).filter(
             DeviceUsageRecord.device_id == device_id,
             DeviceUsageRecord.start_time >= start_date,
             DeviceUsageRecord.start_time <= end_date
+        ).order_by(
+            DeviceUsageRecord.start_time
         ).all()
         
         # 转换为DataFrame
-        data = []
-        for record in records:
-            data.append({
-                'start_time': record.start_time,
-                'duration': record.duration,
-                'energy_consumption': record.energy_consumption
-            })
-        df = pd.DataFrame(data)
+        df = pd.DataFrame(records, columns=['start_time', 'duration', 'energy_consumption'])
+        df[['duration', 'energy_consumption']] = df[['duration', 'energy_consumption']].fillna(0)
+        seconds = (df['start_time'] - start_date).dt.total_seconds().to_numpy() if len(df) else []
+        duration_df = df.iloc[lttb_indices(seconds, df['duration'], max_points or 0)]
+        energy_df = df.iloc[lttb_indices(seconds, df['energy_consumption'], max_points or 0)]
         
         # 创建图表
         fig = go.Figure()
         fig.add_trace(go.Scatter(
-            x=df['start_time'],
-            y=df['duration'],
+            x=duration_df['start_time'],
+            y=duration_df['duration'],
             mode='lines+markers',
             name='使用时长'
         ))
         fig.add_trace(go.Scatter(
-            x=df['start_time'],
-            y=df['energy_consumption'],
+            x=energy_df['start_time'],
+            y=energy_df['energy_consumption'],
             mode='lines+markers',
             name='能耗',
             yaxis='y2'
@@ -61,7 +186,7 @@ class VisualizationService:
         
         # 设置图表布局
         fig.update_layout(
-            title=f'设备使用趋势（过去{days}天）',
+            title=f'设备使用趋势（{start_date:%Y-%m-%d} 至 {end_date:%Y-%m-%d}）',
             xaxis_title='时间',
             yaxis_title='使用时长（分钟）',
             yaxis2=dict(
@@ -73,38 +198,47 @@ class VisualizationService:
         
         return self._save_figure(fig, f'device_{device_id}_usage_trend.png')
 
-    def generate_device_correlation(self) -> str:
-        """生成设备关联使用热力图"""
-        # 获取所有设备的使用记录
-        records = self.db.query(DeviceUsageRecord).all()
-        
-        # 创建设备使用时间矩阵
-        devices = self.db.query(Device).all()
-        device_ids = [d.id for d in devices]
-        device_names = [d.name for d in devices]
-        
-        # 创建关联矩阵
-        correlation_matrix = pd.DataFrame(0, index=device_names, columns=device_names)
-        
-        # 分析设备同时使用情况
-        for record in records:
-            start_time = record.start_time
-            end_time = record.end_time or (start_time + timedelta(minutes=record.duration))
-            
-            # 查找同时使用的设备
-            concurrent_records = self.db.query(DeviceUsageRecord).filter(
-                DeviceUsageRecord.start_time <= end_time,
-                DeviceUsageRecord.end_time >= start_time
-            ).all()
-            
-            # 更新关联矩阵
-            for r1 in concurrent_records:
-                for r2 in concurrent_records:
-                    if r1.device_id != r2.device_id:
-                        device1 = self.db.query(Device).get(r1.device_id)
-                        device2 = self.db.query(Device).get(r2.device_id)
-                        if device1 and device2:
-                            correlation_matrix.loc[device1.name, device2.name] += 1
+    def generate_device_correlation(self, user_id: Optional[int] = None) -> str:
+        """
+        生成设备关联使用热力图
+
+        两条使用记录的时间区间重叠即视为一次同时使用。使用记录按开始时间流式读取，
+        由 interval_overlap_matrix 一次扫描得到关联矩阵。指定 user_id 时只统计该用户的设备。
+        """
+        devices_query = self.db.query(Device.id, Device.name)
+        records_query = self.db.query(
+            DeviceUsageRecord.device_id,
+            DeviceUsageRecord.start_time,
+            DeviceUsageRecord.end_time,
+            DeviceUsageRecord.duration
+        ).filter(
+            DeviceUsageRecord.device_id.isnot(None),
+            DeviceUsageRecord.start_time.isnot(None)
+        )
+        if user_id is not None:
+            devices_query = devices_query.join(
+                Room, Device.room_id == Room.id
+            ).join(
+                House, Room.house_id == House.id
+            ).filter(
+                House.user_id == user_id
+            )
+            records_query = records_query.filter(DeviceUsageRecord.owner_user_id == user_id)
+
+        devices = devices_query.order_by(Device.id).all()
+        device_index = {device.id: index for index, device in enumerate(devices)}
+
+        def intervals():
+            for record in records_query.order_by(DeviceUsageRecord.start_time).yield_per(10000):
+                index = device_index.get(record.device_id)
+                if index is None:
+                    continue
+                end_time = record.end_time or (record.start_time + timedelta(minutes=record.duration or 0))
+                yield index, record.start_time, end_time
+
+        matrix = interval_overlap_matrix(intervals(), len(devices))
+        device_names = [device.name for device in devices]
+        correlation_matrix = pd.DataFrame(matrix, index=device_names, columns=device_names)
         
         # 创建热力图
         fig = px.imshow(
@@ -117,29 +251,27 @@ class VisualizationService:
 
     def generate_area_impact_analysis(self) -> str:
         """生成房屋面积对设备使用的影响分析图"""
-        # 获取房屋和设备使用数据
-        houses = self.db.query(House).all()
-        
-        data = []
-        for house in houses:
-            # 获取该房屋的所有设备使用记录
-            usage_records = self.db.query(DeviceUsageRecord).join(
-                Device, DeviceUsageRecord.device_id == Device.id
-            ).join(
-                Room, Device.room_id == Room.id
-            ).filter(
-                Room.house_id == house.id
-            ).all()
-            
-            if usage_records:
-                total_usage = sum(record.duration or 0 for record in usage_records)
-                total_energy = sum(record.energy_consumption or 0 for record in usage_records)
-                data.append({
-                    'house_id': house.id,
-                    'area': house.area,
-                    'total_usage': total_usage,
-                    'total_energy': total_energy
-                })
+        # 按使用记录写入时的 house_id 分组统计，与小时汇总表的口径一致
+        usage = load_usage_arrays(self.db, ("house_id", "duration", "energy"))
+        codes, house_ids = usage.encode("house_id")
+        counts, durations, energies = group_sums(
+            codes, len(house_ids), usage["duration"], usage["energy"]
+        )
+        areas = dict(self.db.query(House.id, House.area).filter(House.id.in_(house_ids.tolist())).all())
+        
+        # 只保留有使用记录的房屋
+        data = [
+            {
+                'house_id': house_id,
+                'area': areas[house_id],
+                'total_usage': int(total_usage),
+                'total_energy': total_energy
+            }
+            for house_id, count, total_usage, total_energy in zip(
+                house_ids.tolist(), counts.tolist(), durations.tolist(), energies.tolist()
+            )
+            if count and house_id in areas
+        ]
         
         df = pd.DataFrame(data)
         
@@ -161,16 +293,13 @@ class VisualizationService:
 
     def generate_device_usage_by_time(self, device_id: int) -> str:
         """生成设备使用时间分布图"""
-        # 获取设备使用记录
-        records = self.db.query(DeviceUsageRecord).filter(
+        # 只读取开始时间，统计每小时使用次数
+        usage = load_usage_arrays(
+            self.db,
+            ("start",),
             DeviceUsageRecord.device_id == device_id
-        ).all()
-        
-        # 统计每小时使用次数
-        hourly_usage = [0] * 24
-        for record in records:
-            hour = record.start_time.hour
-            hourly_usage[hour] += 1
+        )
+        hourly_usage = histogram(hour_of_day(usage["start"]), 24).tolist()
         
         # 创建柱状图
         fig = px.bar(
@@ -282,24 +411,13 @@ class VisualizationService:
 
     def generate_automation_analysis(self) -> str:
         """生成自动化使用分析图"""
-        # 获取所有设备的使用记录
-        records = self.db.query(DeviceUsageRecord).all()
-        
         # 统计自动化和手动控制的使用情况
-        automation_stats = {
-            'automated': {'count': 0, 'total_energy': 0},
-            'manual': {'count': 0, 'total_energy': 0}
-        }
-        
-        for record in records:
-            key = 'automated' if record.is_automated else 'manual'
-            automation_stats[key]['count'] += 1
-            automation_stats[key]['total_energy'] += record.energy_consumption or 0
+        counts, _, _ = self._automation_stats()
         
         # 创建饼图
         fig = go.Figure(data=[go.Pie(
             labels=['自动控制', '手动控制'],
-            values=[automation_stats['automated']['count'], automation_stats['manual']['count']],
+            values=counts.tolist(),
             hole=.3
         )])
         
@@ -335,25 +453,43 @@ class VisualizationService:
             "usage_counts": usage_counts
         }
 
-    def get_device_usage_trend_data(self, device_id: int) -> Dict:
-        """获取设备使用趋势数据"""
-        # 获取最近30天的使用记录
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=30)
+    def get_device_usage_trend_data(
+        self,
+        device_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_points: Optional[int] = None
+    ) -> Dict:
+        """
+        获取设备使用趋势数据
+
+        按天统计使用次数，默认最近30天。指定 max_points 时用 LTTB 降采样，
+        保留峰值所在的日期。
+        """
+        start_date, end_date = self._resolve_range(start, end, 30)
         
         records = self.db.query(
             func.date(DeviceUsageRecord.start_time).label('date'),
             func.count(DeviceUsageRecord.id).label('count')
         ).filter(
             DeviceUsageRecord.device_id == device_id,
-            DeviceUsageRecord.start_time >= start_date
+            DeviceUsageRecord.start_time >= start_date,
+            DeviceUsageRecord.start_time <= end_date
         ).group_by(
             func.date(DeviceUsageRecord.start_time)
+        ).order_by(
+            func.date(DeviceUsageRecord.start_time)
         ).all()
         
         dates = [str(record.date) for record in records]
         counts = [record.count for record in records]
         
+        if max_points:
+            ordinals = [date.fromisoformat(value).toordinal() for value in dates]
+            indices = lttb_indices(ordinals, counts, max_points)
+            dates = [dates[i] for i in indices]
+            counts = [counts[i] for i in indices]
+        
         return {
             "dates": dates,
             "usage_counts": counts
@@ -432,87 +568,80 @@ class VisualizationService:
             "usage_counts": counts
         }
 
-    def get_device_correlation_data(self, device_id: int = None) -> Dict:
-        """获取设备关联使用分析数据"""
-        # 获取所有设备
-        devices = self.db.query(Device).all()
-        device_ids = [d.id for d in devices]
-        device_names = {d.id: d.name for d in devices}
-        
-        # 如果指定了设备ID，只获取与该设备相关的关联数据
-        if device_id is not None:
-            records = self.db.query(
-                DeviceUsageRecord.device_id,
-                func.count(DeviceUsageRecord.id).label('count')
+    def get_device_correlation_data(
+        self,
+        user_id: int,
+        device_id: int = None,
+        time_window: int = 0
+    ) -> Dict:
+        """
+        获取设备关联使用分析数据
+
+        只统计该用户自己的设备。两条使用记录的开始时间相差不超过 time_window 分钟
+        即视为一次同时使用（0 表示开始时间完全相同）。按开始时间排序后一次遍历
+        得到完整的稀疏关联矩阵，每个有序设备对一行。
+        """
+        device_names = dict(
+            self.db.query(Device.id, Device.name).join(
+                Room, Device.room_id == Room.id
+            ).join(
+                House, Room.house_id == House.id
             ).filter(
-                DeviceUsageRecord.start_time.in_(
-                    self.db.query(DeviceUsageRecord.start_time)
-                    .filter(DeviceUsageRecord.device_id == device_id)
-                ),
-                DeviceUsageRecord.device_id != device_id
-            ).group_by(
-                DeviceUsageRecord.device_id
+                House.user_id == user_id
             ).all()
-            
-            device_ids = [record.device_id for record in records]
-            counts = [record.count for record in records]
+        )
+
+        events = self.db.query(
+            DeviceUsageRecord.device_id,
+            DeviceUsageRecord.start_time
+        ).filter(
+            DeviceUsageRecord.owner_user_id == user_id,
+            DeviceUsageRecord.device_id.isnot(None)
+        ).order_by(
+            DeviceUsageRecord.start_time
+        ).yield_per(10000)
+
+        pair_counts = Counter()
+        for earlier, later, _ in sliding_window_pairs(events, timedelta(minutes=time_window)):
+            if earlier[0] != later[0]:
+                pair_counts[(earlier[0], later[0])] += 1
+                pair_counts[(later[0], earlier[0])] += 1
+
+        # 如果指定了设备ID，只返回与该设备相关的关联数据
+        if device_id is not None:
+            pairs = sorted(
+                (pair for pair in pair_counts if pair[0] == device_id),
+                key=lambda pair: pair[1]
+            )
         else:
-            # 获取所有设备之间的关联数据
-            correlation_matrix = {}
-            for d1 in device_ids:
-                for d2 in device_ids:
-                    if d1 != d2:
-                        key = f"{d1}-{d2}"
-                        if key not in correlation_matrix:
-                            # 查询两个设备同时使用的次数
-                            count = self.db.query(func.count(DeviceUsageRecord.id)).filter(
-                                DeviceUsageRecord.device_id == d2,
-                                DeviceUsageRecord.start_time.in_(
-                                    self.db.query(DeviceUsageRecord.start_time)
-                                    .filter(DeviceUsageRecord.device_id == d1)
-                                )
-                            ).scalar()
-                            correlation_matrix[key] = count
-            
-            # 转换为列表格式
-            device_ids = []
-            counts = []
-            for key, count in correlation_matrix.items():
-                if count > 0:  # 只返回有关联的数据
-                    d1, d2 = map(int, key.split('-'))
-                    device_ids.append(d2)
-                    counts.append(count)
-        
+            pairs = sorted(pair_counts)
+
+        source_ids = [d1 for d1, _ in pairs]
+        device_ids = [d2 for _, d2 in pairs]
         return {
+            "source_device_ids": source_ids,
+            "source_device_names": [device_names.get(did, f"设备{did}") for did in source_ids],
             "device_ids": device_ids,
             "device_names": [device_names.get(did, f"设备{did}") for did in device_ids],
-            "correlation_counts": counts
+            "correlation_counts": [pair_counts[pair] for pair in pairs]
         }
 
     def get_automation_analysis_data(self) -> Dict:
-        """获取自动化使用分析数据"""
-        # 获取所有设备的使用记录
-        records = self.db.query(DeviceUsageRecord).all()
-        
-        # 统计自动化和手动控制的使用情况
-        automation_stats = {
-            'automated': {'count': 0, 'total_energy': 0},
-            'manual': {'count': 0, 'total_energy': 0}
-        }
-        
-        for record in records:
-            key = 'automated' if record.is_automated else 'manual'
-            automation_stats[key]['count'] += 1
-            automation_stats[key]['total_energy'] += record.energy_consumption or 0
+        """
+        获取自动化使用分析数据
+
+        除使用次数和总能耗外，还返回单次使用能耗的中位数和 95 分位数（没有记录时为 None）。
+        """
+        counts, energies, percentiles = self._automation_stats((0.5, 0.95))
+        median, p95 = (
+            [None if np.isnan(value) else value for value in row.tolist()]
+            for row in percentiles
+        )
         
         return {
             "control_types": ["自动控制", "手动控制"],
-            "usage_counts": [
-                automation_stats['automated']['count'],
-                automation_stats['manual']['count']
-            ],
-            "energy_consumption": [
-                automation_stats['automated']['total_energy'],
-                automation_stats['manual']['total_energy']
-            ]
+            "usage_counts": counts.tolist(),
+            "energy_consumption": energies.tolist(),
+            "median_energy": median,
+            "p95_energy": p95
         } 
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+测试公共夹具
+
+测试使用临时目录中的 SQLite 数据库（在导入 app 之前通过环境变量设置），
+每个测试前重建所有表并清空进程内缓存。在 smart_home_system 目录下运行：
+
+    python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+_TEST_DIR = tempfile.mkdtemp(prefix="smart_home_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TEST_DIR}/test.db"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["ANALYTICS_CACHE_BACKEND"] = "memory"
+sys.path.insert(0, str(ROOT))
+# 静态文件目录等配置是相对项目根目录的路径
+os.chdir(ROOT)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import cache
+from app.core.security import create_access_token
+from app.db.session import Base, SessionLocal, engine
+from app.models.models import Device, House, Room, User
+
+_PROCESS_CACHES = (
+    cache.device_health_cache,
+    cache.auth_user_cache,
+    cache.token_cache,
+    cache.ownership_cache,
+    cache.device_key_cache,
+)
+
+@pytest.fixture(autouse=True)
+def _fresh_database():
+    """每个测试使用空数据库和空缓存"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    for process_cache in _PROCESS_CACHES:
+        process_cache.clear()
+    cache.analytics_cache.backend = cache.MemoryCacheBackend()
+    yield
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def client():
+    from app.main import app
+    return TestClient(app)
+
+def create_home(db, email: str = "owner@example.com", devices: int = 3) -> Dict:
+    """创建用户及其房屋、房间和设备，返回 ID"""
+    user = User(email=email, hashed_password="-", is_active=True, preferences={})
+    db.add(user)
+    db.flush()
+    house = House(user_id=user.id, name="家", address="地址", area=100.0)
+    db.add(house)
+    db.flush()
+    room = Room(house_id=house.id, name="客厅", area=20.0, room_type="living_room")
+    db.add(room)
+    db.flush()
+    device_rows: List[Device] = [
+        Device(name=f"设备{i}", device_type="light", status="online", room_id=room.id)
+        for i in range(devices)
+    ]
+    db.add_all(device_rows)
+    db.commit()
+    return {
+        "user_id": user.id,
+        "house_id": house.id,
+        "room_id": room.id,
+        "device_ids": [device.id for device in device_rows],
+    }
+
+def auth_headers(user_id: int) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token(user_id)}"}
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from app.core.cache import AnalyticsCache, RedisCacheBackend
+
+class FakeRedis:
+    """只实现 get / set(ex=) / incr 的 Redis 替身，数据保存在字典中"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def incr(self, key):
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value).encode("ascii")
+        return value
+
+def test_invalidation_is_shared_across_instances():
+    # 两个实例共享同一个 Redis，相当于两个工作进程
+    redis = FakeRedis()
+    first = AnalyticsCache(RedisCacheBackend(redis))
+    second = AnalyticsCache(RedisCacheBackend(redis))
+
+    key = first.make_key(1, "energy/consumption", {"days": 30})
+    first.set(key, {"total_consumption": 12.5})
+    assert second.get(second.make_key(1, "energy/consumption", {"days": 30})) == {"total_consumption": 12.5}
+
+    first.invalidate_user(1)
+
+    assert second.get(second.make_key(1, "energy/consumption", {"days": 30})) is None
+    # 其他用户的缓存不受影响
+    other = second.make_key(2, "energy/consumption", {"days": 30})
+    second.set(other, {"total_consumption": 1.0})
+    first.invalidate_user(1)
+    assert first.get(first.make_key(2, "energy/consumption", {"days": 30})) == {"total_consumption": 1.0}
+
+def test_cached_decorator_recomputes_after_invalidation_elsewhere():
+    redis = FakeRedis()
+    writer = AnalyticsCache(RedisCacheBackend(redis))
+    reader = AnalyticsCache(RedisCacheBackend(redis))
+    calls = []
+
+    @reader.cached("devices/usage")
+    def analyze(current_user, days=30):
+        calls.append(days)
+        return {"calls": len(calls)}
+
+    user = SimpleNamespace(id=7)
+    assert analyze(current_user=user) == {"calls": 1}
+    assert analyze(current_user=user) == {"calls": 1}
+    writer.invalidate_user(7)
+    assert analyze(current_user=user) == {"calls": 2}
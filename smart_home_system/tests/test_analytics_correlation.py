@@ -0,0 +1,44 @@
+import pytest
+
+from app.core.config import settings
+from tests.conftest import auth_headers, create_home
+
+@pytest.mark.parametrize("params", [
+    {"time_window": -1},
+    {"time_window": settings.CORRELATION_MAX_TIME_WINDOW + 1},
+    {"top_k": 0},
+    {"top_k": -5},
+    {"top_k": settings.CORRELATION_MAX_TOP_K + 1},
+])
+def test_correlation_rejects_out_of_range_params(client, db, params):
+    home = create_home(db)
+    response = client.get(
+        "/api/v1/analytics/devices/correlation",
+        params=params,
+        headers=auth_headers(home["user_id"])
+    )
+    assert response.status_code == 422
+
+def test_correlation_accepts_bounds(client, db):
+    home = create_home(db)
+    response = client.get(
+        "/api/v1/analytics/devices/correlation",
+        params={"time_window": settings.CORRELATION_MAX_TIME_WINDOW, "top_k": 1},
+        headers=auth_headers(home["user_id"])
+    )
+    assert response.status_code == 200
+
+@pytest.mark.parametrize("time_window, expected", [
+    (-1, 422),
+    (settings.CORRELATION_MAX_TIME_WINDOW + 1, 422),
+    (0, 200),
+    (settings.CORRELATION_MAX_TIME_WINDOW, 200),
+])
+def test_visualization_correlation_time_window_bounds(client, db, time_window, expected):
+    home = create_home(db)
+    response = client.get(
+        "/api/v1/visualization/device/correlation",
+        params={"time_window": time_window},
+        headers=auth_headers(home["user_id"])
+    )
+    assert response.status_code == expected
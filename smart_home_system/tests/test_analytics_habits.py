@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from app.models.models import Device, DeviceUsageRecord
+from tests.conftest import auth_headers, create_home
+
+def _usage(device_id: int, user_id: int, house_id: int, owner_user_id: int, start: datetime) -> DeviceUsageRecord:
+    return DeviceUsageRecord(
+        device_id=device_id,
+        user_id=user_id,
+        house_id=house_id,
+        owner_user_id=owner_user_id,
+        start_time=start,
+        end_time=start + timedelta(minutes=10),
+        duration=10,
+        energy_consumption=0.2
+    )
+
+def test_habits_count_usage_on_owned_houses_by_any_writer(client, db):
+    owner = create_home(db, email="owner@example.com", devices=1)
+    other = create_home(db, email="other@example.com", devices=1)
+    db.get(Device, other["device_ids"][0]).name = "邻居的设备"
+    start = (datetime.utcnow() - timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+    db.add_all([
+        # 所有者自己写入
+        _usage(owner["device_ids"][0], owner["user_id"], owner["house_id"], owner["user_id"], start),
+        # 其他用户写入所有者房屋中的设备（设备签名写入时同样记为所有者）
+        _usage(owner["device_ids"][0], other["user_id"], owner["house_id"], owner["user_id"], start),
+        # 所有者写入了别人的房屋，不计入
+        _usage(other["device_ids"][0], owner["user_id"], other["house_id"], other["user_id"], start),
+    ])
+    db.commit()
+
+    response = client.get("/api/v1/analytics/user/habits", headers=auth_headers(owner["user_id"]))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["time_distribution"] == {str(start.hour): 2}
+    assert body["most_used_devices"] == {"设备0": 2}
+    assert body["total_usage_time"] == 20
@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.db.session import engine
+from app.models.models import DeviceUsageRecord
+from tests.conftest import auth_headers, create_home
+
+@contextmanager
+def count_statements():
+    """统计代码块内发往数据库的语句数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def _seed_home(db, email: str, devices: int, records_per_device: int) -> int:
+    home = create_home(db, email=email, devices=devices)
+    now = datetime.utcnow()
+    db.add_all(
+        DeviceUsageRecord(
+            device_id=device_id,
+            user_id=home["user_id"],
+            house_id=home["house_id"],
+            owner_user_id=home["user_id"],
+            start_time=now - timedelta(hours=index + 1),
+            end_time=now - timedelta(hours=index),
+            duration=60,
+            energy_consumption=1.0
+        )
+        for device_id in home["device_ids"]
+        for index in range(records_per_device)
+    )
+    db.commit()
+    return home["user_id"]
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/analytics/user/habits",
+    "/api/v1/analytics/devices/usage-time",
+])
+def test_statement_count_does_not_grow_with_devices(client, db, path):
+    small = _seed_home(db, "small@example.com", devices=2, records_per_device=2)
+    large = _seed_home(db, "large@example.com", devices=20, records_per_device=10)
+
+    counts = []
+    for user_id in (small, large):
+        with count_statements() as statements:
+            response = client.get(path, headers=auth_headers(user_id))
+        assert response.status_code == 200
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+    # 用户查询 + 一次分组查询
+    assert counts[1] <= 2
@@ -0,0 +1,50 @@
+from sqlalchemy import event
+
+from app.core.cache import auth_user_cache
+from app.core.deps import get_current_user
+from app.core.security import create_access_token
+from app.db.session import engine
+from app.models.models import User
+from tests.conftest import auth_headers, create_home
+
+def test_cached_user_is_not_shared_between_requests(db):
+    home = create_home(db)
+    user = db.get(User, home["user_id"])
+    user.preferences = {"theme": "dark", "rooms": [1]}
+    db.commit()
+    token = create_access_token(home["user_id"])
+
+    first = get_current_user(db=db, token=token)
+    first.preferences["theme"] = "light"
+    first.preferences["rooms"].append(2)
+    first.full_name = "改过的名字"
+
+    statements = []
+
+    def listener(*args) -> None:
+        statements.append(1)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        second = get_current_user(db=db, token=token)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert statements == []
+    assert second is not first
+    assert second.preferences == {"theme": "dark", "rooms": [1]}
+    assert second.full_name is None
+
+def test_read_user_me_does_not_modify_cached_user(client, db):
+    home = create_home(db)
+    user = db.get(User, home["user_id"])
+    # 历史数据中偏好可能存为 JSON 字符串，read_user_me 会在返回前解析
+    user.preferences = '{"theme": "dark"}'
+    db.commit()
+    headers = auth_headers(home["user_id"])
+
+    for _ in range(2):
+        response = client.get("/api/v1/users/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["preferences"] == {"theme": "dark"}
+    assert auth_user_cache.get(home["user_id"])["preferences"] == '{"theme": "dark"}'
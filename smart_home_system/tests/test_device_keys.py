@@ -0,0 +1,138 @@
+import hashlib
+import hmac
+import json
+import time
+from typing import Dict, Optional
+
+import pytest
+
+from app.core.config import settings
+from app.models.models import DeviceUsageRecord
+from tests.conftest import auth_headers, create_home
+
+USAGE_PATH = "/api/v1/device-usage/"
+
+def _payload(device_id: int) -> Dict:
+    return {
+        "device_id": device_id,
+        "start_time": "2026-01-05T10:00:00",
+        "end_time": "2026-01-05T11:00:00",
+        "energy_consumption": 1.5,
+    }
+
+def _signed_headers(
+    device_id: int,
+    key: str,
+    body: bytes,
+    *,
+    method: str = "POST",
+    path: str = USAGE_PATH,
+    timestamp: Optional[str] = None
+) -> Dict[str, str]:
+    timestamp = timestamp or str(int(time.time()))
+    message = f"{timestamp}\n{method}\n{path}\n".encode("utf-8") + body
+    return {
+        "X-Device-Id": str(device_id),
+        "X-Timestamp": timestamp,
+        "X-Signature": hmac.new(key.encode("utf-8"), message, hashlib.sha256).hexdigest(),
+        "Content-Type": "application/json",
+    }
+
+def _issue_key(client, home, device_id: int) -> str:
+    response = client.post(f"/api/v1/devices/{device_id}/api-key", headers=auth_headers(home["user_id"]))
+    assert response.status_code == 200
+    return response.json()["api_key"]
+
+@pytest.fixture
+def signed_device(client, db):
+    home = create_home(db, devices=2)
+    device_id = home["device_ids"][0]
+    return home, device_id, _issue_key(client, home, device_id)
+
+def test_valid_signature_writes_usage(client, signed_device):
+    home, device_id, key = signed_device
+    body = json.dumps(_payload(device_id)).encode("utf-8")
+    response = client.post(USAGE_PATH, content=body, headers=_signed_headers(device_id, key, body))
+    assert response.status_code == 200
+    assert response.json()["device_id"] == device_id
+
+@pytest.mark.parametrize("tamper", ["key", "method", "path", "body"])
+def test_signature_mismatch_is_rejected(client, signed_device, tamper):
+    home, device_id, key = signed_device
+    body = json.dumps(_payload(device_id)).encode("utf-8")
+    signed_body = body
+    options = {}
+    if tamper == "key":
+        key = key[::-1]
+    elif tamper == "method":
+        options["method"] = "PUT"
+    elif tamper == "path":
+        options["path"] = "/api/v1/device-usage/bulk"
+    else:
+        signed_body = json.dumps(dict(_payload(device_id), energy_consumption=0.1)).encode("utf-8")
+    headers = _signed_headers(device_id, key, signed_body, **options)
+    response = client.post(USAGE_PATH, content=body, headers=headers)
+    assert response.status_code == 401
+
+@pytest.mark.parametrize("timestamp", [
+    lambda: str(int(time.time()) - settings.DEVICE_SIGNATURE_MAX_SKEW - 5),
+    lambda: str(int(time.time()) + settings.DEVICE_SIGNATURE_MAX_SKEW + 5),
+    lambda: "nan",
+    lambda: "inf",
+    lambda: f"{time.time():.3f}",
+])
+def test_invalid_timestamp_is_rejected(client, signed_device, timestamp):
+    home, device_id, key = signed_device
+    body = json.dumps(_payload(device_id)).encode("utf-8")
+    headers = _signed_headers(device_id, key, body, timestamp=timestamp())
+    response = client.post(USAGE_PATH, content=body, headers=headers)
+    assert response.status_code == 401
+
+def test_non_ascii_signature_is_rejected(client, signed_device):
+    home, device_id, key = signed_device
+    body = json.dumps(_payload(device_id)).encode("utf-8")
+    headers = _signed_headers(device_id, key, body)
+    headers["X-Signature"] = "é" * 64
+    response = client.post(
+        USAGE_PATH,
+        content=body,
+        headers={name: value.encode("latin-1") for name, value in headers.items()}
+    )
+    assert response.status_code == 401
+
+def test_revoked_key_cannot_write(client, signed_device):
+    home, device_id, key = signed_device
+    body = json.dumps(_payload(device_id)).encode("utf-8")
+    assert client.post(USAGE_PATH, content=body, headers=_signed_headers(device_id, key, body)).status_code == 200
+
+    response = client.delete(f"/api/v1/devices/{device_id}/api-key", headers=auth_headers(home["user_id"]))
+    assert response.status_code == 204
+    response = client.post(USAGE_PATH, content=body, headers=_signed_headers(device_id, key, body))
+    assert response.status_code == 401
+
+def test_rotated_key_replaces_old_key(client, signed_device):
+    home, device_id, old_key = signed_device
+    body = json.dumps(_payload(device_id)).encode("utf-8")
+    assert client.post(USAGE_PATH, content=body, headers=_signed_headers(device_id, old_key, body)).status_code == 200
+
+    new_key = _issue_key(client, home, device_id)
+    assert new_key != old_key
+    response = client.post(USAGE_PATH, content=body, headers=_signed_headers(device_id, old_key, body))
+    assert response.status_code == 401
+    response = client.post(USAGE_PATH, content=body, headers=_signed_headers(device_id, new_key, body))
+    assert response.status_code == 200
+
+def test_device_cannot_write_other_device_usage(client, db, signed_device):
+    home, device_id, key = signed_device
+    # 同一房屋中的其他设备也不行
+    other_device_id = home["device_ids"][1]
+    body = json.dumps(_payload(other_device_id)).encode("utf-8")
+    response = client.post(USAGE_PATH, content=body, headers=_signed_headers(device_id, key, body))
+    assert response.status_code == 404
+
+    bulk_path = f"{USAGE_PATH}bulk"
+    body = json.dumps([_payload(device_id), _payload(other_device_id)]).encode("utf-8")
+    response = client.post(bulk_path, content=body, headers=_signed_headers(device_id, key, body, path=bulk_path))
+    assert response.status_code == 200
+    assert [line["accepted"] for line in response.json()["results"]] == [True, False]
+    assert db.query(DeviceUsageRecord.device_id).all() == [(device_id,)]
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.models.models import DeviceUsageRecord, UsageRollupHourly
+from tests.conftest import auth_headers, create_home
+
+def _line(device_id: int, energy: float, hours_ago: int = 2) -> dict:
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=hours_ago)
+    return {
+        "device_id": device_id,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(minutes=30)).isoformat(),
+        "energy_consumption": energy,
+    }
+
+def test_bulk_constraint_failure_rejects_only_offending_rows(client, db):
+    home = create_home(db)
+    # 模拟数据库层约束：能耗为负的行插入失败
+    db.execute(text(
+        "CREATE TRIGGER reject_negative_energy BEFORE INSERT ON device_usage_records "
+        "WHEN NEW.energy_consumption < 0 BEGIN SELECT RAISE(ABORT, 'negative energy'); END"
+    ))
+    db.commit()
+    device_id = home["device_ids"][0]
+    payload = [_line(device_id, 1.0), _line(device_id, -1.0), _line(device_id, 2.0, hours_ago=3)]
+
+    response = client.post("/api/v1/device-usage/bulk", json=payload, headers=auth_headers(home["user_id"]))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["accepted"] == 2
+    assert body["rejected"] == 1
+    assert [result["accepted"] for result in body["results"]] == [True, False, True]
+    assert db.query(DeviceUsageRecord).count() == 2
+    # 被拒绝的行也没有计入小时汇总
+    usage_count = sum(rollup.usage_count for rollup in db.query(UsageRollupHourly))
+    assert usage_count == 2
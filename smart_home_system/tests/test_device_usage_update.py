@@ -0,0 +1,39 @@
+import pytest
+
+from app.models.models import DeviceUsageRecord, UsageRollupHourly
+from tests.conftest import auth_headers, create_home
+
+def test_update_times_recomputes_duration_cost_and_rollup(client, db):
+    home = create_home(db, devices=1)
+    headers = auth_headers(home["user_id"])
+    # 10:00-11:00 UTC 电价 3.0，其余时间 1.0
+    response = client.put(f"/api/v1/houses/{home['house_id']}/tariff", headers=headers, json={
+        "base_price": 1.0,
+        "windows": [{"start_minute": 600, "end_minute": 660, "price": 3.0}],
+    })
+    assert response.status_code == 200
+    response = client.post("/api/v1/device-usage/", headers=headers, json={
+        "device_id": home["device_ids"][0],
+        "start_time": "2026-01-05T10:00:00",
+        "end_time": "2026-01-05T11:00:00",
+        "energy_consumption": 1.0,
+    })
+    record = response.json()
+    assert (record["duration"], record["cost"]) == (60, pytest.approx(3.0))
+
+    response = client.put(
+        f"/api/v1/device-usage/{record['id']}",
+        headers=headers,
+        json={"end_time": "2026-01-05T12:00:00"}
+    )
+    assert response.status_code == 200
+    assert response.json()["duration"] == 120
+    assert response.json()["cost"] == pytest.approx(2.0)
+
+    db.expire_all()
+    stored = db.get(DeviceUsageRecord, record["id"])
+    assert (stored.duration, stored.cost) == (120, pytest.approx(2.0))
+    rollup = db.query(UsageRollupHourly).one()
+    assert rollup.usage_count == 1
+    assert rollup.total_duration == 120
+    assert rollup.total_cost == pytest.approx(2.0)
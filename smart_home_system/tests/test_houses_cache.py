@@ -0,0 +1,31 @@
+from app.core.cache import device_health_cache
+from tests.conftest import auth_headers, create_home
+
+AREA_IMPACT = "/api/v1/analytics/house/area-impact"
+
+def test_update_house_invalidates_cached_analytics(client, db):
+    home = create_home(db)
+    headers = auth_headers(home["user_id"])
+    assert client.get(AREA_IMPACT, headers=headers).json()["house_stats"][0]["area"] != 250.0
+
+    response = client.put(f"/api/v1/houses/{home['house_id']}", headers=headers, json={
+        "name": "新名字",
+        "address": "新地址",
+        "area": 250.0,
+    })
+    assert response.status_code == 200
+
+    house = client.get(AREA_IMPACT, headers=headers).json()["house_stats"][0]
+    assert (house["house_name"], house["area"]) == ("新名字", 250.0)
+
+def test_delete_house_invalidates_cached_analytics_and_device_health(client, db):
+    home = create_home(db, devices=2)
+    headers = auth_headers(home["user_id"])
+    assert len(client.get(AREA_IMPACT, headers=headers).json()["house_stats"]) == 1
+    assert client.get("/api/v1/analytics/devices/health", headers=headers).status_code == 200
+    assert all(device_health_cache.get(device_id) is not None for device_id in home["device_ids"])
+
+    assert client.delete(f"/api/v1/houses/{home['house_id']}", headers=headers).status_code == 200
+
+    assert client.get(AREA_IMPACT, headers=headers).json()["house_stats"] == []
+    assert all(device_health_cache.get(device_id) is None for device_id in home["device_ids"])
@@ -0,0 +1,34 @@
+from app.db.init_db import init_db
+from app.models.models import Device, House, Room, User
+from tests.conftest import auth_headers
+
+def test_usage_record_can_be_written_after_init_db(client, db):
+    assert init_db(db)
+    user = db.query(User).filter(User.email == "test@example.com").one()
+    house = db.query(House).filter(House.user_id == user.id).first()
+    device = db.query(Device).join(
+        Room
+    ).filter(
+        Room.house_id == house.id
+    ).first()
+    headers = auth_headers(user.id)
+    payload = {
+        "device_id": device.id,
+        "start_time": "2026-01-05T10:00:00",
+        "end_time": "2026-01-05T11:00:00",
+        "energy_consumption": 2.0,
+    }
+
+    response = client.post("/api/v1/device-usage/", json=payload, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["cost"] is None
+
+    response = client.put(
+        f"/api/v1/houses/{house.id}/tariff",
+        json={"base_price": 0.5, "windows": []},
+        headers=headers
+    )
+    assert response.status_code == 200
+    response = client.post("/api/v1/device-usage/", json=payload, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["cost"] == 1.0
@@ -0,0 +1,35 @@
+import json
+import logging
+import queue
+
+from app.core.logging_config import DeferredQueueHandler, JsonFormatter
+
+def _queued_logger(name: str):
+    log_queue: queue.Queue = queue.Queue()
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.handlers = [DeferredQueueHandler(log_queue)]
+    logger.setLevel(logging.INFO)
+    return logger, log_queue
+
+def test_message_is_resolved_before_arguments_change():
+    logger, log_queue = _queued_logger("tests.deferred.args")
+    state = {"status": "online"}
+    logger.info("设备状态: %s", state)
+    state["status"] = "offline"
+
+    entry = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert entry["message"] == "设备状态: {'status': 'online'}"
+
+def test_exception_is_formatted_on_the_logging_thread():
+    logger, log_queue = _queued_logger("tests.deferred.exc")
+    try:
+        raise ValueError("读数无效")
+    except ValueError:
+        logger.exception("处理失败")
+
+    record = log_queue.get_nowait()
+    assert record.args is None and record.exc_info is None
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "处理失败"
+    assert "ValueError: 读数无效" in entry["exc_info"]
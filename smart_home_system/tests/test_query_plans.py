@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+
+from app.db.session import engine
+from app.models.models import Device, DeviceUsageRecord, House, Room, SecurityEvent
+
+END = datetime(2026, 1, 31)
+START = END - timedelta(days=30)
+
+def query_plan(db, statement) -> str:
+    """SQLite 的 EXPLAIN QUERY PLAN 输出（各行 detail 拼接）"""
+    sql = statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+@pytest.mark.parametrize("statement, index_name", [
+    # 分析接口：按房屋所有者和时间范围统计使用记录
+    (
+        select(DeviceUsageRecord.device_id, DeviceUsageRecord.start_time).where(
+            DeviceUsageRecord.owner_user_id == 1,
+            DeviceUsageRecord.start_time >= START,
+            DeviceUsageRecord.start_time <= END
+        ),
+        "ix_device_usage_records_owner_user_id_start_time_id",
+    ),
+    # 单个设备的使用记录时间范围查询
+    (
+        select(DeviceUsageRecord.id).where(
+            DeviceUsageRecord.device_id == 1,
+            DeviceUsageRecord.start_time >= START,
+            DeviceUsageRecord.start_time <= END
+        ),
+        "ix_device_usage_records_device_id_start_time",
+    ),
+    # 按使用者和时间范围查询
+    (
+        select(DeviceUsageRecord.id).where(
+            DeviceUsageRecord.user_id == 1,
+            DeviceUsageRecord.start_time >= START
+        ),
+        "ix_device_usage_records_user_id_start_time",
+    ),
+    # 房屋的使用记录（峰值功率、电价重新计价）
+    (
+        select(DeviceUsageRecord.id).where(
+            DeviceUsageRecord.house_id == 1,
+            DeviceUsageRecord.start_time >= START
+        ),
+        "ix_device_usage_records_house_id_start_time",
+    ),
+    # 安全事件列表：按房屋和时间范围
+    (
+        select(SecurityEvent.id).where(
+            SecurityEvent.house_id == 1,
+            SecurityEvent.event_time >= START,
+            SecurityEvent.event_time <= END
+        ),
+        "ix_security_events_house_id_event_time_id",
+    ),
+    # 外键：用户 -> 房屋 -> 房间 -> 设备
+    (select(House.id).where(House.user_id == 1), "ix_houses_user_id"),
+    (select(Room.id).where(Room.house_id == 1), "ix_rooms_house_id"),
+    (select(Device.id).where(Device.room_id == 1), "ix_devices_room_id"),
+])
+def test_hot_queries_use_indexes(db, statement, index_name):
+    plan = query_plan(db, statement)
+    assert index_name in plan, plan
@@ -0,0 +1,53 @@
+import pytest
+
+from app.core.config import settings
+from tests.conftest import auth_headers, create_home
+
+LOGIN_PATH = "/api/v1/auth/login"
+
+@pytest.fixture
+def limited_client(client, monkeypatch):
+    """启用限流，登录接口每个调用方只允许突发 2 次；重建中间件以清空令牌桶和路由缓存"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ROUTES", {LOGIN_PATH: [0.01, 2]})
+    client.app.middleware_stack = None
+    yield client
+    client.app.middleware_stack = None
+
+def _login(client, headers=None):
+    return client.post(
+        LOGIN_PATH,
+        data={"username": "nobody@example.com", "password": "wrong"},
+        headers=headers or {}
+    )
+
+def test_login_is_limited_per_address(limited_client):
+    statuses = [_login(limited_client).status_code for _ in range(3)]
+    assert 429 not in statuses[:2]
+    assert statuses[2] == 429
+    assert int(_login(limited_client).headers["Retry-After"]) >= 1
+
+def test_rotating_device_id_does_not_bypass_address_limit(limited_client):
+    statuses = [
+        _login(limited_client, {"X-Device-Id": str(device_id)}).status_code
+        for device_id in range(5)
+    ]
+    assert 429 not in statuses[:2]
+    assert statuses[2:] == [429, 429, 429]
+    # 不带设备ID的请求与之共用地址的令牌桶
+    assert _login(limited_client).status_code == 429
+
+def test_device_bucket_applies_on_top_of_address(limited_client, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ROUTES", {LOGIN_PATH: [0.01, 3]})
+    statuses = [_login(limited_client, {"X-Device-Id": "7"}).status_code for _ in range(3)]
+    assert 429 not in statuses
+    assert _login(limited_client, {"X-Device-Id": "7"}).status_code == 429
+
+def test_authenticated_users_have_separate_buckets(limited_client, db, monkeypatch):
+    path = "/api/v1/users/me"
+    monkeypatch.setattr(settings, "RATE_LIMIT_ROUTES", {path: [0.01, 2]})
+    first = auth_headers(create_home(db, email="a@example.com")["user_id"])
+    second = auth_headers(create_home(db, email="b@example.com")["user_id"])
+
+    assert [limited_client.get(path, headers=first).status_code for _ in range(3)] == [200, 200, 429]
+    assert limited_client.get(path, headers=second).status_code == 200
@@ -0,0 +1,221 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.models.models import DeviceUsageRecord, UsageRollupHourly
+from app.schemas.tariff import TariffWindowBase
+from app.services.analytics_engine import MINUTES_PER_DAY, MINUTES_PER_WEEK, SECONDS_PER_DAY, tariff_cost
+from app.services.tariff import TariffSchedule
+from tests.conftest import auth_headers, create_home
+
+# 1970-01-05 是星期一，一周电价数组从当地时间星期一 0 点开始
+FIRST_MONDAY = 4 * SECONDS_PER_DAY
+
+def _brute_force_cost(start: int, end: int, energy: float, weekly_prices: np.ndarray, utc_offset: int) -> float:
+    """逐秒取电价求平均"""
+    if end == start:
+        seconds = np.array([start])
+    else:
+        seconds = np.arange(start, end)
+    minutes = (seconds + utc_offset - FIRST_MONDAY) // 60 % MINUTES_PER_WEEK
+    return energy * weekly_prices[minutes].mean()
+
+@pytest.mark.parametrize("utc_offset", [0, 8 * 3600, -5 * 3600 - 1800])
+def test_tariff_cost_matches_per_second_brute_force(utc_offset):
+    rng = np.random.default_rng(7)
+    weekly_prices = rng.choice([0.2, 0.5, 1.0, 1.7], size=MINUTES_PER_WEEK)
+    base = int(datetime(2026, 3, 1).timestamp())
+    starts = base + rng.integers(0, 30 * SECONDS_PER_DAY, size=40)
+    # 覆盖 0 时长、不足一分钟、跨零点和超过一周的会话
+    spans = np.concatenate([
+        [0, 1, 59, 61, 3600],
+        rng.integers(0, 2 * SECONDS_PER_DAY, size=30),
+        rng.integers(7 * SECONDS_PER_DAY, 9 * SECONDS_PER_DAY, size=5),
+    ])
+    ends = starts + spans
+    energy = rng.random(len(starts)) * 5
+
+    costs = tariff_cost(starts, ends, energy, weekly_prices, utc_offset)
+
+    expected = [
+        _brute_force_cost(start, end, e, weekly_prices, utc_offset)
+        for start, end, e in zip(starts.tolist(), ends.tolist(), energy.tolist())
+    ]
+    np.testing.assert_allclose(costs, expected, rtol=1e-9)
+
+def _window(start: str, end: str, price: float, weekdays: int = 127) -> TariffWindowBase:
+    def minute(value: str) -> int:
+        hours, minutes = value.split(":")
+        return int(hours) * 60 + int(minutes)
+    return TariffWindowBase(start_minute=minute(start), end_minute=minute(end), weekdays=weekdays, price=price)
+
+def _week_minute(day: int, value: str) -> int:
+    hours, minutes = value.split(":")
+    return day * MINUTES_PER_DAY + int(hours) * 60 + int(minutes)
+
+def test_schedule_wraps_window_past_midnight_into_next_day():
+    # 只在星期一开始的夜间时段延续到星期二 06:00
+    schedule = TariffSchedule.from_windows(0.5, [_window("22:00", "06:00", 0.2, weekdays=0b1)])
+    prices = schedule.weekly_prices
+    assert prices[_week_minute(0, "21:59")] == 0.5
+    assert prices[_week_minute(0, "22:00")] == 0.2
+    assert prices[_week_minute(1, "05:59")] == 0.2
+    assert prices[_week_minute(1, "06:00")] == 0.5
+    assert prices[_week_minute(1, "22:00")] == 0.5
+
+def test_schedule_wraps_sunday_window_into_monday():
+    schedule = TariffSchedule.from_windows(0.5, [_window("23:00", "01:00", 0.2, weekdays=0b1000000)])
+    prices = schedule.weekly_prices
+    assert prices[_week_minute(6, "23:30")] == 0.2
+    assert prices[_week_minute(0, "00:30")] == 0.2
+    assert prices[_week_minute(0, "01:00")] == 0.5
+
+def test_schedule_equal_start_and_end_covers_whole_day():
+    schedule = TariffSchedule.from_windows(0.5, [_window("08:00", "08:00", 0.9, weekdays=0b100)])
+    prices = schedule.weekly_prices
+    assert (prices[_week_minute(2, "08:00"):_week_minute(3, "08:00")] == 0.9).all()
+    assert prices[_week_minute(3, "08:00")] == 0.5
+    assert prices[_week_minute(2, "07:59")] == 0.5
+
+@pytest.mark.parametrize("windows", [
+    [_window("08:00", "12:00", 1.0), _window("11:00", "13:00", 0.8)],
+    [_window("08:00", "12:00", 1.0, weekdays=0b11), _window("10:00", "10:30", 0.8, weekdays=0b10)],
+    # 星期一夜间时段延续到星期二早上，与星期二的早间时段重叠
+    [_window("22:00", "06:00", 0.2, weekdays=0b1), _window("05:00", "07:00", 0.8, weekdays=0b10)],
+    # 星期日夜间时段延续到星期一
+    [_window("23:00", "02:00", 0.2, weekdays=0b1000000), _window("01:00", "03:00", 0.8, weekdays=0b1)],
+    [_window("00:00", "00:00", 0.2), _window("12:00", "12:01", 0.8)],
+])
+def test_schedule_rejects_overlapping_windows(windows):
+    with pytest.raises(ValueError):
+        TariffSchedule.from_windows(0.5, windows)
+
+@pytest.mark.parametrize("windows", [
+    [_window("08:00", "12:00", 1.0), _window("12:00", "13:00", 0.8)],
+    [_window("08:00", "12:00", 1.0, weekdays=0b1), _window("10:00", "11:00", 0.8, weekdays=0b10)],
+    [_window("22:00", "06:00", 0.2, weekdays=0b1), _window("05:00", "07:00", 0.8, weekdays=0b100)],
+    [_window("22:00", "06:00", 0.2), _window("06:00", "22:00", 0.8)],
+])
+def test_schedule_accepts_adjacent_or_disjoint_windows(windows):
+    TariffSchedule.from_windows(0.5, windows)
+
+TARIFF = {
+    "name": "峰谷电价",
+    "base_price": 0.5,
+    "utc_offset_minutes": 480,
+    "windows": [
+        {"start_minute": 22 * 60, "end_minute": 6 * 60, "price": 0.2},
+        {"start_minute": 17 * 60, "end_minute": 21 * 60, "weekdays": 0b11111, "price": 1.0},
+    ],
+}
+
+def _local_price(moment: datetime) -> float:
+    """按 TARIFF 的定义直接求某一时刻（UTC）的电价"""
+    local = moment + timedelta(minutes=TARIFF["utc_offset_minutes"])
+    minute = local.hour * 60 + local.minute
+    for window in TARIFF["windows"]:
+        length = (window["end_minute"] - window["start_minute"]) % MINUTES_PER_DAY or MINUTES_PER_DAY
+        # 时段可能在当天或前一天开始（跨零点）
+        for days_back in (0, 1):
+            weekday = (local.weekday() - days_back) % 7
+            offset = minute + days_back * MINUTES_PER_DAY - window["start_minute"]
+            if window.get("weekdays", 127) >> weekday & 1 and 0 <= offset < length:
+                return window["price"]
+    return TARIFF["base_price"]
+
+def _expected_cost(record: DeviceUsageRecord) -> float:
+    minutes = record.duration or 0
+    if minutes == 0:
+        return record.energy_consumption * _local_price(record.start_time)
+    prices = [_local_price(record.start_time + timedelta(minutes=i)) for i in range(minutes)]
+    return record.energy_consumption * sum(prices) / len(prices)
+
+def _assert_rollups_match_records(db) -> None:
+    sums = defaultdict(float)
+    for record in db.query(DeviceUsageRecord).all():
+        hour = record.start_time.replace(minute=0, second=0, microsecond=0)
+        sums[(record.device_id, hour)] += record.cost or 0
+    rollups = {
+        (rollup.device_id, rollup.hour_bucket): rollup.total_cost
+        for rollup in db.query(UsageRollupHourly).all()
+    }
+    assert set(rollups) == set(sums)
+    for key, total in sums.items():
+        assert rollups[key] == pytest.approx(total)
+
+def test_put_and_delete_tariff_reprice_records_and_rollups(client, db):
+    home = create_home(db, devices=2)
+    headers = auth_headers(home["user_id"])
+    # 十天前之前最近的星期五 07:00 UTC（当地时间 15:00），在分析接口的时间范围内
+    start = (datetime.utcnow() - timedelta(days=10)).replace(hour=7, minute=0, second=0, microsecond=0)
+    start -= timedelta(days=(start.weekday() - 4) % 7)
+    for i in range(12):
+        session_start = start + timedelta(hours=5 * i, minutes=7 * i)
+        response = client.post("/api/v1/device-usage/", headers=headers, json={
+            "device_id": home["device_ids"][i % 2],
+            "start_time": session_start.isoformat(),
+            "end_time": (session_start + timedelta(minutes=30 + 40 * i)).isoformat(),
+            "energy_consumption": 1.0 + i,
+        })
+        assert response.status_code == 200
+        assert response.json()["cost"] is None
+
+    response = client.put(f"/api/v1/houses/{home['house_id']}/tariff", headers=headers, json=TARIFF)
+    assert response.status_code == 200
+    db.expire_all()
+    records = db.query(DeviceUsageRecord).all()
+    for record in records:
+        assert record.cost == pytest.approx(_expected_cost(record))
+    _assert_rollups_match_records(db)
+    analysis = client.get("/api/v1/analytics/energy/cost", params={"days": 365}, headers=headers).json()
+    assert analysis["total_cost"] == pytest.approx(sum(record.cost for record in records))
+
+    response = client.delete(f"/api/v1/houses/{home['house_id']}/tariff", headers=headers)
+    assert response.status_code == 200
+    db.expire_all()
+    assert all(record.cost is None for record in db.query(DeviceUsageRecord).all())
+    assert all(rollup.total_cost == 0 for rollup in db.query(UsageRollupHourly).all())
+    _assert_rollups_match_records(db)
+    assert client.get(f"/api/v1/houses/{home['house_id']}/tariff", headers=headers).status_code == 404
+
+def test_put_tariff_rejects_overlapping_windows(client, db):
+    home = create_home(db)
+    windows = TARIFF["windows"] + [{"start_minute": 5 * 60, "end_minute": 7 * 60, "price": 3.0}]
+    response = client.put(
+        f"/api/v1/houses/{home['house_id']}/tariff",
+        headers=auth_headers(home["user_id"]),
+        json=dict(TARIFF, windows=windows)
+    )
+    assert response.status_code == 400
+    assert client.get(
+        f"/api/v1/houses/{home['house_id']}/tariff",
+        headers=auth_headers(home["user_id"])
+    ).status_code == 404
+
+@pytest.mark.parametrize("start, end, expected", [
+    # 50 秒，其中 30 秒按基础电价、20 秒在 10:00 开始的时段内
+    ("2026-01-05T09:59:30", "2026-01-05T10:00:20", (30 * 1.0 + 20 * 3.0) / 50),
+    # 119 秒，duration 记为 1 分钟，但按实际的 60 + 59 秒计价
+    ("2026-01-05T10:00:00", "2026-01-05T10:01:59", (60 * 3.0 + 59 * 1.0) / 119),
+])
+def test_sub_minute_sessions_are_priced_by_end_time(client, db, start, end, expected):
+    home = create_home(db, devices=1)
+    headers = auth_headers(home["user_id"])
+    tariff = {"base_price": 1.0, "windows": [{"start_minute": 600, "end_minute": 601, "price": 3.0}]}
+    payload = {"device_id": home["device_ids"][0], "start_time": start, "end_time": end, "energy_consumption": 1.0}
+
+    # 写入时计价
+    assert client.put(f"/api/v1/houses/{home['house_id']}/tariff", headers=headers, json=tariff).status_code == 200
+    response = client.post("/api/v1/device-usage/", headers=headers, json=payload)
+    assert response.json()["cost"] == pytest.approx(expected)
+
+    # 方案变更时重新计价
+    assert client.delete(f"/api/v1/houses/{home['house_id']}/tariff", headers=headers).status_code == 200
+    assert client.post("/api/v1/device-usage/", headers=headers, json=payload).json()["cost"] is None
+    assert client.put(f"/api/v1/houses/{home['house_id']}/tariff", headers=headers, json=tariff).status_code == 200
+    db.expire_all()
+    costs = [record.cost for record in db.query(DeviceUsageRecord).all()]
+    assert costs == [pytest.approx(expected)] * 2
+    assert db.query(UsageRollupHourly).one().total_cost == pytest.approx(2 * expected)
@@ -0,0 +1,50 @@
+import os
+import time
+
+import plotly.graph_objects as go
+
+from app.core.config import settings
+from app.services import visualization
+from app.services.visualization import VisualizationService
+
+def _touch(path, age: float) -> None:
+    path.write_bytes(b"png")
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+def test_sweep_removes_only_expired_figure_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(visualization, "_last_sweep", 0.0)
+    max_age = settings.VISUALIZATION_FILE_MAX_AGE
+    expired = tmp_path / "area_impact_0123456789abcdef.png"
+    fresh = tmp_path / "area_impact_fedcba9876543210.png"
+    unrelated = tmp_path / "logo.png"
+    _touch(expired, max_age + 60)
+    _touch(fresh, 10)
+    _touch(unrelated, max_age + 60)
+
+    visualization._sweep_figures(tmp_path)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [fresh.name, unrelated.name]
+
+    # 间隔内不重复扫描
+    _touch(expired, max_age + 60)
+    visualization._sweep_figures(tmp_path)
+    assert expired.exists()
+
+def test_requesting_a_figure_keeps_its_file(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(visualization, "_last_sweep", 0.0)
+    service = VisualizationService(db)
+    service.output_dir = tmp_path
+    fig = go.Figure(go.Bar(x=[1, 2], y=[3, 4]))
+    stale = tmp_path / "stale_chart_0123456789abcdef.png"
+    _touch(stale, settings.VISUALIZATION_FILE_MAX_AGE + 60)
+
+    # 预先放置同一图表的文件，请求时只刷新修改时间、不重新渲染
+    url = service._save_figure(fig, "chart.png")
+    current = tmp_path / os.path.basename(url)
+    _touch(current, settings.VISUALIZATION_FILE_MAX_AGE + 60)
+    monkeypatch.setattr(visualization, "_last_sweep", 0.0)
+    assert service._save_figure(fig, "chart.png") == url
+
+    assert current.exists()
+    assert time.time() - current.stat().st_mtime < 60
+    assert not stale.exists()
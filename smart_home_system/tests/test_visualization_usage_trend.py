@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import DeviceUsageRecord
+from tests.conftest import auth_headers, create_home
+
+def _add_usage(db, home, start_time: datetime) -> None:
+    db.add(DeviceUsageRecord(
+        device_id=home["device_ids"][0],
+        user_id=home["user_id"],
+        house_id=home["house_id"],
+        owner_user_id=home["user_id"],
+        start_time=start_time,
+        end_time=start_time + timedelta(minutes=30),
+        duration=30,
+        energy_consumption=0.5
+    ))
+    db.commit()
+
+def _trend(client, home, start: str, end: str):
+    return client.get(
+        f"/api/v1/visualization/device/{home['device_ids'][0]}/usage-trend",
+        params={"start": start, "end": end},
+        headers=auth_headers(home["user_id"])
+    )
+
+def test_usage_trend_mixed_timezones_are_compared_in_utc(client, db):
+    home = create_home(db)
+    _add_usage(db, home, datetime(2026, 1, 1, 10, 0))
+    # 17:00+08:00 即 09:00 UTC，早于不带时区的结束时间 11:00（按 UTC）
+    response = _trend(client, home, "2026-01-01T17:00:00+08:00", "2026-01-01T11:00:00")
+    assert response.status_code == 200
+    assert response.json() == {"dates": ["2026-01-01"], "usage_counts": [1]}
+
+@pytest.mark.parametrize("start, end", [
+    ("2026-01-01T20:00:00+08:00", "2026-01-01T11:00:00"),
+    ("2026-01-01T12:00:00", "2026-01-01T19:00:00+08:00"),
+])
+def test_usage_trend_mixed_timezones_reject_reversed_range(client, db, start, end):
+    home = create_home(db)
+    response = _trend(client, home, start, end)
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("max_points, expected", [(2, 422), (3, 200)])
+def test_usage_trend_validates_max_points(client, db, max_points, expected):
+    home = create_home(db)
+    response = client.get(
+        f"/api/v1/visualization/device/{home['device_ids'][0]}/usage-trend",
+        params={"max_points": max_points},
+        headers=auth_headers(home["user_id"])
+    )
+    assert response.status_code == expected